@@ -1,11 +1,21 @@
-from conversational_engine import nlu, nlg
-from code_generator import python_generator, javascript_generator 
+from conversational_engine import nlu, nlg, intent_matcher
+from code_generator import python_generator, javascript_generator, script_locks, code_model
+import command_profiler
+import agent_metrics
+import symbol_index
+import smoke_runner
+import session_snapshot
 import os
+import sys
+import copy
+import time
+import threading
+from collections import OrderedDict
 
 # display_script_content can remain as a utility for the CLI main_loop
 def display_script_content_cli(script_path: str): # script_path is now absolute
     try:
-        with open(script_path, "r", encoding='utf-8') as f: # Added encoding
+        with script_locks.read_locked(script_path), open(script_path, "r", encoding='utf-8') as f: # Added encoding
             content = f.read()
         print(f"--- Content of {os.path.basename(script_path)} (at {script_path}) ---") 
         print(content)
@@ -17,22 +27,251 @@ def display_script_content_cli(script_path: str): # script_path is now absolute
 
 
 class AgentCore:
-    def __init__(self):
+    PARSE_CACHE_SIZE = 64 # Recent input texts -> parse_intents result (filled by previews, reused at Send)
+    CODE_MODEL_INTENTS = ("add_function", "create_class_statement", "add_method_to_class", "add_print_statement", "add_return_statement") # JavaScript edits
+
+    def __init__(self, profile=None, metrics=None, smoke=None, snapshot=None):
+        """profile: None reads MYAPPAGENT_PROFILE; False disables profiling; a spec string such as
+        "every=50,threshold_ms=500" or a command_profiler.CommandProfiler enables it.
+        metrics: None records into the process-wide agent_metrics registry (exported if MYAPPAGENT_METRICS is set);
+        False records nothing; an agent_metrics.AgentMetrics records there instead.
+        smoke: None reads MYAPPAGENT_SMOKE; False disables smoke checks; a spec string such as "workers=2,timeout=5"
+        or a started smoke_runner.SmokePool imports every Python script a command changed and reports failures.
+        snapshot: path of a session snapshot to resume from (when present and still current) and that
+        save_snapshot() writes; None keeps the session in memory only."""
+        self.snapshot_path = snapshot
+        saved = session_snapshot.read_snapshot(snapshot) if snapshot else None
         self.active_language = "python"
         self.current_script_name = None # Stores only the filename, e.g., "my_script.py"
+        if profile is None: self.profiler = command_profiler.from_environment()
+        elif profile is False: self.profiler = None
+        elif isinstance(profile, str): self.profiler = command_profiler.CommandProfiler(**command_profiler.parse_profile_spec(profile))
+        else: self.profiler = profile
+        if metrics is None: self.metrics = agent_metrics.agent_metrics(); agent_metrics.exporter_from_environment()
+        else: self.metrics = metrics or None
+        if smoke is None: self.smoke_pool = smoke_runner.from_environment()
+        elif smoke is False: self.smoke_pool = None
+        elif isinstance(smoke, str): self.smoke_pool = smoke_runner.SmokePool(**smoke_runner.parse_smoke_spec(smoke)).start()
+        else: self.smoke_pool = smoke
+        self.symbol_index = symbol_index.SymbolIndex() # Names for input completion; kept current after each edit
+        self.symbol_index.build_in_background(self.script_directories(), cached=saved.get("symbol_index") if saved else None) # Only changed scripts are re-parsed
+        self._parsed_intent_cache = OrderedDict(); self._parsed_intent_cache_lock = threading.Lock()
+        self.code_models = {} # JavaScript script name without extension -> (abs path, code_model.Module), for scripts created this session
+        self.code_model_digests = {} # Same keys -> source_digest of the file as the agent last wrote it; a mismatch means an outside edit
+        self.js_emitter = code_model.JavaScriptEmitter()
+        self._pipeline_undo = None # While a compound command runs: abs path -> content before it (None: created by it)
+        if saved: self._restore_snapshot(saved)
+
+    @staticmethod
+    def default_snapshot_path(front_end: str) -> str:
+        return session_snapshot.default_snapshot_path(front_end)
+
+    def snapshot_state(self) -> dict:
+        """What the next session resumes from, JSON-ready. A new cache worth keeping goes here and in _restore_snapshot."""
+        with self._parsed_intent_cache_lock: parsed_intents = [[text, parsed] for text, parsed in self._parsed_intent_cache.items()]
+        return {"active_language": self.active_language, "current_script_name": self.current_script_name,
+                "nlu_signature": session_snapshot.file_signature(nlu.__file__), "parsed_intents": parsed_intents,
+                "symbol_index": self.symbol_index.entries(),
+                "code_models": {key: {"path": path, "digest": self.code_model_digests.get(key), "module": code_model.to_data(module)}
+                                for key, (path, module) in self.code_models.items()}}
+
+    def _restore_snapshot(self, saved: dict):
+        if saved.get("active_language") in ("python", "javascript"): self.active_language = saved["active_language"]
+        for key, entry in (saved.get("code_models") or {}).items():
+            if entry.get("digest") is None or self._file_digest(entry.get("path", "")) != entry["digest"]: continue # Edited while we were away
+            try: self.code_models[key] = (entry["path"], code_model.from_data(entry["module"])); self.code_model_digests[key] = entry["digest"]
+            except (KeyError, TypeError, ValueError): pass
+        script = saved.get("current_script_name")
+        if script and self.active_language == "python" and os.path.exists(os.path.join(python_generator.BASE_PYTHON_OUTPUT_DIR, script)): self.current_script_name = script
+        elif script and self.active_language == "javascript" and os.path.splitext(script)[0] in self.code_models: self.current_script_name = script
+        if session_snapshot.is_current(nlu.__file__, saved.get("nlu_signature")): # Parses from another NLU version are dropped
+            with self._parsed_intent_cache_lock:
+                for text, parsed in (saved.get("parsed_intents") or [])[-self.PARSE_CACHE_SIZE:]: self._parsed_intent_cache[text] = parsed
+
+    def save_snapshot(self, path: str = None):
+        """Writes snapshot_state() to path (default: the snapshot this agent was created with). Returns the path
+        written, or None when there is nowhere to write or the write failed."""
+        path = path or self.snapshot_path
+        if not path: return None
+        try: session_snapshot.write_snapshot(path, self.snapshot_state())
+        except (OSError, TypeError, ValueError) as e: print(f"Warning: could not save session snapshot {path}: {e}", file=sys.stderr); return None
+        return path
+
+    def invalidate_script_caches(self, script_path: str = None):
+        """Forgets anything cached about a script (all scripts if None) after it changed outside the agent. A code
+        model is dropped only if the file no longer holds what the agent wrote, since watchers also report our own writes."""
+        python_generator.invalidate_script_cache(script_path)
+        if script_path is not None: self.symbol_index.update_script(script_path)
+        else: self.symbol_index.clear(); self.symbol_index.build_in_background(self.script_directories())
+        for key, (path, _) in list(self.code_models.items()):
+            if script_path is not None and path != os.path.abspath(script_path): continue
+            with script_locks.read_locked(path): # Waits out a write in progress, whose digest isn't recorded yet
+                if self._file_digest(path) != self.code_model_digests.get(key): self.code_models.pop(key, None); self.code_model_digests.pop(key, None)
+
+    def forget_changed_scripts(self, script_paths: list) -> list:
+        """For file watchers, which also report the agent's own writes: invalidate_script_caches for each script whose
+        text is neither what the generator cached nor what a code model last wrote. Runs on the command thread (the
+        UIs queue it like a command), so it never changes caches under a running command. Returns the paths forgotten."""
+        forgotten = []
+        for path in script_paths:
+            digest = self._file_digest(path); abs_path = os.path.abspath(path)
+            own = {python_generator.cached_source_digest(path)} | {self.code_model_digests.get(key) for key, (model_path, _) in self.code_models.items() if model_path == abs_path}
+            if digest is not None and digest in own: continue # Our own write, already in the caches
+            self.invalidate_script_caches(path); forgotten.append(path)
+        return forgotten
+
+    @staticmethod
+    def _file_digest(script_path: str):
+        """source_digest of a file's text, or None if it can't be read."""
+        try:
+            with open(script_path, "r", encoding="utf-8") as f: return python_generator.source_digest(f.read())
+        except (OSError, UnicodeDecodeError): return None
+
+    def select_script(self, file_name: str):
+        """Makes a script picked in a UI the current one, switching language by its extension. UIs call it from the
+        command thread so it lands between commands, not in the middle of one. Returns (language, script name)."""
+        self.current_script_name = file_name
+        if file_name.endswith(".py"): self.active_language = "python"
+        elif file_name.endswith(".js"): self.active_language = "javascript"
+        return self.active_language, self.current_script_name
+
+    def complete_input(self, partial_input: str, limit: int = symbol_index.DEFAULT_COMPLETION_LIMIT):
+        """Completions for the last word of a partly typed command (kind, word start, [names]) or None. In memory only."""
+        return self.symbol_index.complete(partial_input, limit)
+
+    def _parse_intents_cached(self, user_input_str: str) -> list:
+        """nlu.parse_intents, memoized per input text. Callers get their own copy: entities are mutated downstream."""
+        with self._parsed_intent_cache_lock:
+            parsed_intents = self._parsed_intent_cache.get(user_input_str)
+            if parsed_intents is not None: self._parsed_intent_cache.move_to_end(user_input_str)
+        if parsed_intents is None:
+            parsed_intents = nlu.parse_intents(user_input_str) # Pure regex work; safe on any thread
+            with self._parsed_intent_cache_lock:
+                self._parsed_intent_cache[user_input_str] = parsed_intents
+                while len(self._parsed_intent_cache) > self.PARSE_CACHE_SIZE: self._parsed_intent_cache.popitem(last=False)
+        return copy.deepcopy(parsed_intents)
+
+    def preview_intent(self, user_input_str: str) -> dict:
+        """What a command would do, without doing it: {"intent", "target"} with target a short description of the
+        class/function/script it would touch. Safe to call from any thread while a command runs; the parse is
+        cached, so sending the same text right after skips the NLU. Compound commands join their steps' previews."""
+        previews = [self._preview_parsed_intent(parsed_info) for parsed_info in self._parse_intents_cached(user_input_str)]
+        if len(previews) == 1: return previews[0]
+        return {"intent": " then ".join(preview["intent"] for preview in previews), "target": "; ".join(preview["target"] for preview in previews if preview["target"])}
+
+    def _preview_parsed_intent(self, parsed_info: dict) -> dict:
+        intent = parsed_info.get("intent"); entities = parsed_info.get("entities", {})
+        item = entities.get("method_name") or entities.get("item_name") or entities.get("function_name") or entities.get("property_name") or entities.get("attribute_name")
+        class_name = entities.get("class_name")
+        if intent == "create_script": script = entities.get("script_name")
+        else: script = entities.get("target_script") or self.current_script_name
+        parts = []
+        if class_name and item: parts.append(f"{class_name}.{item}")
+        elif class_name or item: parts.append(class_name or item)
+        if script and intent not in ("unknown", "specify_language"): parts.append(f"in {script}")
+        if intent == "specify_language" and entities.get("language"): parts.append(entities["language"])
+        return {"intent": intent, "target": " ".join(parts)}
+
+    def script_directories(self) -> list:
+        """Absolute directories the generators write scripts into."""
+        return [os.path.abspath(python_generator.BASE_PYTHON_OUTPUT_DIR)]
 
     def process_command(self, user_input_str: str) -> dict:
+        started = time.perf_counter()
+        if self.profiler is None: results = self._process_command_impl(user_input_str)
+        else: results = self.profiler.run(self._process_command_impl, user_input_str)
+        if self.metrics is not None: self.metrics.record_command(results.get("intent"), results.get("status"), time.perf_counter() - started)
+        return results
+
+    def _call_generator(self, generator_function, *args, **kwargs):
+        if self.metrics is None: return generator_function(*args, **kwargs)
+        with self.metrics.generator_seconds.time(operation=generator_function.__name__): return generator_function(*args, **kwargs)
+
+    def _process_command_impl(self, user_input_str: str) -> dict:
+        script_locks.consume_wait_ms() # Reset this thread's lock-wait accumulator
+        python_generator.pop_edit_patches() # ... and any edit patches left over from an earlier call
+        parsed_intents = self._parse_intents_cached(user_input_str)
+        if len(parsed_intents) == 1: results, debug_log = self._execute_intent(user_input_str, parsed_intents[0])
+        else: results, debug_log = self._execute_pipeline(parsed_intents)
+        return self._finish_command(results, debug_log)
+
+    def _execute_pipeline(self, parsed_intents: list):
+        """Runs the commands of a compound utterance in order against one in-memory copy of each script, written once
+        at the end. Stops at the first command that doesn't succeed and then undoes the earlier steps: Python edits
+        are never written, scripts the pipeline created are deleted, JavaScript files and code models and the
+        current language/script go back to how they were."""
+        results = None; debug_log = []; responses = []; failed_step = None
+        saved_state = (self.active_language, self.current_script_name, {key: (path, code_model.to_data(module)) for key, (path, module) in self.code_models.items()}, dict(self.code_model_digests))
+        self._pipeline_undo = {}
+        try:
+            with python_generator.script_batch(self._pipeline_script_paths(parsed_intents)) as batch:
+                for step, parsed_info in enumerate(parsed_intents, 1):
+                    step_results, step_log = self._execute_intent(parsed_info["text"], parsed_info)
+                    responses.append(step_results["main_response"]); debug_log += [f"[{step}] {line}" for line in step_log]
+                    if results is None: results = step_results
+                    results["status"] = step_results["status"]; results["suggestions"] = step_results["suggestions"]
+                    if step_results["script_to_display_path"]: results["script_to_display_path"] = step_results["script_to_display_path"]
+                    if step_results["status"] != "success": batch.discard(); failed_step = step; break
+        except BaseException: self._roll_back_pipeline(saved_state); raise
+        if failed_step is None: self._pipeline_undo = None
+        else:
+            not_undone = self._roll_back_pipeline(saved_state); results["script_to_display_path"] = None # The view still shows the state before
+            responses.append(f"Stopped at step {failed_step} of {len(parsed_intents)}; the earlier steps were undone."
+                             + (f" Could not restore: {', '.join(not_undone)}." if not_undone else ""))
+        results["intent"] = "pipeline"; results["intents"] = [parsed_info["intent"] for parsed_info in parsed_intents]
+        results["main_response"] = "\n".join(response for response in responses if response)
+        return results, debug_log
+
+    def _remember_for_undo(self, script_path: str, created: bool = False):
+        """Inside a pipeline, records a file's content before its first write (None if the pipeline created it)."""
+        path = os.path.abspath(script_path)
+        if self._pipeline_undo is None or path in self._pipeline_undo: return
+        if created: self._pipeline_undo[path] = None; return
+        try:
+            with open(path, "r", encoding="utf-8") as f: self._pipeline_undo[path] = f.read()
+        except FileNotFoundError: self._pipeline_undo[path] = None
+
+    def _roll_back_pipeline(self, saved_state: tuple) -> list:
+        """Puts back the agent state and the files recorded by _remember_for_undo. Returns the files it couldn't restore."""
+        undo = self._pipeline_undo or {}; self._pipeline_undo = None; not_undone = []
+        self.active_language, self.current_script_name, code_models, self.code_model_digests = saved_state
+        self.code_models = {key: (path, code_model.from_data(data)) for key, (path, data) in code_models.items()}
+        python_generator.pop_edit_patches() # Nothing the steps wrote is on disk any more
+        for path, content in undo.items():
+            try:
+                with script_locks.write_locked(path):
+                    if content is None: os.remove(path)
+                    else:
+                        with open(path, "w", encoding="utf-8") as f: f.write(content)
+            except FileNotFoundError: pass
+            except OSError as e: not_undone.append(f"{os.path.basename(path)} ({e.strerror})")
+            self.invalidate_script_caches(path) # Keeps the restored code models whose file is back to its recorded digest
+        return not_undone
+
+    def _pipeline_script_paths(self, parsed_intents: list) -> list:
+        """Python scripts a pipeline's steps name or default to, so the batch can lock them all up front in order."""
+        paths = []; script = self.current_script_name
+        for parsed_info in parsed_intents:
+            entities = parsed_info.get("entities", {})
+            script = entities.get("script_name") if parsed_info.get("intent") == "create_script" else entities.get("target_script") or script
+            if script and not script.endswith(".js"): paths.append(os.path.join(python_generator.BASE_PYTHON_OUTPUT_DIR, script if script.endswith(".py") else script + ".py"))
+        return paths
+
+    def _execute_intent(self, user_input_str: str, parsed_info: dict):
         results = { 
             "main_response": "", "debug_info": "", "script_to_display_path": None, 
             "active_language": self.active_language, "current_script_name": self.current_script_name,
-            "status": "success"
+            "status": "success", "lock_wait_ms": None, "script_patch": None, "intent": None, "suggestions": [], "smoke_checks": []
         }
         action_taken = False; debug_log = []
-        parsed_info = nlu.parse_intent(user_input_str)
         intent = parsed_info.get("intent"); entities = parsed_info.get("entities", {})
+        results["intent"] = intent
         entities["current_language"] = self.active_language # For NLG context
 
         if intent == "unknown":
+            suggestions = intent_matcher.suggest_intents(user_input_str) # Nearest command shapes, to cut the rephrase-and-retry loop
+            results["suggestions"] = [{"intent": suggested_intent, "command": shape, "score": score} for suggested_intent, shape, score in suggestions]
+            entities["suggestions"] = [shape for _, shape, _ in suggestions]
             results["main_response"] = nlg.generate_response("unknown_intent", entities); results["status"] = "error"
         elif intent == "specify_language":
             action_taken = True
@@ -59,15 +298,19 @@ class AgentCore:
                     comment = f"Script '{script_filename}' auto-generated for {self.active_language} by MyAppAgent."
                     created_full_path = "" 
                     if self.active_language == "python": 
-                        created_full_path = python_generator.create_new_script(script_filename, initial_comment=comment)
+                        created_full_path = self._call_generator(python_generator.create_new_script, script_filename, initial_comment=comment)
                         results["main_response"] = nlg.generate_response(intent, entities) + f" Python script created." 
                     elif self.active_language == "javascript": 
-                        created_full_path = javascript_generator.create_new_js_script(script_filename, initial_comment=comment)
+                        created_full_path = self._call_generator(javascript_generator.create_new_js_script, script_filename, initial_comment=comment)
+                        script_key = os.path.splitext(script_filename)[0]
+                        self.code_models[script_key] = (os.path.abspath(created_full_path), code_model.Module(docstring=comment))
+                        self.code_model_digests[script_key] = self._file_digest(created_full_path)
                         results["main_response"] = nlg.generate_response(intent, entities) + f" JavaScript script created."
                     else: 
                         results["main_response"] = f"Language '{self.active_language}' not supported for script creation."
                         results["status"] = "error"
                     
+                    if created_full_path: self._remember_for_undo(created_full_path, created=True)
                     if created_full_path and results["status"] == "success": 
                         self.current_script_name = script_filename 
                         results["script_to_display_path"] = created_full_path 
@@ -94,7 +337,7 @@ class AgentCore:
                 elif not target_script_filename: results["main_response"] = nlg.ask_clarification(f"Script for function '{function_name}'?"); results["status"] = "clarification_needed"
                 else:
                     try:
-                        gen_result_path = python_generator.add_function_to_script(target_script_filename, function_name, parameters=function_params) 
+                        gen_result_path = self._call_generator(python_generator.add_function_to_script, target_script_filename, function_name, parameters=function_params) 
                         if not gen_result_path.startswith("Error:"):
                             results["main_response"] = nlg.generate_response(intent, entities) + f" Func '{function_name}({', '.join(function_params)})' added to '{target_script_filename}'."
                             if not target_script_explicitly_provided: self.current_script_name = target_script_filename
@@ -111,7 +354,7 @@ class AgentCore:
                     results["main_response"] = nlg.ask_clarification(f"Method body contains unclear commands."); results["status"] = "clarification_needed"
                 else:
                     try:
-                        gen_result_path = python_generator.add_method_to_class(target_script_filename, class_name, method_name, parameters, body_command_descs)
+                        gen_result_path = self._call_generator(python_generator.add_method_to_class, target_script_filename, class_name, method_name, parameters, body_command_descs)
                         if not gen_result_path.startswith("Error:"):
                             results["main_response"] = nlg.generate_response(intent, entities) + f" Method '{method_name}({', '.join(parameters)})' added to class '{class_name}' in '{target_script_filename}'."
                             if not target_script_explicitly_provided: self.current_script_name = target_script_filename
@@ -127,7 +370,7 @@ class AgentCore:
                 elif not decorator_expression: results["main_response"] = nlg.ask_clarification(f"What decorator for '{item_name_from_nlu}'?"); results["status"] = "clarification_needed"
                 else:
                     try:
-                        gen_result_path = python_generator.add_decorator_to_function_or_method(script_name=target_script_filename, item_name=item_name_from_nlu,item_type=item_type_for_generator, class_name_for_method=class_name_context, decorator_expression_str=decorator_expression)
+                        gen_result_path = self._call_generator(python_generator.add_decorator_to_function_or_method, script_name=target_script_filename, item_name=item_name_from_nlu,item_type=item_type_for_generator, class_name_for_method=class_name_context, decorator_expression_str=decorator_expression)
                         if not gen_result_path.startswith("Error:"):
                             target_desc = f"method '{item_name_from_nlu}' in class '{class_name_context}'" if class_name_context else f"function '{item_name_from_nlu}'"
                             if gen_result_path.startswith("Success: Decorator already exists"): results["main_response"] = gen_result_path 
@@ -143,7 +386,7 @@ class AgentCore:
                 elif not target_script_filename: results["main_response"] = nlg.ask_clarification(f"Script for class '{class_name}'?"); results["status"] = "clarification_needed"
                 else:
                     try:
-                        gen_result_path = python_generator.add_class_attribute_to_class(target_script_filename, class_name, attribute_name, value_expression)
+                        gen_result_path = self._call_generator(python_generator.add_class_attribute_to_class, target_script_filename, class_name, attribute_name, value_expression)
                         if not gen_result_path.startswith("Error:"):
                             results["main_response"] = nlg.generate_response(intent, entities) + f" Attribute {attribute_name} = {value_expression} added to class '{class_name}' in '{target_script_filename}'."
                             if not target_script_explicitly_provided: self.current_script_name = target_script_filename
@@ -157,7 +400,7 @@ class AgentCore:
                 elif not target_script_filename: results["main_response"] = nlg.ask_clarification(f"Script for class '{class_name}'?"); results["status"] = "clarification_needed"
                 else:
                     try:
-                        gen_result_path = python_generator.add_instance_attribute_to_init(script_name=target_script_filename, class_name=class_name, attribute_name=attribute_name, value_expression_str=value_expression, init_param_suggestion=init_param_suggestion)
+                        gen_result_path = self._call_generator(python_generator.add_instance_attribute_to_init, script_name=target_script_filename, class_name=class_name, attribute_name=attribute_name, value_expression_str=value_expression, init_param_suggestion=init_param_suggestion)
                         if not gen_result_path.startswith("Error:"):
                             results["main_response"] = nlg.generate_response(intent, entities) + f" in class '{class_name}' in '{target_script_filename}'."
                             if not target_script_explicitly_provided: self.current_script_name = target_script_filename
@@ -183,7 +426,7 @@ class AgentCore:
                     results["status"] = "clarification_needed"
                 else:
                     try:
-                        gen_result_path = python_generator.add_property_to_class(
+                        gen_result_path = self._call_generator(python_generator.add_property_to_class,
                             script_name=target_script_filename, class_name=class_name,
                             property_name=property_name, private_attr_name=private_attr_name,
                             create_getter=create_getter, create_setter=create_setter, create_deleter=create_deleter,
@@ -221,7 +464,7 @@ class AgentCore:
                     if not valid_for_gen: results["status"] = "clarification_needed"
                     else: # ... (call generator as before)
                         try:
-                            gen_result_path = python_generator.add_statement_to_function_or_method(script_name=target_script_filename, item_name=item_name_for_generator, item_type=item_type_for_generator, statement_type=statement_type_for_gen, **statement_kwargs)
+                            gen_result_path = self._call_generator(python_generator.add_statement_to_function_or_method, script_name=target_script_filename, item_name=item_name_for_generator, item_type=item_type_for_generator, statement_type=statement_type_for_gen, **statement_kwargs)
                             if not gen_result_path.startswith("Error:"): # ... (success handling)
                                 results["main_response"] = nlg.generate_response(intent, entities)
                                 if not target_script_explicitly_provided: self.current_script_name = target_script_filename
@@ -234,7 +477,7 @@ class AgentCore:
                 if not import_details.get("import_type") or not target_script_filename: results["main_response"] = nlg.ask_clarification("Missing import details or target script."); results["status"] = "clarification_needed"
                 else: # ... (call generator)
                     try:
-                        gen_result_path = python_generator.add_import_to_script(target_script_filename, import_details)
+                        gen_result_path = self._call_generator(python_generator.add_import_to_script, target_script_filename, import_details)
                         if not gen_result_path.startswith("Error:"):  # ... (success handling)
                             if os.path.exists(gen_result_path): results["main_response"] = nlg.generate_response(intent, entities) + f" Import added to '{target_script_filename}'."; results["script_to_display_path"] = gen_result_path
                             else: results["main_response"] = gen_result_path ; results["script_to_display_path"] = os.path.join(python_generator.BASE_PYTHON_OUTPUT_DIR, target_script_filename) 
@@ -248,7 +491,7 @@ class AgentCore:
                 elif not target_script_filename: results["main_response"] = nlg.ask_clarification(f"Script for class '{class_name}'?"); results["status"] = "clarification_needed"
                 else:
                     try:
-                        gen_result_path = python_generator.add_class_to_script(target_script_filename, class_name, base_class_names=base_classes)
+                        gen_result_path = self._call_generator(python_generator.add_class_to_script, target_script_filename, class_name, base_class_names=base_classes)
                         if not gen_result_path.startswith("Error:"):
                             results["main_response"] = nlg.generate_response(intent, entities) + f" in '{target_script_filename}'."
                             if not target_script_explicitly_provided: self.current_script_name = target_script_filename
@@ -262,6 +505,11 @@ class AgentCore:
             
             if action_taken: debug_log.append(f"Intent='{intent}', Entities='{entities}', Lang='{self.active_language}'")
 
+        elif self.active_language == "javascript" and intent in self.CODE_MODEL_INTENTS:
+            action_taken = True
+            try: self._edit_code_model(intent, entities, results)
+            except Exception as e: results["main_response"] = f"Error editing JavaScript: {type(e).__name__} - {e}"; results["status"] = "error"; debug_log.append(f"EXCEPTION: {type(e).__name__} - {e}")
+            debug_log.append(f"Intent='{intent}', Entities='{entities}', Lang='{self.active_language}'")
         elif self.active_language == "javascript": # ... (as before)
             if intent not in ["create_script", "specify_language"]: 
                 action_taken = True; results["main_response"] = f"Sorry, '{intent}' is not supported for JavaScript."; results["status"] = "error"
@@ -284,7 +532,70 @@ class AgentCore:
         elif not results["main_response"] and not action_taken and intent != "unknown":
              results["main_response"] = nlg.generate_response("unknown_intent", entities) + f" I can't do '{intent}' with {self.active_language} in the current state."
              if results["status"] == "success": results["status"] = "error"
+        return results, debug_log
+
+    def _edit_code_model(self, intent: str, entities: dict, results: dict):
+        """A JavaScript edit: one change to the script's code model, then an incremental emit and a single write.
+        The whole edit holds the script's write lock; if the file changed outside the agent, nothing is written."""
+        script = entities.get("target_script") or self.current_script_name
+        script_key = os.path.splitext(script)[0] if script else None # The NLU names every target *.py
+        if script_key not in self.code_models:
+            results["main_response"] = f"Error: JavaScript script '{script_key}.js' wasn't created in this session, so it can't be edited." if script_key else nlg.ask_clarification("Which script are you working with or want to target?")
+            results["status"] = "error" if script_key else "clarification_needed"; return
+        script_path, module = self.code_models[script_key]
+        with script_locks.write_locked(script_path): self._edit_code_model_locked(intent, entities, results, script, script_key, script_path, module)
 
+    def _edit_code_model_locked(self, intent: str, entities: dict, results: dict, script: str, script_key: str, script_path: str, module):
+        try:
+            with open(script_path, "r", encoding="utf-8") as f: old_source = f.read()
+        except (OSError, UnicodeDecodeError): old_source = None
+        if old_source is None or python_generator.source_digest(old_source) != self.code_model_digests.get(script_key): # Edited by hand or another session
+            self.code_models.pop(script_key, None); self.code_model_digests.pop(script_key, None)
+            results["main_response"] = f"Error: '{script_key}.js' was changed outside the agent since its last edit, so it wasn't overwritten. The agent can't edit it any more this session."
+            results["status"] = "error"; return
+        class_name = entities.get("class_name"); function_name = entities.get("method_name") or entities.get("function_name")
+        class_node = module.find(code_model.Class, class_name) if class_name else None
+        if class_name and class_node is None and intent != "create_class_statement": error = f"Error: Class '{class_name}' not found in '{script_key}.js'."
+        elif intent == "create_class_statement": error = f"Error: Class '{class_name}' already exists in '{script_key}.js'." if class_node else None
+        elif intent in ("add_function", "add_method_to_class"):
+            existing = class_node.find_method(function_name) if class_node else module.find(code_model.Function, function_name)
+            body = entities.get("body_command_descs") or []
+            if existing is not None: error = f"Error: '{function_name}' already exists in '{script_key}.js'."
+            elif any(desc.get("type") not in code_model.Statement.KINDS for desc in body): error = "Error: Only print and return statements can be added to JavaScript methods."
+            else: error = None
+        else: # add_print_statement / add_return_statement
+            target = class_node.find_method(function_name) if class_node else module.find(code_model.Function, function_name)
+            error = None if target is not None else f"Error: '{function_name}' not found in '{script_key}.js'."
+        if error: results["main_response"] = error; results["status"] = "error"; return
+
+        if intent == "create_class_statement": module.add_class(class_name, entities.get("base_classes"))
+        elif intent == "add_function": module.add_function(function_name, entities.get("parameters"))
+        elif intent == "add_method_to_class":
+            method = class_node.add_method(function_name, entities.get("parameters"))
+            for desc in entities.get("body_command_descs") or []:
+                if desc["type"] != "pass": method.add_statement(desc["type"], desc.get("expression"))
+        else: target.add_statement("print" if intent == "add_print_statement" else "return", entities.get("expression"))
+        source = self._call_generator(self.js_emitter.emit, module) # Re-lowers only the changed nodes
+        self._remember_for_undo(script_path)
+        written = python_generator.write_rendered_script(script_path, old_source, source) # Records the script_patch and bytes written
+        self.code_model_digests[script_key] = python_generator.source_digest(written)
+        results["main_response"] = nlg.generate_response(intent, entities); results["script_to_display_path"] = script_path
+        if "target_script" not in entities: self.current_script_name = script
+
+    def _finish_command(self, results: dict, debug_log: list) -> dict:
+        edit_patches = python_generator.pop_edit_patches()
+        if self.metrics is not None: self.metrics.record_patches(edit_patches)
+        touched_paths = set(edit_patches)
+        if results["script_to_display_path"] and results["status"] == "success": touched_paths.add(os.path.abspath(results["script_to_display_path"]))
+        for path in touched_paths: self.symbol_index.update_script(path, python_generator.cached_script_module(path))
+        if results["script_to_display_path"]: results["script_patch"] = edit_patches.get(os.path.abspath(results["script_to_display_path"])) # Lets the UIs patch the view in place
+        if self.smoke_pool is not None: # Import each changed script in a sandboxed worker; failures don't undo the edit
+            results["smoke_checks"] = self.smoke_pool.check_many(sorted(path for path in edit_patches if path.endswith(".py")))
+            for check in results["smoke_checks"]:
+                if check["status"] != "ok": results["main_response"] += f"\nSmoke check of '{os.path.basename(check['path'])}' failed ({check['status']}): {check['error']}"
+                debug_log.append(f"Smoke[{os.path.basename(check['path'])}]={check['status']} {check['elapsed_ms']:.1f}ms")
+        lock_wait_ms = script_locks.consume_wait_ms()
+        if lock_wait_ms is not None: results["lock_wait_ms"] = lock_wait_ms; debug_log.append(f"LockWait={lock_wait_ms:.2f}ms")
         results["debug_info"] = " | ".join(debug_log)
         results["active_language"] = self.active_language 
         results["current_script_name"] = self.current_script_name
@@ -292,17 +603,20 @@ class AgentCore:
 
 def main_cli_loop(): # ... (as before)
     print("MyAppAgent CLI (Testing Mode)")
-    agent_core = AgentCore()
+    agent_core = AgentCore(snapshot=AgentCore.default_snapshot_path("cli"))
     print(f"Agent ready. Language: {agent_core.active_language}, Script: {agent_core.current_script_name or 'None'}")
-    while True:
-        prompt_script_name = f" ({agent_core.current_script_name})" if agent_core.current_script_name else ""
-        user_input = input(f"[{agent_core.active_language}{prompt_script_name}] CLI > ")
-        if user_input.lower() in ["exit", "quit"]: print("Exiting agent CLI. Goodbye!"); break
-        if not user_input.strip(): continue
-        command_results = agent_core.process_command(user_input)
-        if command_results.get("main_response"): print(f"Agent: {command_results['main_response']}")
-        if command_results.get("debug_info"): print(f"DEBUG: {command_results['debug_info']}")
-        if command_results.get("script_to_display_path"): display_script_content_cli(command_results["script_to_display_path"])
+    try:
+        while True:
+            prompt_script_name = f" ({agent_core.current_script_name})" if agent_core.current_script_name else ""
+            user_input = input(f"[{agent_core.active_language}{prompt_script_name}] CLI > ")
+            if user_input.lower() in ["exit", "quit"]: print("Exiting agent CLI. Goodbye!"); break
+            if not user_input.strip(): continue
+            command_results = agent_core.process_command(user_input)
+            if command_results.get("main_response"): print(f"Agent: {command_results['main_response']}")
+            if command_results.get("debug_info"): print(f"DEBUG: {command_results['debug_info']}")
+            if command_results.get("script_to_display_path"): display_script_content_cli(command_results["script_to_display_path"])
+    except (EOFError, KeyboardInterrupt): print()
+    finally: agent_core.save_snapshot() # The next launch resumes warm
 
 if __name__ == "__main__":
     main_cli_loop()
@@ -0,0 +1,208 @@
+# my_app_agent/agent_metrics.py
+# In-process metrics for AgentCore: labelled counters and latency histograms, rendered in the Prometheus text
+# exposition format. An exporter rewrites a .prom file periodically (atomically, so a node_exporter textfile collector
+# or a log shipper never sees a half-written file) and can also serve the same text on a localhost port.
+# Configure with MYAPPAGENT_METRICS="file=...,interval=15,port=9464" or AgentCore(metrics=...).
+import os
+import sys
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ENV_VAR = "MYAPPAGENT_METRICS"
+DEFAULT_METRICS_DIR = os.path.join(os.path.expanduser('~'), 'Documents', 'MyAppAgent', 'metrics')
+DEFAULT_EXPORT_INTERVAL_S = 15.0
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) # Seconds
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)]
+    if extra: parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_number(value: float) -> str:
+    if value == float("inf"): return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name; self.help_text = help_text; self.labelnames = tuple(labelnames)
+        self._values = {} # label values tuple -> count
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock: self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock: return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0)
+
+    def render(self) -> list:
+        with self._lock: items = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}" for key, value in items]
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_LATENCY_BUCKETS):
+        self.name = name; self.help_text = help_text; self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {} # label values tuple -> [per-bucket counts (not cumulative), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None: series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1; series[1] += value; series[2] += 1
+
+    def time(self, **labels):
+        """Context manager observing the seconds spent inside it."""
+        return _Timer(self, labels)
+
+    def render(self) -> list:
+        with self._lock: items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count; le_label = 'le="' + _format_number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict): self.histogram = histogram; self.labels = labels
+
+    def __enter__(self): self.started = time.perf_counter(); return self
+
+    def __exit__(self, *exc_info): self.histogram.observe(time.perf_counter() - self.started, **self.labels); return False
+
+class MetricsRegistry:
+    def __init__(self): self._metrics = {}; self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None: return existing # Several AgentCores in one process share their series
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock: metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+class AgentMetrics:
+    """The series AgentCore records. Metric names follow Prometheus conventions (myappagent_*_total, *_seconds)."""
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.commands = registry.counter("myappagent_commands_total", "Commands processed, by parsed intent and result status.", ("intent", "status"))
+        self.nlu_parses = registry.counter("myappagent_nlu_parses_total", "Commands parsed by the NLU, by whether an intent was recognised.", ("result",))
+        self.command_seconds = registry.histogram("myappagent_command_duration_seconds", "Wall time of process_command, by intent.", ("intent",))
+        self.generator_seconds = registry.histogram("myappagent_generator_duration_seconds", "Wall time of code generator calls, by generator function.", ("operation",))
+        self.bytes_written = registry.counter("myappagent_script_bytes_written_total", "Bytes written to generated scripts, by script file name.", ("script",))
+
+    def record_command(self, intent: str, status: str, seconds: float):
+        intent = intent or "unknown"
+        self.commands.inc(intent=intent, status=status or "unknown")
+        self.nlu_parses.inc(result="unknown" if intent == "unknown" else "recognised")
+        self.command_seconds.observe(seconds, intent=intent)
+
+    def record_patches(self, patches: dict):
+        for path, patch in patches.items():
+            if patch.get("bytes_written"): self.bytes_written.inc(patch["bytes_written"], script=os.path.basename(path))
+
+REGISTRY = MetricsRegistry()
+_agent_metrics = None
+_agent_metrics_lock = threading.Lock()
+
+def agent_metrics() -> AgentMetrics:
+    """The process-wide AgentMetrics on REGISTRY."""
+    global _agent_metrics
+    with _agent_metrics_lock:
+        if _agent_metrics is None: _agent_metrics = AgentMetrics(REGISTRY)
+        return _agent_metrics
+
+def write_atomically(path: str, text: str):
+    directory = os.path.dirname(os.path.abspath(path)); os.makedirs(directory, exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as f: f.write(text)
+    os.replace(temporary_path, path)
+
+class MetricsExporter:
+    """Rewrites `path` with the registry's text every `interval_s` (and once more on stop), and optionally serves it
+    at http://127.0.0.1:<port>/metrics. Both run on daemon threads."""
+    def __init__(self, registry: MetricsRegistry, path: str = None, interval_s: float = DEFAULT_EXPORT_INTERVAL_S, port: int = None):
+        self.registry = registry; self.path = path; self.interval_s = max(0.5, float(interval_s)); self.port = port
+        self._stop = threading.Event(); self._thread = None; self._server = None
+
+    def start(self):
+        if self.path and self._thread is None:
+            self._thread = threading.Thread(target=self._export_loop, name="metrics-exporter", daemon=True); self._thread.start()
+        if self.port is not None and self._server is None:
+            registry = self.registry
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?", 1)[0] not in ("/", "/metrics"): self.send_error(404); return
+                    body = registry.render().encode("utf-8")
+                    self.send_response(200); self.send_header("Content-Type", CONTENT_TYPE); self.send_header("Content-Length", str(len(body)))
+                    self.end_headers(); self.wfile.write(body)
+                def log_message(self, *args): pass # Scrapes would otherwise flood stderr
+            self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler); self._server.daemon_threads = True
+            self.port = self._server.server_address[1] # Resolves port 0 to the one actually bound
+            threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self
+
+    def export_now(self):
+        if self.path: write_atomically(self.path, self.registry.render())
+
+    def _export_loop(self):
+        while not self._stop.wait(self.interval_s):
+            try: self.export_now()
+            except OSError as e: print(f"Warning: could not write metrics to {self.path}: {e}", file=sys.stderr)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join(); self._thread = None
+        if self._server is not None: self._server.shutdown(); self._server.server_close(); self._server = None
+        try: self.export_now()
+        except OSError: pass
+
+def parse_metrics_spec(spec: str) -> dict:
+    """"file=/path/agent.prom,interval=15,port=9464" -> MetricsExporter keyword arguments. "on" (or "1") exports to
+    DEFAULT_METRICS_DIR/agent-<pid>.prom. Raises ValueError for unknown keys or bad values."""
+    options = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        key, separator, value = part.partition("=")
+        key = key.strip().lower(); value = value.strip()
+        if not separator and key in ("on", "1", "true", "yes"): options.setdefault("path", os.path.join(DEFAULT_METRICS_DIR, f"agent-{os.getpid()}.prom"))
+        elif key == "file": options["path"] = os.path.expanduser(value)
+        elif key in ("interval", "interval_s"): options["interval_s"] = float(value)
+        elif key == "port": options["port"] = int(value)
+        else: raise ValueError(f"Unknown {METRICS_ENV_VAR} option '{key}'")
+    return options
+
+_exporter = None
+
+def exporter_from_environment():
+    """Starts (once per process) the exporter configured by MYAPPAGENT_METRICS; None when it is unset or invalid."""
+    global _exporter
+    spec = os.environ.get(METRICS_ENV_VAR, "").strip()
+    if not spec or spec.lower() in ("0", "off", "false", "no"): return None
+    with _agent_metrics_lock:
+        if _exporter is not None: return _exporter
+        try: _exporter = MetricsExporter(REGISTRY, **parse_metrics_spec(spec)).start()
+        except (ValueError, OSError) as e: print(f"Warning: ignoring {METRICS_ENV_VAR}: {e}", file=sys.stderr); return None
+        return _exporter
@@ -0,0 +1,98 @@
+# my_app_agent/benchmarks/bench_ast_fragments.py
+# Should the generator take common AST shapes from templates parsed once, handing out copies with the names
+# substituted, instead of building the nodes with ast constructors on every call? For each shape this times:
+#   direct      the ast.* constructors python_generator uses
+#   copy        a template parsed once, copied by a minimal walk over _fields, names substituted during the walk
+#   deepcopy    the same template, copy.deepcopy, then names substituted
+#   parse       ast.parse of the filled-in source every time
+# and checks that every strategy produces the same tree. The property triple (getter/setter/deleter) is not
+# generated by this tree; it is here because it is the largest shape a template library would serve.
+#   python benchmarks/bench_ast_fragments.py [--number N]
+import ast
+import copy
+import argparse
+import timeit
+
+_LOAD = ast.Load(); _STORE = ast.Store()
+
+def _arguments(names: list) -> ast.arguments:
+    return ast.arguments(posonlyargs=[], args=[ast.arg(arg=name) for name in names], vararg=None, kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[])
+
+def _self_attribute(name: str, ctx) -> ast.Attribute:
+    return ast.Attribute(value=ast.Name(id="self", ctx=_LOAD), attr=name, ctx=ctx)
+
+def direct_function(name: str, parameters: list) -> ast.FunctionDef:
+    return ast.FunctionDef(name=name, args=_arguments(parameters), body=[ast.Pass()], decorator_list=[], returns=None, type_comment=None)
+
+def direct_print(expression: str) -> ast.Expr:
+    return ast.Expr(value=ast.Call(func=ast.Name(id="print", ctx=_LOAD), args=[ast.Name(id=expression, ctx=_LOAD)], keywords=[]))
+
+def direct_property(name: str, attribute: str) -> list:
+    getter = ast.FunctionDef(name=name, args=_arguments(["self"]), body=[ast.Return(value=_self_attribute(attribute, _LOAD))],
+                             decorator_list=[ast.Name(id="property", ctx=_LOAD)], returns=None, type_comment=None)
+    setter = ast.FunctionDef(name=name, args=_arguments(["self", "value"]), body=[ast.Assign(targets=[_self_attribute(attribute, _STORE)], value=ast.Name(id="value", ctx=_LOAD), type_comment=None)],
+                             decorator_list=[ast.Attribute(value=ast.Name(id=name, ctx=_LOAD), attr="setter", ctx=_LOAD)], returns=None, type_comment=None)
+    deleter = ast.FunctionDef(name=name, args=_arguments(["self"]), body=[ast.Delete(targets=[_self_attribute(attribute, ast.Del())])],
+                              decorator_list=[ast.Attribute(value=ast.Name(id=name, ctx=_LOAD), attr="deleter", ctx=_LOAD)], returns=None, type_comment=None)
+    return [getter, setter, deleter]
+
+# shape -> (template source with NAME/ATTR/EXPR placeholders, direct builder, arguments, fill(source, arguments))
+SHAPES = {
+    "function": ("def NAME(a, b):\n    pass", direct_function, ("run", ["a", "b"]), lambda source, args: source.replace("NAME", args[0])),
+    "print": ("print(EXPR)", direct_print, ("value",), lambda source, args: source.replace("EXPR", args[0])),
+    "property": ("@property\ndef NAME(self):\n    return self.ATTR\n\n@NAME.setter\ndef NAME(self, value):\n    self.ATTR = value\n\n"
+                 "@NAME.deleter\ndef NAME(self):\n    del self.ATTR", direct_property, ("size", "_size"),
+                 lambda source, args: source.replace("NAME", args[0]).replace("ATTR", args[1])),
+}
+
+def _substitutions(shape: str, args: tuple) -> dict:
+    if shape == "print": return {"EXPR": args[0]}
+    return dict(zip(("NAME", "ATTR"), args))
+
+def _copy_walk(node, names: dict):
+    """Structural copy of a template node, replacing placeholder strings on the way."""
+    if isinstance(node, list): return [_copy_walk(item, names) for item in node]
+    if not isinstance(node, ast.AST): return names.get(node, node) if isinstance(node, str) else node
+    if isinstance(node, ast.expr_context): return node # Shared singletons, as the parser hands them out
+    clone = node.__class__.__new__(node.__class__)
+    for field in node._fields: setattr(clone, field, _copy_walk(getattr(node, field, None), names))
+    return clone
+
+def _substitute(node, names: dict):
+    for child in ast.walk(node):
+        for field in ("id", "attr", "name"):
+            value = getattr(child, field, None)
+            if value in names: setattr(child, field, names[value])
+    return node
+
+def _strip_locations(tree) -> str:
+    return ast.dump(ast.Module(body=tree if isinstance(tree, list) else [tree], type_ignores=[]), include_attributes=False)
+
+def strategies(shape: str) -> dict:
+    source, direct, args, fill = SHAPES[shape]
+    template = ast.parse(source).body; single = len(template) == 1
+    names = _substitutions(shape, args)
+    def unwrap(body): return body[0] if single else body
+    return {
+        "direct": lambda: direct(*args),
+        "copy": lambda: unwrap(_copy_walk(template, names)),
+        "deepcopy": lambda: unwrap(_substitute(ast.Module(body=copy.deepcopy(template), type_ignores=[]), names).body),
+        "parse": lambda: unwrap(ast.parse(fill(source, args)).body),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="AST construction: direct constructors vs. parsed templates")
+    parser.add_argument("--number", type=int, default=20000, help="builds per measurement")
+    args = parser.parse_args()
+    print(f"{'shape':>9} {'strategy':>9} {'us/build':>9} {'vs direct':>10}")
+    for shape in SHAPES:
+        builders = strategies(shape); expected = _strip_locations(builders["direct"]())
+        direct_us = None
+        for strategy, build in builders.items():
+            if _strip_locations(build()) != expected: print(f"{shape:>9} {strategy:>9} produces a different tree"); continue
+            us = min(timeit.repeat(build, number=args.number, repeat=3)) / args.number * 1e6
+            direct_us = direct_us or us
+            print(f"{shape:>9} {strategy:>9} {us:>9.2f} {us / direct_us:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# my_app_agent/benchmarks/bench_generator_scaling.py
+# Grows one generated script through python_generator (0 -> --max-functions functions) and, at each checkpoint,
+# measures a window of every operation type: per-op latency, peak traced memory (tracemalloc, in a separate
+# window so it doesn't skew the timings) and the script size on disk. A log-log fit of per-op latency against
+# script size flags operations whose cost grows with the script, i.e. whose total over a session is quadratic.
+# Runs in a throwaway working directory. --cold drops the generator's parse cache before every op, as a fresh
+# process (or an edit from outside) would see it.
+#   python benchmarks/bench_generator_scaling.py [--max-functions N] [--window K] [--cold] [checkpoints ...]
+import os
+import sys
+import math
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import python_generator
+
+SCRIPT_NAME = "scaling_bench"
+DEFAULT_CHECKPOINTS = [10, 100, 1000, 3000, 10000]
+QUADRATIC_SLOPE = 0.5 # Per-op latency growing faster than ~sqrt(n) is flagged
+
+# Ops take a unique index and the number of grown functions (statement ops spread over those).
+def op_grow(index: int, grown: int):
+    return python_generator.add_function_to_script(SCRIPT_NAME, f"grown_fn_{index}", ["a", "b"])
+
+def op_add_function(index: int, grown: int):
+    return python_generator.add_function_to_script(SCRIPT_NAME, f"window_fn_{index}", ["a", "b"])
+
+def op_add_print(index: int, grown: int):
+    return python_generator.add_statement_to_function(SCRIPT_NAME, f"grown_fn_{index % grown}", "print", "a + b")
+
+def op_add_return(index: int, grown: int):
+    return python_generator.add_statement_to_function(SCRIPT_NAME, f"grown_fn_{index % grown}", "return", "a * 2")
+
+def op_add_class(index: int, grown: int):
+    return python_generator.add_class_to_script(SCRIPT_NAME, f"WindowClass{index}")
+
+def op_add_method(index: int, grown: int):
+    return python_generator.add_method_to_class(SCRIPT_NAME, "WindowClass0", f"method_{index}", ["self"])
+
+# name -> (generator function it needs, op). Class/method generators are optional: not every tree has them.
+OPERATIONS = {
+    "add_function": ("add_function_to_script", op_add_function),
+    "add_print": ("add_statement_to_function", op_add_print),
+    "add_return": ("add_statement_to_function", op_add_return),
+    "add_class": ("add_class_to_script", op_add_class),
+    "add_method": ("add_method_to_class", op_add_method),
+}
+
+def script_path() -> str:
+    return os.path.join(python_generator.BASE_PYTHON_OUTPUT_DIR, SCRIPT_NAME + ".py")
+
+def run_op(op, index: int, grown: int, cold: bool):
+    if cold: python_generator.invalidate_script_cache()
+    result = op(index, grown)
+    if isinstance(result, str) and result.startswith("Error"): raise RuntimeError(result)
+
+def measure_window(op, first_index: int, window: int, grown: int, cold: bool) -> dict:
+    """Times `window` ops, then runs another `window` under tracemalloc for the peak; returns the stats."""
+    latencies = []
+    for index in range(first_index, first_index + window):
+        started = time.perf_counter(); run_op(op, index, grown, cold); latencies.append((time.perf_counter() - started) * 1000.0)
+    tracemalloc.start()
+    try:
+        for index in range(first_index + window, first_index + 2 * window): run_op(op, index, grown, cold)
+        peak_kb = tracemalloc.get_traced_memory()[1] // 1024
+    finally: tracemalloc.stop()
+    return {"median_ms": statistics.median(latencies), "max_ms": max(latencies), "peak_kb": peak_kb}
+
+def loglog_slope(points: list):
+    """Least-squares slope of log(latency) against log(size); None with fewer than two usable points."""
+    points = [(math.log(n), math.log(ms)) for n, ms in points if n > 0 and ms > 0]
+    if len(points) < 2: return None
+    mean_x = sum(x for x, _ in points) / len(points); mean_y = sum(y for _, y in points) / len(points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator if denominator else None
+
+def main():
+    parser = argparse.ArgumentParser(description="python_generator scaling benchmark")
+    parser.add_argument("checkpoints", nargs="*", type=int, help=f"function counts to measure at (default {DEFAULT_CHECKPOINTS})")
+    parser.add_argument("--max-functions", type=int, default=None, help="stop growing after this many functions")
+    parser.add_argument("--window", type=int, default=20, help="ops per measurement window")
+    parser.add_argument("--cold", action="store_true", help="invalidate the generator's parse cache before every op")
+    args = parser.parse_args()
+    checkpoints = sorted(args.checkpoints or DEFAULT_CHECKPOINTS)
+    if args.max_functions is not None: checkpoints = [c for c in checkpoints if c <= args.max_functions]
+
+    operations = {}
+    for name, (required, op) in OPERATIONS.items():
+        if hasattr(python_generator, required): operations[name] = op
+        else: print(f"skipping {name}: python_generator.{required} is not available in this tree")
+
+    workspace = tempfile.mkdtemp(prefix="myappagent-genbench-"); previous_cwd = os.getcwd(); os.chdir(workspace)
+    try:
+        python_generator.create_new_script(SCRIPT_NAME, initial_comment="Scaling benchmark script.")
+        if "add_class" in operations: run_op(op_add_class, 0, 0, False) # add_method targets WindowClass0
+        print(f"{'functions':>9} {'operation':>13} {'median ms':>10} {'max ms':>10} {'peak KB':>10} {'file KB':>9} {'grow s':>8}")
+        grown = 0; growth_seconds = 0.0; history = {name: [] for name in operations}; window_base = 1
+        for checkpoint in checkpoints:
+            started = time.perf_counter()
+            while grown < checkpoint: # Growth goes through the generator too; its total is the session cost so far
+                run_op(op_grow, grown, grown, args.cold); grown += 1
+            growth_seconds += time.perf_counter() - started
+            for name, op in operations.items():
+                stats = measure_window(op, window_base, args.window, grown, args.cold)
+                history[name].append((grown, stats["median_ms"]))
+                file_kb = os.path.getsize(script_path()) / 1024.0
+                print(f"{grown:>9} {name:>13} {stats['median_ms']:>10.2f} {stats['max_ms']:>10.2f} {stats['peak_kb']:>10} {file_kb:>9.1f} {growth_seconds:>8.1f}")
+            window_base += 2 * args.window
+        print()
+        for name, points in history.items():
+            slope = loglog_slope(points)
+            if slope is None: continue
+            verdict = "QUADRATIC over a session (per-op cost grows with script size)" if slope > QUADRATIC_SLOPE else "ok"
+            print(f"{name:>13}: per-op latency ~ n^{slope:.2f} -> {verdict}")
+    finally:
+        os.chdir(previous_cwd); shutil.rmtree(workspace, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# my_app_agent/benchmarks/bench_tk_highlight.py
+# Compares Tk code-view highlighting: the old per-token Pygments insert + tag_cget walk (when Pygments is installed)
+# vs. a cold render from a shared-highlighting token stream, re-showing an unchanged script (cache hit) and the
+# incremental path for a one-line edit. Needs a display (or Xvfb).
+#   python benchmarks/bench_tk_highlight.py [lines ...]
+import os
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from main_ui import MyAppAgentUI
+from highlighting import HighlightCache
+
+try:
+    from pygments.lexers import PythonLexer
+    PYGMENTS_AVAILABLE = True
+except ImportError:
+    PYGMENTS_AVAILABLE = False
+
+SNIPPET = '''class Widget{n}(Base):
+    """Docstring for widget {n}."""
+    def render_{n}(self, value=0x{n:x}):
+        # Render the value
+        if value > {n}.5:
+            return f"big {{value}}"
+        return [value, 'small', None]
+'''
+
+def make_script(line_count: int) -> str:
+    parts = []; n = 0
+    while sum(p.count("\n") for p in parts) < line_count: parts.append(SNIPPET.format(n=n)); n += 1
+    return "".join(parts)
+
+def legacy_update_code_view(ui: MyAppAgentUI, content: str):
+    """The pre-batching implementation: one insert per token, tag_cget parent walk per token."""
+    area = ui.code_view_area
+    area.config(state=tk.NORMAL); area.delete('1.0', tk.END)
+    for token_type, value in PythonLexer().get_tokens(content):
+        tag_to_apply = str(token_type); current_type = token_type
+        while not area.tag_cget(tag_to_apply, "foreground") and current_type.parent:
+            current_type = current_type.parent; tag_to_apply = str(current_type)
+        if not area.tag_cget(tag_to_apply, "foreground"): tag_to_apply = "code_default"
+        area.insert(tk.END, value, tag_to_apply)
+    area.config(state=tk.DISABLED); area.see("1.0")
+
+def timed(func, *args) -> float:
+    started = time.perf_counter(); func(*args); ui.root.update_idletasks()
+    return (time.perf_counter() - started) * 1000.0
+
+def show(path: str, content: str):
+    ui._update_code_view(path, content)
+
+def blank_view():
+    ui._update_code_view(None, "// switched away")
+
+if __name__ == "__main__":
+    try: root = tk.Tk()
+    except tk.TclError as e: sys.exit(f"No display available ({e}); try running under xvfb-run.")
+    ui = MyAppAgentUI(root); ui.agent_core.active_language = "python"
+    sizes = [int(arg) for arg in sys.argv[1:]] or [500, 2000, 5000]
+    print(f"{'lines':>8} {'legacy ms':>12} {'cold ms':>12} {'reshow ms':>12} {'1-line edit ms':>15}")
+    for size in sizes:
+        content = make_script(size); path = os.path.abspath(f"bench_{size}.py")
+        legacy_text = f"{timed(legacy_update_code_view, ui, content):>12.1f}" if PYGMENTS_AVAILABLE else f"{'-':>12}"
+        ui.highlight_cache = HighlightCache(); blank_view()
+        cold_ms = timed(show, path, content)
+        blank_view()
+        reshow_ms = timed(show, path, content) # Same content: tokens come from the cache
+        lines = content.split("\n"); lines.insert(len(lines) // 2, "print('edited')")
+        edit_ms = timed(show, path, "\n".join(lines))
+        print(f"{size:>8} {legacy_text} {cold_ms:>12.1f} {reshow_ms:>12.1f} {edit_ms:>15.2f}")
+    root.destroy()
@@ -0,0 +1,193 @@
+# my_app_agent/benchmarks/bench_ui_latency.py
+# Drives the PySide UI (QT_QPA_PLATFORM=offscreen) and, when a display or Xvfb is available, the Tk UI through a
+# scripted command sequence on generated scripts of increasing size. Reports per-operation input-to-render latency,
+# full-highlight time and memory (RSS delta; tracemalloc peak with --trace-memory, which slows everything down).
+# Runs in a throwaway HOME/working directory so real generated_scripts and session logs are left alone.
+#   python benchmarks/bench_ui_latency.py [--ui pyside|tk|both] [--commands N] [--trace-memory] [lines ...]
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+
+WORKSPACE = tempfile.mkdtemp(prefix="myappagent-bench-")
+os.environ["HOME"] = os.environ["USERPROFILE"] = WORKSPACE # Before the UI modules compute their log/script dirs
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+os.chdir(WORKSPACE) # python_generator writes to ./generated_scripts
+from highlighting import HighlightCache
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+COMMAND_TIMEOUT_S = 120.0
+
+SNIPPET = '''def handler_{n}(value, scale=0x{n:x}):
+    """Handle value {n}; long docstrings exercise the multi-line string state."""
+    # Scale and classify
+    if value > {n}.5:
+        return f"big {{value * scale}}"
+    return [value, 'small', None]
+
+'''
+
+def make_script(line_count: int) -> str:
+    per_snippet = SNIPPET.count("\n")
+    return "".join(SNIPPET.format(n=n) for n in range(max(1, line_count // per_snippet)))
+
+def write_fixture(script_name: str, line_count: int) -> str:
+    os.makedirs("generated_scripts", exist_ok=True)
+    path = os.path.abspath(os.path.join("generated_scripts", script_name))
+    with open(path, "w") as f: f.write(make_script(line_count))
+    return path
+
+def rss_kb() -> int:
+    """Current resident set size in KB (Linux /proc; peak RSS elsewhere, which only ever grows)."""
+    try:
+        with open("/proc/self/statm") as f: return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak
+
+def command_sequence(script_stem: str, count: int) -> list:
+    """(operation, user input) pairs. Each op is repeated `count` times so medians mean something."""
+    sequence = [("add_function", f"add function bench_fn_{i}(a, b) to script {script_stem}") for i in range(count)]
+    sequence += [("add_print", f"in function bench_fn_{i} in script {script_stem} print a") for i in range(count)]
+    sequence += [("add_return", f"in function bench_fn_{i} in script {script_stem} return b") for i in range(count)]
+    return sequence
+
+class Measurement:
+    def __init__(self, trace_memory: bool): self.trace_memory = trace_memory; self.rows = {}
+
+    def measure(self, operation: str, func, *args):
+        if self.trace_memory: tracemalloc.reset_peak()
+        rss_before = rss_kb(); started = time.perf_counter()
+        func(*args)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+        peak_kb = tracemalloc.get_traced_memory()[1] // 1024 if self.trace_memory else None
+        self.rows.setdefault(operation, []).append((elapsed_ms, rss_kb() - rss_before, peak_kb))
+
+    def report(self, ui_name: str, line_count: int):
+        for operation, samples in self.rows.items():
+            times = [s[0] for s in samples]; rss = [s[1] for s in samples]; peaks = [s[2] for s in samples if s[2] is not None]
+            p95 = sorted(times)[min(len(times) - 1, int(len(times) * 0.95))]
+            peak_text = f"{max(peaks):>10}" if peaks else f"{'-':>10}"
+            print(f"{ui_name:>7} {line_count:>7} {operation:>14} {len(times):>4} {statistics.median(times):>10.2f} {p95:>10.2f} "
+                  f"{max(times):>10.2f} {sum(rss):>10} {peak_text}")
+        self.rows = {}
+
+# --- PySide ---
+def run_pyside(sizes: list, command_count: int, trace_memory: bool):
+    try: from PySide6 import QtWidgets, QtCore
+    except ImportError: print("PySide6 not installed; skipping the PySide UI."); return
+    import main_ui_pyside
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    ui = main_ui_pyside.MyAppAgentPysideUI(); ui.show(); app.processEvents()
+    measurement = Measurement(trace_memory)
+
+    def settle(): # Deliver queued signals and paint synchronously, as a user would see it
+        app.processEvents(); ui.code_view_area.viewport().repaint()
+
+    def send(user_input: str):
+        ui.input_entry.setText(user_input); ui.on_send_command()
+        deadline = time.perf_counter() + COMMAND_TIMEOUT_S
+        while ui._command_runnables: # Emptied by _on_command_finished/_on_command_failed once the view is updated
+            if time.perf_counter() > deadline: raise TimeoutError(f"Command did not finish: {user_input}")
+            app.processEvents(QtCore.QEventLoop.ProcessEventsFlag.AllEvents, 5)
+        settle()
+
+    def open_script(path: str): ui._update_code_view_area(script_path=path); settle()
+
+    def full_highlight():
+        highlighter = ui.python_highlighter
+        highlighter.set_token_stream(None); highlighter.highlight_cache = HighlightCache() # Cold: every block is scanned
+        highlighter.rehighlight(); highlighter.highlight_cache = ui.highlight_cache
+
+    def external_reload(path: str):
+        with open(path, "a") as f: f.write("# touched by the benchmark\n")
+        ui.agent_core.invalidate_script_caches(path); open_script(path)
+
+    for line_count in sizes:
+        script_name = f"bench_pyside_{line_count}.py"; path = write_fixture(script_name, line_count)
+        ui.agent_core.active_language = "python"; ui.agent_core.current_script_name = script_name
+        measurement.measure("open", open_script, path)
+        measurement.measure("full_highlight", full_highlight)
+        for operation, user_input in command_sequence(script_name[:-3], command_count): measurement.measure(operation, send, user_input)
+        measurement.measure("reload", external_reload, path)
+        measurement.report("pyside", line_count)
+    ui.close(); app.processEvents()
+
+# --- Tk ---
+def start_virtual_display():
+    """Starts Xvfb on a free display number if there is no display; returns the process (or None)."""
+    if os.environ.get("DISPLAY") or not shutil.which("Xvfb"): return None
+    for display_number in range(99, 120):
+        if os.path.exists(f"/tmp/.X{display_number}-lock"): continue
+        process = subprocess.Popen(["Xvfb", f":{display_number}", "-nolisten", "tcp", "-screen", "0", "1280x1024x24"],
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        time.sleep(0.5)
+        if process.poll() is None: os.environ["DISPLAY"] = f":{display_number}"; return process
+    return None
+
+def run_tk(sizes: list, command_count: int, trace_memory: bool):
+    import tkinter as tk
+    xvfb = start_virtual_display()
+    try:
+        try: root = tk.Tk()
+        except tk.TclError as e: print(f"No display for Tk ({e}) and no Xvfb; skipping the Tk UI."); return
+        import main_ui
+        ui = main_ui.MyAppAgentUI(root); root.update()
+        measurement = Measurement(trace_memory)
+
+        def send(user_input: str):
+            ui.input_entry.delete(0, tk.END); ui.input_entry.insert(0, user_input); ui.on_send_command()
+            deadline = time.perf_counter() + COMMAND_TIMEOUT_S
+            while ui._commands_in_flight: # Decremented by _handle_command_results after the view is updated
+                if time.perf_counter() > deadline: raise TimeoutError(f"Command did not finish: {user_input}")
+                root.update(); time.sleep(0.001)
+            root.update_idletasks()
+
+        def open_script(path: str): ui._update_code_view(script_path=path); root.update_idletasks()
+
+        def full_highlight():
+            if ui._code_view_digest is None: return # Large-file mode or not Python
+            content = "\n".join(ui._code_view_lines); stream = HighlightCache().tokenize(content) # Cold: lex everything
+            ui.code_view_area.config(state=tk.NORMAL); ui._render_code_view_full(content, stream, False)
+            ui.code_view_area.config(state=tk.DISABLED); root.update_idletasks()
+
+        def external_reload(path: str):
+            with open(path, "a") as f: f.write("# touched by the benchmark\n")
+            ui.agent_core.invalidate_script_caches(path); open_script(path)
+
+        for line_count in sizes:
+            script_name = f"bench_tk_{line_count}.py"; path = write_fixture(script_name, line_count)
+            ui.agent_core.active_language = "python"; ui.agent_core.current_script_name = script_name
+            measurement.measure("open", open_script, path)
+            measurement.measure("full_highlight", full_highlight)
+            for operation, user_input in command_sequence(script_name[:-3], command_count): measurement.measure(operation, send, user_input)
+            measurement.measure("reload", external_reload, path)
+            measurement.report("tk", line_count)
+        root.destroy()
+    finally:
+        if xvfb is not None: xvfb.terminate(); xvfb.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless UI latency benchmark")
+    parser.add_argument("lines", nargs="*", type=int, help=f"script sizes in lines (default {DEFAULT_SIZES})")
+    parser.add_argument("--ui", choices=["pyside", "tk", "both"], default="both")
+    parser.add_argument("--commands", type=int, default=5, help="repetitions of each command type per size")
+    parser.add_argument("--trace-memory", action="store_true", help="also record the tracemalloc peak per operation")
+    args = parser.parse_args()
+    sizes = args.lines or DEFAULT_SIZES
+    if args.trace_memory: tracemalloc.start()
+    print(f"workspace: {WORKSPACE}")
+    print(f"{'ui':>7} {'lines':>7} {'operation':>14} {'n':>4} {'median ms':>10} {'p95 ms':>10} {'max ms':>10} {'rss +KB':>10} {'peak KB':>10}")
+    try:
+        if args.ui in ("pyside", "both"): run_pyside(sizes, args.commands, args.trace_memory)
+        if args.ui in ("tk", "both"): run_tk(sizes, args.commands, args.trace_memory)
+    finally:
+        os.chdir(REPO_ROOT); shutil.rmtree(WORKSPACE, ignore_errors=True)
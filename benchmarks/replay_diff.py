@@ -0,0 +1,210 @@
+# my_app_agent/benchmarks/replay_diff.py
+# Differential replay: runs recorded sessions through AgentCore twice, once per engine configuration, and checks that
+# both produce the same parsed intents, the same replies and byte-identical generated files after every command.
+# It also reports the time each configuration spent per stage (NLU, generator calls, whole command) and the speedup.
+# Both stages are timed inside process_command, so a parse cache only helps where the same text is sent twice.
+#   reference  uncached NLU; the generator re-reads and re-parses the script on every edit: the straightforward
+#              implementation the others must match
+#   current    the tree as it is: parse cache, generator parse cache
+# Add an engine to ENGINES to check another variant. Sessions are the UIs' session logs (the "> command" lines of
+# tk_session.log / pyside_session.log) or text files with one command per line (# comments); with no corpus a
+# built-in one is replayed. Each session starts from a fresh AgentCore in a throwaway working directory. Every engine
+# first replays the whole corpus once untimed, and the engines take turns going first, so neither pays warm-up costs.
+#   python benchmarks/replay_diff.py [--baseline reference] [--candidate current] [--repeat N] [corpus files/dirs ...]
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import difflib
+import argparse
+import tempfile
+from contextlib import contextmanager
+
+WORKSPACE = tempfile.mkdtemp(prefix="myappagent-replay-")
+os.environ["HOME"] = os.environ["USERPROFILE"] = WORKSPACE # Before AgentCore computes its log/metrics dirs
+for variable in ("MYAPPAGENT_PROFILE", "MYAPPAGENT_METRICS", "MYAPPAGENT_SMOKE"): os.environ.pop(variable, None)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import agent as agent_module
+from agent import AgentCore
+nlu = agent_module.nlu; python_generator = agent_module.python_generator; script_locks = agent_module.script_locks # The module objects AgentCore calls, whatever the package layout
+
+STAGES = ("nlu", "generator", "command")
+GENERATOR_FUNCTIONS = ("create_new_script", "add_function_to_script", "add_statement_to_function", "add_statement_to_function_or_method",
+                       "add_method_to_class", "add_class_to_script", "add_class_attribute_to_class", "add_instance_attribute_to_init",
+                       "add_property_to_class", "add_decorator_to_function_or_method", "add_import_to_script")
+MAX_REPORTED_MISMATCHES = 10
+_SESSION_LOG_INPUT = re.compile(r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d+ \S+ > (.*?)(?:  \(queued\))?$")
+
+BUILTIN_CORPUS = {
+    "functions": ["create script replay_app", "add function main(argv) to replay_app", "in function main print argv",
+                  "in function main return len(argv)", "add function helper(a, b)", "in function helper return a + b * 2",
+                  "in function helper print 'a then b'", "add function main(x)"],
+    "compound": ["create script replay_batch then add function run(x) then in function run print x then in function run return x",
+                 "add function second() to replay_batch then in function second print 'done'",
+                 "add function loop(xs) to replay_batch then in function loop for x in xs: total = x * 2 then print total then in function loop return xs"],
+    "control_flow": ["create script replay_flow", "import os, sys", "add function process(items, limit)",
+                     "in function process if limit > 0 then count = 0 then print limit elif limit < -5 then print 'low' else print 'no limit'",
+                     "in function process for item in items: total = item * 2 then print total",
+                     "in function process while limit > 10: limit = limit - 1",
+                     "in function process try: value = int(limit) except ValueError as e: print e else: print value finally: print 'checked'",
+                     "in function process open 'log.txt' for writing as f then f.write(str(limit))",
+                     "in function process print items", "in function process return limit", # Appended after the blocks above
+                     "add function summary(x)", "in function summary if x then print 'x' else return None", "in function summary return x"],
+    "classes": ["create script replay_model", "create class Counter", "in class Counter add attribute step = 1",
+                "add instance attribute count = 0 to class Counter", "add method bump(n) to class Counter: count = n then return n",
+                "in method bump of class Counter if n > 3 then print n", "in method bump of class Counter print self.count",
+                "add property total to class Counter with setter", "create class Child inherits Counter",
+                "add method reset() to class Child: count = 0", "in method reset of class Child for i in range(3): print i"],
+    "unknown": ["make me a sandwich", "add fucntion typo()", "use python", "create script replay_late", "add function late()"],
+}
+
+class Engine:
+    """One configuration under test. installed() wraps a whole session."""
+    @contextmanager
+    def installed(self, agent: AgentCore): yield
+
+class ReferenceEngine(Engine):
+    @contextmanager
+    def installed(self, agent: AgentCore):
+        agent.PARSE_CACHE_SIZE = 0 # Every command goes through the NLU
+        load_script_module = python_generator._load_script_module
+        def load_uncached(script_path: str):
+            python_generator.invalidate_script_cache(script_path); return load_script_module(script_path)
+        python_generator._load_script_module = load_uncached
+        try: yield
+        finally: python_generator._load_script_module = load_script_module; python_generator.invalidate_script_cache()
+
+class CurrentEngine(Engine):
+    """The tree as it is; nothing is swapped out."""
+
+ENGINES = {"reference": ReferenceEngine, "current": CurrentEngine}
+
+@contextmanager
+def timed_nlu(totals: dict):
+    """Adds the time AgentCore spends in nlu.parse_intents to totals["nlu"]; a parse cache hit costs nothing here."""
+    parse_intents = nlu.parse_intents
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try: return parse_intents(*args, **kwargs)
+        finally: totals["nlu"] += time.perf_counter() - started
+    nlu.parse_intents = timed
+    try: yield
+    finally: nlu.parse_intents = parse_intents
+
+@contextmanager
+def timed_generator(totals: dict):
+    """Adds the time spent in python_generator's public edit functions to totals["generator"]."""
+    originals = {}
+    for name in GENERATOR_FUNCTIONS:
+        function = getattr(python_generator, name, None)
+        if function is None: continue
+        def timed(*args, _function=function, **kwargs):
+            started = time.perf_counter()
+            try: return _function(*args, **kwargs)
+            finally: totals["generator"] += time.perf_counter() - started
+        timed.__name__ = name; originals[name] = function; setattr(python_generator, name, timed) # __name__ keeps metric labels
+    try: yield
+    finally:
+        for name, function in originals.items(): setattr(python_generator, name, function)
+
+def snapshot_files(directory: str) -> dict:
+    files = {}
+    for root, directories, names in os.walk(directory):
+        directories[:] = [name for name in directories if name != script_locks.LOCK_DIR_NAME]
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, "rb") as f: files[os.path.relpath(path, directory)] = f.read()
+    return files
+
+def replay_session(engine: Engine, commands: list, directory: str) -> tuple:
+    """Runs one session in `directory`; returns ([per-command record], {stage: seconds})."""
+    os.makedirs(directory); previous_cwd = os.getcwd(); os.chdir(directory) # python_generator writes to ./generated_scripts
+    totals = dict.fromkeys(STAGES, 0.0); records = []; parse_intents = nlu.parse_intents # Untimed, for the intents compared
+    try:
+        agent = AgentCore(profile=False, metrics=False, smoke=False)
+        with engine.installed(agent), timed_nlu(totals), timed_generator(totals):
+            for command in commands:
+                started = time.perf_counter(); results = agent.process_command(command); totals["command"] += time.perf_counter() - started
+                records.append({"command": command, "intents": json.dumps(parse_intents(command), sort_keys=True, default=repr),
+                                "reply": (results.get("status"), results.get("intent"), results.get("main_response")),
+                                "files": snapshot_files(os.path.join(directory, python_generator.BASE_PYTHON_OUTPUT_DIR))})
+    finally: os.chdir(previous_cwd)
+    return records, totals
+
+def compare(session: str, baseline: list, candidate: list) -> list:
+    """Human-readable differences between two replays of a session, one entry per differing command."""
+    mismatches = []
+    for index, (expected, actual) in enumerate(zip(baseline, candidate), 1):
+        problems = []
+        if expected["intents"] != actual["intents"]: problems.append(f"intents differ:\n    {expected['intents']}\n    {actual['intents']}")
+        if expected["reply"] != actual["reply"]: problems.append(f"reply differs:\n    {expected['reply']!r}\n    {actual['reply']!r}")
+        for path in sorted(set(expected["files"]) | set(actual["files"])):
+            old = expected["files"].get(path); new = actual["files"].get(path)
+            if old == new: continue
+            if old is None or new is None: problems.append(f"{path}: only written by the {'candidate' if old is None else 'baseline'}"); continue
+            diff = difflib.unified_diff(old.decode("utf-8", "replace").splitlines(), new.decode("utf-8", "replace").splitlines(), "baseline", "candidate", lineterm="", n=1)
+            problems.append(f"{path}: contents differ\n    " + "\n    ".join(list(diff)[:20]))
+        if problems: mismatches.append(f"{session} #{index} '{expected['command']}':\n  " + "\n  ".join(problems))
+    return mismatches
+
+def load_corpus(paths: list) -> dict:
+    """Session name -> [commands], from session logs (*.log*) and one-command-per-line text files."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path): files += sorted(os.path.join(path, name) for name in os.listdir(path) if not name.startswith("."))
+        else: files.append(path)
+    sessions = {}
+    for path in files:
+        with open(path, "r", encoding="utf-8", errors="replace") as f: lines = f.read().splitlines()
+        if ".log" in os.path.basename(path): commands = [match.group(1) for match in map(_SESSION_LOG_INPUT.match, lines) if match]
+        else: commands = [line.strip() for line in lines if line.strip() and not line.lstrip().startswith("#")]
+        if commands: sessions[os.path.basename(path)] = commands
+    return sessions
+
+def main():
+    parser = argparse.ArgumentParser(description="Differential replay of recorded sessions through two engine configurations")
+    parser.add_argument("corpus", nargs="*", help="session logs, command files or directories of them (default: built-in corpus)")
+    parser.add_argument("--baseline", default="reference", choices=sorted(ENGINES))
+    parser.add_argument("--candidate", default="current", choices=sorted(ENGINES))
+    parser.add_argument("--repeat", type=int, default=3, help="replays per engine; timings are the fastest, outputs come from the first")
+    args = parser.parse_args()
+    sessions = load_corpus(args.corpus) if args.corpus else BUILTIN_CORPUS
+    if not sessions: print("No commands found in the corpus."); return 2
+
+    engines = {"baseline": ENGINES[args.baseline](), "candidate": ENGINES[args.candidate]()}
+    timings = {role: dict.fromkeys(STAGES, 0.0) for role in engines}; mismatches = []; command_count = 0
+    try:
+        for role, engine in engines.items(): # Untimed: one-time costs (imports, regex compiles) land here, not on whichever runs first
+            for session_index, commands in enumerate(sessions.values()):
+                directory = os.path.join(WORKSPACE, f"warmup-{role}-{session_index}"); replay_session(engine, commands, directory); shutil.rmtree(directory, ignore_errors=True)
+        roles = list(engines)
+        for session_index, (session, commands) in enumerate(sessions.items()):
+            outputs = {}; best = dict.fromkeys(roles)
+            for repetition in range(max(1, args.repeat)):
+                for role in roles[::-1] if (session_index + repetition) % 2 else roles: # Alternate which engine goes first
+                    directory = os.path.join(WORKSPACE, f"{role}-{session_index}-{repetition}")
+                    records, totals = replay_session(engines[role], commands, directory)
+                    shutil.rmtree(directory, ignore_errors=True)
+                    outputs.setdefault(role, records)
+                    best[role] = totals if best[role] is None else {stage: min(best[role][stage], totals[stage]) for stage in STAGES}
+            for role in roles:
+                for stage in STAGES: timings[role][stage] += best[role][stage]
+            mismatches += compare(session, outputs["baseline"], outputs["candidate"]); command_count += len(commands)
+    finally: shutil.rmtree(WORKSPACE, ignore_errors=True)
+
+    print(f"{len(sessions)} sessions, {command_count} commands: {args.baseline} (baseline) vs {args.candidate} (candidate)\n")
+    print(f"{'stage':>10} {'baseline ms':>12} {'candidate ms':>13} {'speedup':>8}")
+    for stage in STAGES:
+        baseline_ms = timings["baseline"][stage] * 1000.0; candidate_ms = timings["candidate"][stage] * 1000.0
+        speedup = f"{baseline_ms / candidate_ms:.2f}x" if candidate_ms else "-"
+        print(f"{stage:>10} {baseline_ms:>12.2f} {candidate_ms:>13.2f} {speedup:>8}")
+    print()
+    if not mismatches: print("Outputs identical: intents, replies and generated files match byte for byte."); return 0
+    print(f"{len(mismatches)} commands differ" + (f" (first {MAX_REPORTED_MISMATCHES} shown)" if len(mismatches) > MAX_REPORTED_MISMATCHES else "") + ":")
+    for mismatch in mismatches[:MAX_REPORTED_MISMATCHES]: print(mismatch)
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# my_app_agent/code_generator/code_model.py
+# Language-neutral model of a generated script: module, class, function and statement nodes, kept small with
+# __slots__. Every edit stamps the changed node and its ancestors with a fresh revision, and each emitter caches the
+# lines it lowered a node to against that revision, so re-emitting after an edit only lowers the changed subtrees.
+# Expressions are kept as the (Python-flavoured) text the NLU produced; emitters translate the few literals that differ.
+import re
+import itertools
+import weakref
+
+_revisions = itertools.count(1) # Process-wide, so a revision is never reused by another node
+
+class Node:
+    __slots__ = ("parent", "revision", "__weakref__")
+    def __init__(self): self.parent = None; self.revision = next(_revisions)
+
+    def touch(self):
+        """Marks this node and its ancestors as changed."""
+        revision = next(_revisions); node = self
+        while node is not None: node.revision = revision; node = node.parent
+
+    def _adopt(self, child):
+        child.parent = self; self.body.append(child); self.touch()
+        return child
+
+class Statement(Node):
+    KINDS = ("print", "return", "pass")
+    __slots__ = ("kind", "expression")
+    def __init__(self, kind: str, expression: str = None):
+        if kind not in self.KINDS: raise ValueError(f"Unknown statement kind '{kind}'")
+        super().__init__(); self.kind = kind; self.expression = expression
+
+class Function(Node):
+    __slots__ = ("name", "parameters", "body")
+    def __init__(self, name: str, parameters: list = None):
+        super().__init__(); self.name = name; self.parameters = list(parameters or []); self.body = []
+
+    def add_statement(self, kind: str, expression: str = None) -> Statement:
+        if len(self.body) == 1 and self.body[0].kind == "pass": self.body.clear() # A real statement replaces the placeholder
+        return self._adopt(Statement(kind, expression))
+
+class Class(Node):
+    __slots__ = ("name", "bases", "body")
+    def __init__(self, name: str, bases: list = None):
+        super().__init__(); self.name = name; self.bases = list(bases or []); self.body = []
+
+    def find_method(self, name: str):
+        return next((node for node in self.body if node.name == name), None)
+
+    def add_method(self, name: str, parameters: list = None) -> Function:
+        return self._adopt(Function(name, parameters))
+
+class Module(Node):
+    __slots__ = ("docstring", "body")
+    def __init__(self, docstring: str = None):
+        super().__init__(); self.docstring = docstring; self.body = []
+
+    def find(self, node_type: type, name: str):
+        return next((node for node in self.body if isinstance(node, node_type) and node.name == name), None)
+
+    def add_function(self, name: str, parameters: list = None) -> Function:
+        return self._adopt(Function(name, parameters))
+
+    def add_class(self, name: str, bases: list = None) -> Class:
+        return self._adopt(Class(name, bases))
+
+def to_data(node: Node):
+    """JSON-ready nested lists/dicts for a node and its subtree (revisions aren't kept: a loaded tree is all new)."""
+    if isinstance(node, Statement): return {"statement": node.kind, "expression": node.expression}
+    if isinstance(node, Function): return {"function": node.name, "parameters": node.parameters, "body": [to_data(child) for child in node.body]}
+    if isinstance(node, Class): return {"class": node.name, "bases": node.bases, "body": [to_data(child) for child in node.body]}
+    return {"module": True, "docstring": node.docstring, "body": [to_data(child) for child in node.body]}
+
+def from_data(data: dict) -> Module:
+    """Inverse of to_data for a module. Raises KeyError/ValueError on malformed data."""
+    module = Module(data.get("docstring"))
+    for item in data["body"]:
+        if "class" in item:
+            class_node = module.add_class(item["class"], item.get("bases"))
+            for method in item["body"]: _add_statements(class_node.add_method(method["function"], method.get("parameters")), method["body"])
+        else: _add_statements(module.add_function(item["function"], item.get("parameters")), item["body"])
+    return module
+
+def _add_statements(function: Function, body: list):
+    for statement in body: function.add_statement(statement["statement"], statement.get("expression"))
+
+class Emitter:
+    """Lowers a Module to source text. Subclasses turn one node into lines, given its children's lines already
+    lowered (and cached); lines are relative to the node and indented by the parent."""
+    INDENT = "    "
+
+    def __init__(self): self._cache = weakref.WeakKeyDictionary() # node -> (revision, lines)
+
+    def emit(self, module: Module) -> str:
+        return "\n".join(self.lines(module)) + "\n"
+
+    def lines(self, node: Node) -> list:
+        cached = self._cache.get(node)
+        if cached is not None and cached[0] == node.revision: return cached[1]
+        if isinstance(node, Statement): lines = [self.statement(node)]
+        elif isinstance(node, Function): lines = self.function(node, [self.lines(child) for child in node.body])
+        elif isinstance(node, Class): lines = self.class_(node, [self.lines(child) for child in node.body])
+        else: lines = self.module(node, [self.lines(child) for child in node.body])
+        self._cache[node] = (node.revision, lines)
+        return lines
+
+    def indented(self, children: list) -> list:
+        return [self.INDENT + line if line else line for child in children for line in child]
+
+    def expression(self, text: str) -> str: return text
+
+_JS_WORDS = {"True": "true", "False": "false", "None": "null", "and": "&&", "or": "||", "not": "!", "self": "this"}
+_JS_WORD = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')|\b(True|False|None|and|or|not|self)\b") # String literals are kept as they are
+
+class JavaScriptEmitter(Emitter):
+    def module(self, node: Module, children: list) -> list:
+        lines = [f"// {line}" for line in node.docstring.splitlines()] if node.docstring else []
+        for child_lines in children: lines += ([""] if lines else []) + child_lines
+        return lines
+
+    def class_(self, node: Class, children: list) -> list:
+        extends = f" extends {node.bases[0]}" if node.bases else "" # JavaScript has single inheritance
+        body = []
+        for index, child_lines in enumerate(children): body += ([""] if index else []) + child_lines
+        return [f"class {node.name}{extends} {{"] + self.indented([body]) + ["}"]
+
+    def function(self, node: Function, children: list) -> list:
+        parameters = [name for name in node.parameters if name != "self"] if isinstance(node.parent, Class) else node.parameters
+        keyword = "" if isinstance(node.parent, Class) else "function "
+        return [f"{keyword}{node.name}({', '.join(parameters)}) {{"] + self.indented(children) + ["}"]
+
+    def statement(self, node: Statement) -> str:
+        if node.kind == "print": return f"console.log({self.expression(node.expression)});"
+        if node.kind == "return": return "return;" if node.expression is None else f"return {self.expression(node.expression)};"
+        return "" # An empty body needs no placeholder
+
+    def expression(self, text: str) -> str:
+        return _JS_WORD.sub(lambda match: match.group(1) or _JS_WORDS[match.group(2)], text)
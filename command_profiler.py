@@ -0,0 +1,133 @@
+# my_app_agent/command_profiler.py
+# Opt-in profiling of AgentCore.process_command for slow commands in the field. Two independent triggers:
+#   every=N        run every Nth command under cProfile and dump a .prof file (pstats / snakeviz / gprof2dot)
+#   threshold_ms=T sample the command thread's stack while it runs and, if it took longer than T ms, dump the
+#                  collapsed stacks to a .stacks file (flamegraph.pl / speedscope). Fast commands leave nothing behind.
+# Files are named <timestamp>_<intent>_<ms>ms.<ext> and the oldest are deleted beyond `keep` per kind.
+# Configure with MYAPPAGENT_PROFILE="every=50,threshold_ms=500,keep=20,dir=/tmp/profiles" or AgentCore(profile=...).
+import os
+import re
+import sys
+import time
+import pstats
+import cProfile
+import threading
+from collections import Counter
+
+PROFILE_ENV_VAR = "MYAPPAGENT_PROFILE"
+DEFAULT_PROFILE_DIR = os.path.join(os.path.expanduser('~'), 'Documents', 'MyAppAgent', 'profiles')
+DEFAULT_KEEP = 20 # Dumps of each kind (.prof / .stacks) kept on disk
+DEFAULT_SAMPLE_INTERVAL_MS = 5.0
+MAX_STACK_DEPTH = 128
+
+def parse_profile_spec(spec: str) -> dict:
+    """"every=50,threshold_ms=500,keep=20,dir=...,interval_ms=5" -> CommandProfiler keyword arguments.
+    A bare number is shorthand for every=N. Raises ValueError for unknown keys or bad values."""
+    options = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        key, separator, value = part.partition("=")
+        key = key.strip().lower(); value = value.strip()
+        if not separator and key.isdigit(): options["every"] = int(key); continue
+        if key == "every": options["every"] = int(value)
+        elif key in ("threshold_ms", "threshold"): options["threshold_ms"] = float(value)
+        elif key in ("interval_ms", "interval"): options["sample_interval_ms"] = float(value)
+        elif key == "keep": options["keep"] = int(value)
+        elif key == "dir": options["profile_dir"] = os.path.expanduser(value)
+        else: raise ValueError(f"Unknown {PROFILE_ENV_VAR} option '{key}'")
+    return options
+
+def from_environment():
+    """CommandProfiler configured by MYAPPAGENT_PROFILE, or None when it is unset/empty/invalid."""
+    spec = os.environ.get(PROFILE_ENV_VAR, "").strip()
+    if not spec or spec.lower() in ("0", "off", "false", "no"): return None
+    try: options = parse_profile_spec(spec)
+    except ValueError as e: print(f"Warning: ignoring {PROFILE_ENV_VAR}: {e}", file=sys.stderr); return None
+    profiler = CommandProfiler(**options)
+    return profiler if profiler.enabled else None
+
+class _StackSampler:
+    """Background thread that records one thread's Python stack every interval until stopped."""
+    def __init__(self, thread_id: int, interval_s: float):
+        self.thread_id = thread_id; self.interval_s = interval_s
+        self.stacks = Counter() # "outer;...;inner" -> samples
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="command-profiler-sampler", daemon=True)
+
+    def start(self): self._thread.start()
+
+    def stop(self): self._stop.set(); self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None: continue
+            names = []
+            while frame is not None and len(names) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+class CommandProfiler:
+    def __init__(self, every: int = 0, threshold_ms: float = None, profile_dir: str = DEFAULT_PROFILE_DIR,
+                 keep: int = DEFAULT_KEEP, sample_interval_ms: float = DEFAULT_SAMPLE_INTERVAL_MS):
+        self.every = max(0, int(every or 0))
+        self.threshold_ms = threshold_ms if threshold_ms is None else max(0.0, float(threshold_ms))
+        self.profile_dir = profile_dir; self.keep = max(1, int(keep))
+        self.sample_interval_s = max(0.5, float(sample_interval_ms)) / 1000.0
+        self.commands_seen = 0
+        self._lock = threading.Lock() # Guards the counter and rotation; commands may run on several worker threads
+
+    @property
+    def enabled(self) -> bool: return bool(self.every) or self.threshold_ms is not None
+
+    def run(self, func, user_input: str) -> dict:
+        """Calls func(user_input) -> results dict, profiling it if this command is selected. Never changes the results."""
+        with self._lock: self.commands_seen += 1; command_number = self.commands_seen
+        profiler = None; sampler = None
+        if self.every and command_number % self.every == 0: profiler = cProfile.Profile()
+        elif self.threshold_ms is not None: # cProfile'd commands are too distorted to be judged against the threshold
+            sampler = _StackSampler(threading.get_ident(), self.sample_interval_s); sampler.start()
+        started = time.perf_counter(); results = None
+        try:
+            if profiler is not None:
+                try: profiler.enable()
+                except ValueError: profiler = None # Another profiler is active (3.12+ allows only one at a time)
+            try: results = func(user_input)
+            finally:
+                if profiler is not None: profiler.disable()
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            if sampler is not None: sampler.stop()
+            intent = results.get("intent") if isinstance(results, dict) else None
+            intent = intent or ("failed" if results is None else "unknown")
+            try:
+                if profiler is not None: self._dump_profile(profiler, intent, elapsed_ms)
+                elif sampler is not None and elapsed_ms >= self.threshold_ms and sampler.stacks: self._dump_stacks(sampler, intent, elapsed_ms)
+            except OSError as e: print(f"Warning: could not write command profile: {e}", file=sys.stderr) # Profiling must never break a command
+        return results
+
+    def _dump_path(self, intent: str, elapsed_ms: float, extension: str) -> str:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        now = time.time(); stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+        safe_intent = re.sub(r"[^A-Za-z0-9_-]+", "_", intent)[:48]
+        return os.path.join(self.profile_dir, f"{stamp}_{safe_intent}_{elapsed_ms:.0f}ms{extension}")
+
+    def _dump_profile(self, profiler: cProfile.Profile, intent: str, elapsed_ms: float):
+        path = self._dump_path(intent, elapsed_ms, ".prof")
+        pstats.Stats(profiler).dump_stats(path)
+        self._rotate(".prof")
+
+    def _dump_stacks(self, sampler: _StackSampler, intent: str, elapsed_ms: float):
+        path = self._dump_path(intent, elapsed_ms, ".stacks")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, samples in sampler.stacks.most_common(): f.write(f"{stack} {samples}\n")
+        self._rotate(".stacks")
+
+    def _rotate(self, extension: str):
+        with self._lock:
+            try: names = sorted(name for name in os.listdir(self.profile_dir) if name.endswith(extension)) # Timestamp prefix sorts oldest first
+            except OSError: return
+            for name in names[:max(0, len(names) - self.keep)]:
+                try: os.remove(os.path.join(self.profile_dir, name))
+                except OSError: pass
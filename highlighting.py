@@ -0,0 +1,175 @@
+# my_app_agent/ui/highlighting.py
+# Python token streams shared by the Tk and PySide code views. A single combined regex scans one line at a time;
+# the only state carried between lines is "inside a triple-quoted string", so an edit re-lexes just the changed lines
+# (plus any whose entry state it flipped). Streams are cached by content hash in a small LRU of recent files.
+# With Pygments installed, the code between triple-quoted strings is lexed by Pygments for finer token kinds
+# (names, builtins, operators); without it the combined regex alone is used.
+import re
+import hashlib
+from collections import OrderedDict
+
+try:
+    from pygments.lexers import PythonLexer
+    from pygments.token import Token
+    PYGMENTS_AVAILABLE = True
+except ImportError:
+    PYGMENTS_AVAILABLE = False
+
+KEYWORDS = ["def", "class", "if", "elif", "else", "for", "in", "while", "try", "except", "finally", "pass", "break",
+            "continue", "return", "yield", "import", "from", "as", "with", "assert", "del", "global",
+            "nonlocal", "lambda", "is", "not", "and", "or"]
+PSEUDO_KEYWORDS = ["None", "True", "False", "self", "cls"]
+# All rules in one alternation. At a given position earlier alternatives win, so strings and comments
+# swallow any keywords/numbers inside them.
+COMBINED_PATTERN = re.compile("|".join([
+    r"(?P<tri_open>'''|\"\"\")",
+    r"(?P<comment>#[^\n]*)",
+    r"(?P<string>'(?:[^'\\\n]|\\.)*'|\"(?:[^\"\\\n]|\\.)*\")",
+    r"(?P<class_kw>\bclass\s+)(?P<class_name>[A-Za-z_][A-Za-z0-9_]*)",
+    r"(?P<def_kw>\bdef\s+)(?P<func_name>[A-Za-z_][A-Za-z0-9_]*)(?=\s*\()",
+    r"(?P<decorator>@[A-Za-z0-9_.]+)",
+    r"(?P<keyword>\b(?:" + "|".join(KEYWORDS) + r")\b)",
+    r"(?P<pseudo_keyword>\b(?:" + "|".join(PSEUDO_KEYWORDS) + r")\b)",
+    r"(?P<number>\b0[xX][0-9a-fA-F]+\b|\b[0-9]+\.?[0-9]*(?:[eE][-+]?[0-9]+)?\b)",
+]))
+# Token kinds the front ends map to their own formats/tags: "keyword", "pseudo_keyword", "class_name", "func_name",
+# "decorator", "string", "docstring" (triple-quoted), "comment", "number"; with Pygments also "name", "builtin",
+# "exception" and "operator".
+STATE_NORMAL, STATE_IN_TRI_SINGLE, STATE_IN_TRI_DOUBLE = 0, 1, 2
+LINE_CACHE_LIMIT = 50000 # (entry state, line text) -> (spans, exit state); reset wholesale when full
+DEFAULT_MAX_FILES = 8
+
+if PYGMENTS_AVAILABLE:
+    _python_lexer = PythonLexer(stripnl=False, ensurenl=False) # Offsets must match the raw text
+    # Most specific first: a token type takes the kind of the first entry it falls under
+    _PYGMENTS_KINDS = [(Token.Keyword.Constant, "pseudo_keyword"), (Token.Keyword, "keyword"), (Token.Operator.Word, "keyword"),
+                       (Token.Name.Builtin.Pseudo, "pseudo_keyword"), (Token.Name.Builtin, "builtin"), (Token.Name.Exception, "exception"),
+                       (Token.Name.Class, "class_name"), (Token.Name.Function, "func_name"), (Token.Name.Decorator, "decorator"),
+                       (Token.Name, "name"), (Token.Literal.String.Doc, "docstring"), (Token.Literal.String, "string"),
+                       (Token.Literal.Number, "number"), (Token.Comment, "comment"), (Token.Operator, "operator"), (Token.Punctuation, "operator")]
+else: _python_lexer = None
+_pygments_kind_cache = {} # Pygments token type -> kind (None for whitespace and other unstyled tokens)
+
+def _pygments_kind(token_type):
+    kind = _pygments_kind_cache.get(token_type, False)
+    if kind is False: kind = _pygments_kind_cache[token_type] = next((kind for parent, kind in _PYGMENTS_KINDS if token_type in parent), None)
+    return kind
+
+def _pygments_spans(text: str, start: int, end: int) -> list:
+    """Pygments tokens of text[start:end], a stretch of code with no triple-quoted string in it."""
+    segment = text[start:end]
+    if not segment.strip(): return []
+    spans = []
+    for offset, token_type, value in _python_lexer.get_tokens_unprocessed(segment):
+        kind = _pygments_kind(token_type)
+        if kind is None or not value: continue
+        if spans and spans[-1][2] == kind and spans[-1][0] + spans[-1][1] == start + offset: # Merge runs (a string is several tokens)
+            spans[-1] = (spans[-1][0], spans[-1][1] + len(value), kind)
+        else: spans.append((start + offset, len(value), kind))
+    return spans
+
+def scan_line(text: str, previous_state: int = STATE_NORMAL):
+    """Single pass over one line. Returns ([(start, length, kind), ...] in character offsets, exit state).
+    The combined regex always decides the triple-quoted strings (and so the state); Pygments, when installed, lexes
+    everything in between."""
+    spans, state = _scan_line_regex(text, previous_state)
+    if _python_lexer is None: return spans, state
+    refined = []; pos = 0
+    for start, length, kind in spans:
+        if kind != "docstring": continue
+        refined += _pygments_spans(text, pos, start); refined.append((start, length, kind)); pos = start + length
+    refined += _pygments_spans(text, pos, len(text))
+    return refined, state
+
+def _scan_line_regex(text: str, previous_state: int = STATE_NORMAL):
+    spans = []; pos = 0; state = STATE_NORMAL
+    if previous_state in (STATE_IN_TRI_SINGLE, STATE_IN_TRI_DOUBLE): # Continue a multi-line string
+        end = text.find("'''" if previous_state == STATE_IN_TRI_SINGLE else '"""')
+        if end == -1: return [(0, len(text), "docstring")], previous_state
+        spans.append((0, end + 3, "docstring")); pos = end + 3
+    search = COMBINED_PATTERN.search
+    match = search(text, pos)
+    while match:
+        kind = match.lastgroup; start = match.start()
+        if kind == "tri_open":
+            delimiter = match.group(); end = text.find(delimiter, match.end())
+            if end == -1:
+                spans.append((start, len(text) - start, "docstring"))
+                state = STATE_IN_TRI_SINGLE if delimiter == "'''" else STATE_IN_TRI_DOUBLE
+                break
+            spans.append((start, end + 3 - start, "docstring")); match = search(text, end + 3); continue
+        if kind == "class_name": spans.append((start, 5, "keyword")); spans.append((match.start(kind), match.end(kind) - match.start(kind), kind))
+        elif kind == "func_name": spans.append((start, 3, "keyword")); spans.append((match.start(kind), match.end(kind) - match.start(kind), kind))
+        else: spans.append((start, match.end() - start, kind))
+        match = search(text, match.end())
+    return spans, state
+
+def content_digest(text: str) -> bytes: # Same hash as python_generator.source_digest, which identifies a patch's base
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+class TokenStream:
+    """Per-line tokens of one text. `change` is (base digest, first line, old end line, new end line) when the stream
+    was derived from an earlier version: only lines [first, new end) differ from that version's [first, old end)."""
+    __slots__ = ("digest", "lines", "spans", "states", "change")
+    def __init__(self, digest: bytes, lines: list, spans: list, states: list, change: tuple = None):
+        self.digest = digest; self.lines = lines; self.spans = spans; self.states = states; self.change = change
+
+    def start_state(self, line_index: int) -> int: return self.states[line_index - 1] if line_index else STATE_NORMAL
+
+class HighlightCache:
+    def __init__(self, max_files: int = DEFAULT_MAX_FILES):
+        self.max_files = max(1, max_files)
+        self._streams = OrderedDict() # digest -> TokenStream, most recently used last
+        self._latest_by_key = {} # key (e.g. script path) -> digest of the last version tokenized for it
+        self._line_cache = {}
+        self.lines_scanned = 0 # Lines actually lexed (the rest were reused); handy for benchmarks
+
+    def scan_line(self, text: str, previous_state: int = STATE_NORMAL):
+        key = (previous_state, text); cached = self._line_cache.get(key)
+        if cached is None:
+            cached = scan_line(text, previous_state); self.lines_scanned += 1
+            if len(self._line_cache) >= LINE_CACHE_LIMIT: self._line_cache.clear()
+            self._line_cache[key] = cached
+        return cached
+
+    def tokenize(self, text: str, key=None) -> TokenStream:
+        """Token stream for text. Identical content is never re-lexed; a new version of `key` re-lexes only
+        the lines that changed since the last version tokenized under that key."""
+        digest = content_digest(text)
+        stream = self._streams.get(digest)
+        if stream is None:
+            base_digest = self._latest_by_key.get(key) if key is not None else None
+            base = self._streams.get(base_digest) if base_digest is not None else None
+            stream = self._relex(digest, text.split("\n"), base)
+            self._streams[digest] = stream
+            while len(self._streams) > self.max_files: self._streams.popitem(last=False)
+        else: self._streams.move_to_end(digest)
+        if key is not None: self._latest_by_key[key] = digest
+        if len(self._latest_by_key) > self.max_files * 4: # Forget keys whose streams were evicted
+            self._latest_by_key = {k: d for k, d in self._latest_by_key.items() if d in self._streams}
+        return stream
+
+    def _relex(self, digest: bytes, new_lines: list, base: TokenStream) -> TokenStream:
+        if base is None:
+            spans = []; states = []; state = STATE_NORMAL
+            for line in new_lines:
+                line_spans, state = self.scan_line(line, state); spans.append(line_spans); states.append(state)
+            return TokenStream(digest, new_lines, spans, states)
+        old_lines = base.lines
+        common = min(len(old_lines), len(new_lines)); prefix = 0
+        while prefix < common and old_lines[prefix] == new_lines[prefix]: prefix += 1
+        suffix = 0
+        while suffix < common - prefix and old_lines[-1 - suffix] == new_lines[-1 - suffix]: suffix += 1
+        # Lines above the edit keep their tokens. Below it, an unchanged line keeps its tokens once it is entered
+        # in the same state as before; until then (e.g. an edit opened a triple-quoted string) lines are re-lexed.
+        spans = base.spans[:prefix]; states = base.states[:prefix]
+        state = states[-1] if prefix else STATE_NORMAL
+        shift = len(old_lines) - len(new_lines); tail_start = len(new_lines) - suffix; line_index = prefix
+        while line_index < len(new_lines):
+            if line_index >= tail_start and state == base.start_state(line_index + shift):
+                spans.extend(base.spans[line_index + shift:]); states.extend(base.states[line_index + shift:])
+                break
+            line_spans, state = self.scan_line(new_lines[line_index], state); spans.append(line_spans); states.append(state)
+            line_index += 1
+        old_end = line_index + shift if line_index < len(new_lines) else len(old_lines)
+        return TokenStream(digest, new_lines, spans, states, (base.digest, prefix, old_end, line_index))
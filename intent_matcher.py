@@ -0,0 +1,89 @@
+# my_app_agent/conversational_engine/intent_matcher.py
+# Fallback for utterances parse_intent can't place: scores them against canonical phrasings of every intent and
+# suggests the closest command shapes. Phrasings are indexed once as weighted word unigrams/bigrams and character
+# trigrams (so "fucntion" still lands near "function"); a query only touches the postings of its own features.
+import re
+import math
+from collections import defaultdict
+
+# Intent -> command shapes the NLU understands. <angle> words are placeholders: shown to the user, never indexed.
+CANONICAL_PHRASINGS = {
+    "create_script": ["create script <name>", "make a new script called <name>"],
+    "specify_language": ["use python", "use javascript", "switch to python"],
+    "add_function": ["add function <name>(<params>)", "add function <name>(<params>) to script <script>", "define a function called <name>"],
+    "create_class_statement": ["create class <Name>", "create class <Name> in script <script>", "create class <Name> inherits from <Base>"],
+    "add_method_to_class": ["in class <Name> add method <name>(self)", "add method <name>(self) to class <Name>"],
+    "add_property_to_class": ["in class <Name> add property <name> with setter", "add property <name> to class <Name> with getter and setter"],
+    "add_instance_attribute": ["in class <Name> add instance attribute <name> = <value>", "add instance attribute <name> initialized with <value> to class <Name>"],
+    "add_class_attribute": ["in class <Name> add attribute <name> = <value>", "add class attribute <name> = <value> to class <Name>"],
+    "add_print_statement": ["in function <name> print <expression>", "in class <Name> method <name> print <expression>"],
+    "add_return_statement": ["in function <name> return <expression>", "in class <Name> method <name> return <expression>"],
+    "add_conditional_statement": ["in function <name> if <condition> then <statement> else <statement>"],
+    "add_for_loop": ["in function <name> for <item> in <items>: <statement>"],
+    "add_while_loop": ["in function <name> while <condition>: <statement>"],
+    "add_file_operation": ["in function <name> open '<file>' for reading as <f> then <var> = <f>.read()"],
+    "add_try_except": ["in function <name> try: <statement> except <Error>: <statement>"],
+    "add_import_statement": ["import <module> into script <script>", "from <module> import <name> into script <script>"],
+}
+DEFAULT_SUGGESTION_LIMIT = 3
+MIN_SUGGESTION_SCORE = 0.15 # Cosine similarity below which a shape isn't worth showing
+
+_PLACEHOLDER = re.compile(r"<[^>]*>")
+_WORD = re.compile(r"[a-z]+")
+
+TRIGRAM_WEIGHT = 0.4 # Trigrams only rescue typos; user-chosen names ("foo") shouldn't pull towards keywords ("for")
+
+def _features(text: str) -> dict:
+    """Feature -> weight: words, adjacent word pairs and per-word character trigrams (with word-boundary marks)."""
+    words = _WORD.findall(_PLACEHOLDER.sub(" ", text.lower()))
+    features = defaultdict(float)
+    for index, word in enumerate(words):
+        features["w:" + word] += 1.0
+        if index: features[f"b:{words[index - 1]} {word}"] += 1.0
+        padded = f"^{word}$"
+        for start in range(len(padded) - 2): features["c:" + padded[start:start + 3]] += TRIGRAM_WEIGHT
+    return features
+
+def _weight(feature: str, count: float, idf: float) -> float:
+    return (1 + math.log(count) if count >= 1 else count) * idf # Sublinear in repeats; trigram weights stay below 1
+
+class IntentMatcher:
+    def __init__(self, phrasings: dict = None):
+        phrasings = CANONICAL_PHRASINGS if phrasings is None else phrasings
+        self.shapes = [(intent, shape) for intent, shapes in phrasings.items() for shape in shapes]
+        shape_features = [_features(shape) for _, shape in self.shapes]
+        document_frequency = defaultdict(int)
+        for features in shape_features:
+            for feature in features: document_frequency[feature] += 1
+        count = len(self.shapes)
+        self.idf = {feature: math.log((1 + count) / (1 + frequency)) + 1.0 for feature, frequency in document_frequency.items()}
+        self.postings = defaultdict(list) # feature -> [(shape id, normalized weight)]
+        for shape_id, features in enumerate(shape_features):
+            weights = {feature: _weight(feature, count, self.idf[feature]) for feature, count in features.items()}
+            norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+            for feature, weight in weights.items(): self.postings[feature].append((shape_id, weight / norm))
+
+    def suggest(self, text: str, limit: int = DEFAULT_SUGGESTION_LIMIT, min_score: float = MIN_SUGGESTION_SCORE) -> list:
+        """[(intent, command shape, score)] best first, at most one shape per intent."""
+        query = {feature: _weight(feature, count, self.idf[feature]) for feature, count in _features(text).items() if feature in self.idf}
+        norm = math.sqrt(sum(weight * weight for weight in query.values()))
+        if not norm: return []
+        scores = defaultdict(float)
+        for feature, weight in query.items():
+            weight /= norm
+            for shape_id, shape_weight in self.postings[feature]: scores[shape_id] += weight * shape_weight
+        best_by_intent = {}
+        for shape_id, score in sorted(scores.items(), key=lambda item: -item[1]):
+            if score < min_score: break
+            intent, shape = self.shapes[shape_id]
+            if intent not in best_by_intent: best_by_intent[intent] = (intent, shape, round(score, 3))
+            if len(best_by_intent) >= limit: break
+        return list(best_by_intent.values())
+
+_default_matcher = None
+
+def suggest_intents(text: str, limit: int = DEFAULT_SUGGESTION_LIMIT) -> list:
+    """suggest() on a matcher over CANONICAL_PHRASINGS, built on first use."""
+    global _default_matcher
+    if _default_matcher is None: _default_matcher = IntentMatcher()
+    return _default_matcher.suggest(text, limit)
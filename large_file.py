@@ -0,0 +1,47 @@
+# my_app_agent/ui/large_file.py
+# Read-only, memory-mapped view of a script too big to push into a text widget in one go. The code views
+# show the first chunk (the visible region plus a few screens of margin) and append more as the user scrolls.
+import os
+import mmap
+
+LARGE_FILE_THRESHOLD_BYTES = 2 * 1024 * 1024 # At or above this size the code views stop highlighting and load in chunks
+CHUNK_LINES = 2000
+CHUNK_MAX_BYTES = 512 * 1024 # Fewer lines per chunk when they are long (a single longer line is still loaded whole)
+
+def is_large_file(path: str) -> bool:
+    try: return os.path.getsize(path) >= LARGE_FILE_THRESHOLD_BYTES
+    except OSError: return False
+
+class StaleMappingError(Exception):
+    """The mapped file was rewritten or truncated since it was opened; reopen it."""
+
+class MappedScript:
+    def __init__(self, path: str, encoding: str = "utf-8"):
+        self.path = os.path.abspath(path); self.encoding = encoding
+        self._file = open(self.path, "rb")
+        try:
+            stat = os.fstat(self._file.fileno())
+            self.size = stat.st_size; self._signature = (stat.st_mtime_ns, stat.st_size)
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None # Empty files can't be mapped
+        except BaseException: self._file.close(); raise
+        self._offset = 0 # Byte offset of the first line not yet returned
+        self.lines_read = 0
+
+    @property
+    def exhausted(self) -> bool: return self._offset >= self.size
+
+    def read_next_chunk(self, max_lines: int = CHUNK_LINES, max_bytes: int = CHUNK_MAX_BYTES) -> str:
+        """Decodes the next run of whole lines (with their newlines); "" once the end of the file is reached."""
+        if self.exhausted: return ""
+        stat = os.fstat(self._file.fileno())
+        if (stat.st_mtime_ns, stat.st_size) != self._signature: raise StaleMappingError(self.path) # Reading past a truncation would fault
+        start = end = self._offset; lines = 0
+        while lines < max_lines and end < self.size and end - start < max_bytes:
+            newline = self._map.find(b"\n", end)
+            end = self.size if newline < 0 else newline + 1; lines += 1
+        self._offset = end; self.lines_read += lines
+        return self._map[start:end].decode(self.encoding, errors="replace")
+
+    def close(self):
+        if self._map is not None: self._map.close(); self._map = None
+        self._file.close()
@@ -0,0 +1,52 @@
+# my_app_agent/ui/log_buffer.py
+# Bounded log model shared by the Tk and PySide UIs: a ring buffer of recent entries with the complete session
+# history spilled to a rotating file on disk. The panes are capped at the same number of lines (they drop the oldest);
+# they are not virtualized views, every line kept is laid out.
+import os
+import time
+import logging
+import itertools
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+DEFAULT_LINE_CAP = 2000 # Entries kept in memory and rendered in the log pane
+DEFAULT_LOG_DIR = os.path.join(os.path.expanduser('~'), 'Documents', 'MyAppAgent', 'logs')
+DEFAULT_MAX_FILE_BYTES = 2 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DISPLAY_PREVIEW_CHARS = 400 # Debug lines (entity dumps) longer than this are shortened on screen only
+HTML_STYLE = "html" # Entries already marked up by the caller
+
+_logger_ids = itertools.count()
+
+class SessionLog:
+    def __init__(self, line_cap: int = DEFAULT_LINE_CAP, log_file_name: str = "session.log", log_dir: str = DEFAULT_LOG_DIR,
+                 max_file_bytes: int = DEFAULT_MAX_FILE_BYTES, backup_count: int = DEFAULT_BACKUP_COUNT):
+        self.line_cap = max(1, int(line_cap))
+        self.entries = deque(maxlen=self.line_cap) # (timestamp, style, message)
+        self.log_file_path = None
+        self._file_logger = logging.getLogger(f"myappagent.session_log.{next(_logger_ids)}")
+        self._file_logger.propagate = False; self._file_logger.setLevel(logging.INFO)
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            self.log_file_path = os.path.join(log_dir, log_file_name)
+            handler = RotatingFileHandler(self.log_file_path, maxBytes=max_file_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(style)s %(message)s"))
+            self._file_logger.addHandler(handler)
+        except OSError: self.log_file_path = None # Keep the in-memory log working even if the disk isn't writable
+
+    def append(self, message, style: str = "", preview: bool = False) -> str:
+        """Records the full message and returns the text to render in the pane: the message itself, or with preview
+        (for debug lines) at most DISPLAY_PREVIEW_CHARS of it and a pointer to the log file. Replies and errors are
+        never shortened."""
+        message_str = str(message) if message is not None else ""
+        self.entries.append((time.time(), style, message_str))
+        if self._file_logger.handlers: self._file_logger.info(message_str, extra={"style": style or "-"})
+        return self.display_text(message_str) if preview else message_str
+
+    def display_text(self, message_str: str) -> str:
+        if len(message_str) <= DISPLAY_PREVIEW_CHARS: return message_str
+        hidden = len(message_str) - DISPLAY_PREVIEW_CHARS
+        return f"{message_str[:DISPLAY_PREVIEW_CHARS]}… [{hidden} more chars in {self.log_file_path or 'session log'}]"
+
+    def close(self):
+        for handler in list(self._file_logger.handlers): handler.close(); self._file_logger.removeHandler(handler)
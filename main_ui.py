@@ -4,6 +4,8 @@ from tkinter import ttk # Import ttk
 from tkinter import scrolledtext, font
 import os
 import sys
+import threading
+import queue
 
 try:
     # Assumes my_app_agent is in PYTHONPATH or script is run from project root
@@ -13,26 +15,36 @@ except ImportError:
     # This makes 'my_app_agent' directory (parent of 'ui') findable
     sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
     from agent import AgentCore
-
-# Attempt to import Pygments
 try:
-    from pygments import lex
-    from pygments.lexers import PythonLexer
-    from pygments.token import Token # Import Token for easier access to token types
-    PYGMENTS_AVAILABLE = True
-except ImportError:
-    PYGMENTS_AVAILABLE = False
-    # UI will log this message in __init__ if needed
+    from .log_buffer import SessionLog, DEFAULT_LINE_CAP
+    from .large_file import MappedScript, StaleMappingError, is_large_file
+    from .highlighting import HighlightCache
+except ImportError: # Running main_ui.py directly from the ui directory
+    from log_buffer import SessionLog, DEFAULT_LINE_CAP
+    from large_file import MappedScript, StaleMappingError, is_large_file
+    from highlighting import HighlightCache
 
 
 class MyAppAgentUI:
-    def __init__(self, root_tk_window):
+    RESULT_POLL_MS = 30 # How often the Tk loop checks for finished commands
+    _SAVE_SNAPSHOT = object() # Queued by on_close: the command thread saves the snapshot and stops
+    LARGE_FILE_LOAD_AHEAD = 0.85 # Load the next chunk once the view bottom passes this fraction of the loaded text
+    PREVIEW_DEBOUNCE_MS = 300 # Parse the input once typing pauses, not on every keystroke
+
+    def __init__(self, root_tk_window, log_line_cap: int = DEFAULT_LINE_CAP):
         self.root = root_tk_window
         self.root.title("MyAppAgent v0.7 - UI Polish") # Updated version
         self.root.geometry("950x750") # Slightly wider for two panes
         self.root.minsize(600, 400) # Set a minimum size
 
-        self.agent_core = AgentCore()
+        self.agent_core = AgentCore(snapshot=AgentCore.default_snapshot_path("tk")) # Resumes the last session's state and caches
+        self.session_log = SessionLog(line_cap=log_line_cap, log_file_name="tk_session.log") # Pane keeps the last N lines; full history on disk
+        # Commands run on a single worker thread (keeps AgentCore edits ordered); results come back via a queue
+        self._command_queue = queue.Queue(); self._result_queue = queue.Queue(); self._commands_in_flight = 0
+        self._snapshot_saved = threading.Event() # Set by the command thread after on_close's snapshot
+        self._command_thread = threading.Thread(target=self._command_worker, name="AgentCommandWorker", daemon=True)
+        self._command_thread.start()
+        self._preview_queue = queue.Queue(); self._preview_after_id = None # Speculative parses of the text being typed
         
         style = ttk.Style()
         available_themes = style.theme_names()
@@ -112,6 +124,11 @@ class MyAppAgentUI:
         self.input_entry.configure(style="Monospace.TEntry")
         self.input_entry.pack(side=tk.LEFT, padx=(0,10), expand=True, fill=tk.X) # Removed ipady, handle via style
         self.input_entry.bind("<Return>", self.on_send_command_event)
+        self.input_entry.bind("<Tab>", self.on_complete_input_event) # Completes script/class/method/function names
+        self.input_entry.bind("<KeyRelease>", self._update_completion_hint)
+        self.completion_hint_text = tk.StringVar(value="")
+        completion_hint_label = ttk.Label(self.root, textvariable=self.completion_hint_text, padding=(10, 0, 10, 0), foreground="gray")
+        completion_hint_label.pack(fill=tk.X, side=tk.BOTTOM)
 
         self.send_button = ttk.Button(input_frame, text="Send", command=self.on_send_command, style="Accent.TButton")
         try: 
@@ -120,13 +137,28 @@ class MyAppAgentUI:
             style.configure("Send.TButton", font=self.default_font, padding=(5,2)) # Fallback style name
             self.send_button.configure(style="Send.TButton")
         self.send_button.pack(side=tk.RIGHT)
+        self.intent_preview_text = tk.StringVar(value="")
+        intent_preview_label = ttk.Label(input_frame, textvariable=self.intent_preview_text, foreground="gray")
+        intent_preview_label.pack(side=tk.RIGHT, padx=(0, 10))
+        self.input_entry.bind("<KeyRelease>", self._schedule_intent_preview, add="+")
 
         self.setup_tags()
-        if not PYGMENTS_AVAILABLE: self.add_log_message("Pygments library not found. Syntax highlighting disabled.", "error_message")
         self.add_log_message("Welcome to MyAppAgent! UI Refined.", tag="info_message")
         self._update_code_view(script_content="// Python code will appear here.")
         self.input_entry.focus_set()
+        self.root.after(self.RESULT_POLL_MS, self._poll_command_results)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    SNAPSHOT_WAIT_S = 2.0 # How long closing waits for a running command before giving up on the snapshot
 
+    def on_close(self):
+        self._cancel_intent_preview()
+        try:
+            while True: self._command_queue.get_nowait() # Drop queued commands
+        except queue.Empty: pass
+        self._command_queue.put(self._SAVE_SNAPSHOT) # Saved on the command thread once the running command is done
+        if not self._snapshot_saved.wait(self.SNAPSHOT_WAIT_S): print("Warning: a command was still running; the session snapshot was not saved.", file=sys.stderr)
+        self.session_log.close(); self.root.destroy()
 
     def setup_tags(self):
         # Log area tags
@@ -138,90 +170,251 @@ class MyAppAgentUI:
         self.log_area.tag_configure("agent_response_default", foreground="black", font=self.default_font)
         self.log_area.tag_configure("debug_info", foreground="orange", font=(self.text_font.cget("family"), 8))
 
-        # Code view tags
-        base_code_fg = "#222222"
+        # Code view tags: code_<kind> for each highlighting token kind
+        base_code_fg = "#222222"; code_size = self.text_font.cget("size")
         self.code_view_area.tag_configure("code_default", font=self.text_font, foreground=base_code_fg)
         self.code_view_area.tag_configure("code_error", foreground="red", font=self.text_font)
-
-        if PYGMENTS_AVAILABLE:
-            self.code_view_area.tag_configure(str(Token.Keyword), foreground="#0000ff")
-            self.code_view_area.tag_configure(str(Token.Keyword.Constant), foreground="#0000ff")
-            self.code_view_area.tag_configure(str(Token.Keyword.Declaration), foreground="#0000ff")
-            self.code_view_area.tag_configure(str(Token.Keyword.Namespace), foreground="#0000ff", font=(self.code_font_family, self.text_font.cget("size"), "bold"))
-            self.code_view_area.tag_configure(str(Token.Keyword.Pseudo), foreground="#0000ff")
-            self.code_view_area.tag_configure(str(Token.Keyword.Type), foreground="#0000ff")
-            self.code_view_area.tag_configure(str(Token.Name.Class), foreground="#2b91af", font=(self.code_font_family, self.text_font.cget("size"), "bold"))
-            self.code_view_area.tag_configure(str(Token.Name.Function), foreground="#2b91af")
-            self.code_view_area.tag_configure(str(Token.Name.Builtin), foreground="#2b91af")
-            self.code_view_area.tag_configure(str(Token.Name.Builtin.Pseudo), foreground="#0000ff", font=(self.code_font_family, self.text_font.cget("size"), "bold")) # self
-            self.code_view_area.tag_configure(str(Token.Name.Decorator), foreground="#2b91af", font=(self.code_font_family, self.text_font.cget("size"), "italic"))
-            self.code_view_area.tag_configure(str(Token.Name.Exception), foreground="#9b2323", font=(self.code_font_family, self.text_font.cget("size"), "bold"))
-            self.code_view_area.tag_configure(str(Token.Name), foreground="#1f7199") 
-            self.code_view_area.tag_configure(str(Token.Literal.String), foreground="#a31515")
-            self.code_view_area.tag_configure(str(Token.Literal.String.Doc), foreground="#4F5D95", font=(self.code_font_family, self.text_font.cget("size"), "italic")) 
-            self.code_view_area.tag_configure(str(Token.Literal.Number.Integer), foreground="#098658")
-            self.code_view_area.tag_configure(str(Token.Literal.Number.Float), foreground="#098658")
-            self.code_view_area.tag_configure(str(Token.Literal.Number), foreground="#098658")
-            self.code_view_area.tag_configure(str(Token.Operator), foreground="#707070")
-            self.code_view_area.tag_configure(str(Token.Punctuation), foreground="#707070")
-            self.code_view_area.tag_configure(str(Token.Comment), foreground="#008000")
-            self.code_view_area.tag_configure(str(Token.Comment.Single), foreground="#008000")
-            self.code_view_area.tag_configure(str(Token.Text), foreground=base_code_fg)
-            self.code_view_area.tag_configure(str(Token.Error), background="red", foreground="white")
+        self.code_view_area.tag_configure("code_keyword", foreground="#0000ff")
+        self.code_view_area.tag_configure("code_pseudo_keyword", foreground="#0000ff", font=(self.code_font_family, code_size, "bold")) # self, None, True...
+        self.code_view_area.tag_configure("code_class_name", foreground="#2b91af", font=(self.code_font_family, code_size, "bold"))
+        self.code_view_area.tag_configure("code_func_name", foreground="#2b91af")
+        self.code_view_area.tag_configure("code_decorator", foreground="#2b91af", font=(self.code_font_family, code_size, "italic"))
+        self.code_view_area.tag_configure("code_string", foreground="#a31515")
+        self.code_view_area.tag_configure("code_docstring", foreground="#4F5D95", font=(self.code_font_family, code_size, "italic"))
+        self.code_view_area.tag_configure("code_number", foreground="#098658")
+        self.code_view_area.tag_configure("code_comment", foreground="#008000")
+        self.code_view_area.tag_configure("code_name", foreground="#1f7199") # name/builtin/exception/operator: only lexed with Pygments
+        self.code_view_area.tag_configure("code_builtin", foreground="#2b91af")
+        self.code_view_area.tag_configure("code_exception", foreground="#9b2323", font=(self.code_font_family, code_size, "bold"))
+        self.code_view_area.tag_configure("code_operator", foreground="#707070")
+        self.highlight_cache = HighlightCache() # Token streams by content hash: re-showing a script doesn't re-lex it
+        self._code_view_digest = None # Digest of the token stream on screen (None when not highlighted)
+        self._code_view_lines = []; self._code_view_path = None
+        self._large_file = None; self._large_file_load_pending = False # MappedScript while a large script is shown
+        self.code_view_area.configure(yscrollcommand=self._on_code_view_yscroll)
 
 
     def add_log_message(self, message: str, tag: str = None, on_new_line: bool = True):
+        display_text = self.session_log.append(message, tag or "", preview=tag == "debug_info")
         self.log_area.config(state=tk.NORMAL)
         if on_new_line and self.log_area.index('end-1c') != "1.0": self.log_area.insert(tk.END, "\n")
-        self.log_area.insert(tk.END, str(message) if message is not None else "", tag if tag else "agent_response_default")
+        self.log_area.insert(tk.END, display_text, tag if tag else "agent_response_default")
+        line_count = int(self.log_area.index('end-1c').split('.')[0])
+        if line_count > self.session_log.line_cap: self.log_area.delete('1.0', f"{line_count - self.session_log.line_cap + 1}.0") # Drop oldest lines
         self.log_area.see(tk.END); self.log_area.config(state=tk.DISABLED)
 
-    def _update_code_view(self, script_path: str = None, script_content: str = None):
+    def _stream_tag_ranges(self, stream, first: int, last: int) -> dict:
+        """{tag: [start, end, start, end, ...]} as Tk indices for the stream's lines [first, last)."""
+        ranges = {}
+        for line_index in range(first, last):
+            line_number = line_index + 1
+            for start, length, kind in stream.spans[line_index]:
+                indices = ranges.get(kind)
+                if indices is None: indices = ranges[kind] = []
+                indices.append(f"{line_number}.{start}"); indices.append(f"{line_number}.{start + length}")
+        return {f"code_{kind}": indices for kind, indices in ranges.items()}
+
+    def _apply_tag_ranges(self, ranges: dict):
+        for tag, indices in ranges.items(): self.code_view_area.tag_add(tag, *indices) # One Tcl call per tag
+
+    def _render_code_view_full(self, content: str, stream, is_error: bool):
+        self.code_view_area.delete('1.0', tk.END)
+        self.code_view_area.insert('1.0', content, "code_error" if is_error else "code_default")
+        if stream is not None: self._apply_tag_ranges(self._stream_tag_ranges(stream, 0, len(stream.lines)))
+        self.code_view_area.see("1.0")
+
+    def _apply_stream_change(self, stream) -> bool:
+        """Re-renders only the lines `stream` changed relative to the version on screen.
+        Returns False if it wasn't derived from that version (or most of the file changed), so the caller re-renders."""
+        if stream.change is None or stream.change[0] != self._code_view_digest: return False
+        _, first, old_end, new_end = stream.change
+        if (new_end - first) * 2 > len(stream.lines): return False
+        new_text = "\n".join(stream.lines[first:new_end])
+        if old_end < len(self._code_view_lines): # Unchanged lines follow: replace whole lines including their newlines
+            self.code_view_area.delete(f"{first + 1}.0", f"{old_end + 1}.0")
+            if new_end > first: self.code_view_area.insert(f"{first + 1}.0", new_text + "\n", "code_default")
+        elif first: # The change runs to the end of the file
+            self.code_view_area.delete(f"{first}.end", "end-1c")
+            if new_end > first: self.code_view_area.insert(f"{first}.end", "\n" + new_text, "code_default")
+        else:
+            self.code_view_area.delete("1.0", "end-1c"); self.code_view_area.insert("1.0", new_text, "code_default")
+        self._apply_tag_ranges(self._stream_tag_ranges(stream, first, new_end))
+        return True
+
+    def _apply_script_patch(self, patch: dict) -> bool:
+        """Applies a generator line-range patch (results["script_patch"]) to the displayed script in place.
+        Returns False when the view doesn't show that script's pre-edit content, so the caller reloads."""
+        if not patch or self._code_view_digest is None or self._code_view_path != patch["path"] or len(self._code_view_lines) != patch["old_line_count"]: return False
+        if self._code_view_digest.hex() != patch["base_digest"]: return False # Same line count, different text (outside edit, other session)
+        old_lines = self._code_view_lines; start, old_end = patch["start_line"], patch["old_end_line"]
+        stream = self.highlight_cache.tokenize("\n".join(old_lines[:start] + patch["new_lines"] + old_lines[old_end:]), key=self._code_view_path)
+        self.code_view_area.config(state=tk.NORMAL)
+        applied = self._apply_stream_change(stream)
+        self.code_view_area.config(state=tk.DISABLED)
+        if applied: self._code_view_digest = stream.digest; self._code_view_lines = stream.lines
+        return applied
+
+    def _open_large_file(self, script_path: str, min_lines: int = 0):
+        """Large-file mode: maps the script and shows it a chunk at a time without highlighting."""
+        self._close_large_file()
+        try: large_file = MappedScript(script_path)
+        except OSError as e: self._update_code_view(script_content=f"// Error reading script {script_path}: {e}"); return
+        self._large_file = large_file
         self.code_view_area.config(state=tk.NORMAL); self.code_view_area.delete('1.0', tk.END)
-        content_to_display = None
-        if script_path:
+        self._code_view_digest = None; self._code_view_lines = []; self._code_view_path = large_file.path
+        while not large_file.exhausted and (not large_file.lines_read or large_file.lines_read < min_lines):
+            self.code_view_area.insert(tk.END, large_file.read_next_chunk(), "code_default")
+        self.code_view_area.config(state=tk.DISABLED)
+        if not min_lines: self.code_view_area.see("1.0")
+
+    def _close_large_file(self):
+        if self._large_file is not None: self._large_file.close(); self._large_file = None
+
+    def _on_code_view_yscroll(self, first, last):
+        self.code_view_area.vbar.set(first, last)
+        if self._large_file is not None and not self._large_file.exhausted and not self._large_file_load_pending and float(last) >= self.LARGE_FILE_LOAD_AHEAD:
+            self._large_file_load_pending = True; self.root.after_idle(self._load_more_large_file) # Not from inside the scroll callback
+
+    def _load_more_large_file(self):
+        self._large_file_load_pending = False
+        if self._large_file is None: return
+        try: chunk = self._large_file.read_next_chunk()
+        except StaleMappingError: # Rewritten on disk: remap and reload as far as we had got, keeping the view where it was
+            top = self.code_view_area.yview()[0]; lines_read = self._large_file.lines_read
+            self._open_large_file(self._large_file.path, min_lines=lines_read); self.code_view_area.yview_moveto(top)
+            return
+        self.code_view_area.config(state=tk.NORMAL)
+        self.code_view_area.insert(tk.END, chunk, "code_default")
+        self.code_view_area.config(state=tk.DISABLED)
+
+    def _update_code_view(self, script_path: str = None, script_content: str = None):
+        if script_content is None and script_path and is_large_file(script_path): self._open_large_file(script_path); return
+        self._close_large_file()
+        content_to_display = None; is_error = False
+        if script_content is not None: content_to_display = script_content # Already read (e.g. by the command worker)
+        elif script_path:
             try:
-                with open(script_path, "r") as f: content_to_display = f.read()
-            except FileNotFoundError: self.code_view_area.insert(tk.END, f"// Error: Could not find script {script_path}", "code_error")
-            except Exception as e: self.code_view_area.insert(tk.END, f"// Error reading script {script_path}: {e}", "code_error")
-        elif script_content is not None: content_to_display = script_content
-        
-        if content_to_display is None and script_path : # Error already printed by try/except
-            self.code_view_area.config(state=tk.DISABLED); self.code_view_area.see("1.0"); return
+                with open(script_path, "r", encoding="utf-8") as f: content_to_display = f.read()
+            except FileNotFoundError: content_to_display = f"// Error: Could not find script {script_path}"; is_error = True
+            except Exception as e: content_to_display = f"// Error reading script {script_path}: {e}"; is_error = True
         if content_to_display is None : content_to_display = "// No active script or script content to display."
+        is_error = is_error or content_to_display.startswith("// Error:")
 
-        if PYGMENTS_AVAILABLE and self.agent_core.active_language == "python" and content_to_display and not content_to_display.startswith("// Error:") :
-            lexer = PythonLexer()
-            for token_type, value in lex(content_to_display, lexer):
-                tag_to_apply = str(token_type); current_type = token_type
-                while not self.code_view_area.tag_cget(tag_to_apply, "foreground") and current_type.parent:
-                    current_type = current_type.parent; tag_to_apply = str(current_type)
-                if not self.code_view_area.tag_cget(tag_to_apply, "foreground"): tag_to_apply = "code_default"
-                self.code_view_area.insert(tk.END, value, tag_to_apply)
-        else: self.code_view_area.insert(tk.END, content_to_display, "code_default" if not content_to_display.startswith("// Error:") else "code_error")
-        self.code_view_area.config(state=tk.DISABLED); self.code_view_area.see("1.0")
+        code_view_path = os.path.abspath(script_path) if script_path and not is_error else None
+        highlight = bool(self.agent_core.active_language == "python" and content_to_display and not is_error)
+        stream = self.highlight_cache.tokenize(content_to_display, key=code_view_path) if highlight else None
+        if stream is not None and stream.digest == self._code_view_digest: self._code_view_path = code_view_path; return # Nothing changed
+        self.code_view_area.config(state=tk.NORMAL)
+        if stream is None or not self._apply_stream_change(stream): self._render_code_view_full(content_to_display, stream, is_error)
+        self.code_view_area.config(state=tk.DISABLED)
+        self._code_view_digest = stream.digest if stream is not None else None
+        self._code_view_lines = stream.lines if stream is not None else content_to_display.split("\n")
+        self._code_view_path = code_view_path
 
     def on_send_command(self):
         user_input = self.input_entry.get()
         if not user_input.strip(): return
-        self.add_log_message(f"> {user_input}", tag="user_input")
-        self.input_entry.delete(0, tk.END); self.input_entry.focus_set()
-        results = self.agent_core.process_command(user_input)
+        queued_note = "  (queued)" if self._commands_in_flight else ""
+        self.add_log_message(f"> {user_input}{queued_note}", tag="user_input")
+        self.input_entry.delete(0, tk.END); self.input_entry.focus_set(); self.completion_hint_text.set("")
+        self._cancel_intent_preview()
+        self._commands_in_flight += 1; self.send_button.state(["disabled"])
+        self._command_queue.put(user_input) # Enter keeps working while busy; commands run in the order typed
+
+    def _command_worker(self):
+        while True:
+            user_input = self._command_queue.get()
+            if user_input is self._SAVE_SNAPSHOT: self.agent_core.save_snapshot(); self._snapshot_saved.set(); return # The next launch resumes warm
+            script_content = None
+            try:
+                results = self.agent_core.process_command(user_input)
+                display_path = results.get("script_to_display_path")
+                if display_path and not results.get("script_patch") and not is_large_file(display_path): # Patched in place / mapped by the UI
+                    try:
+                        with open(display_path, "r", encoding="utf-8") as f: script_content = f.read()
+                    except Exception: script_content = None # _update_code_view reports the read error on the UI thread
+            except Exception as e:
+                results = {"main_response": f"Error processing command: {type(e).__name__} - {e}", "debug_info": "", "status": "error",
+                           "script_to_display_path": None, "active_language": self.agent_core.active_language, "current_script_name": self.agent_core.current_script_name}
+            self._result_queue.put((results, script_content))
+
+    def _poll_command_results(self):
+        try:
+            while True: self._handle_command_results(*self._result_queue.get_nowait())
+        except queue.Empty: pass
+        try:
+            while True: self._show_intent_preview(*self._preview_queue.get_nowait())
+        except queue.Empty: pass
+        self.root.after(self.RESULT_POLL_MS, self._poll_command_results)
+
+    def _handle_command_results(self, results: dict, script_content: str = None):
+        self._commands_in_flight -= 1
+        if not self._commands_in_flight: self.send_button.state(["!disabled"])
         response_tag = "agent_response_default"
         if results.get("status") == "error": response_tag = "error_message"
         elif results.get("status") == "success": response_tag = "success_message"
         elif results.get("status") == "clarification_needed": response_tag = "clarification_message"
         if results.get("main_response"): self.add_log_message(results["main_response"], tag=response_tag)
         if results.get("debug_info"): self.add_log_message(f"DEBUG: {results['debug_info']}", tag="debug_info")
-        if results.get("script_to_display_path"): self._update_code_view(script_path=results["script_to_display_path"])
+        if results.get("script_to_display_path"):
+            if self._apply_script_patch(results.get("script_patch")): pass
+            elif script_content is not None: self._update_code_view(script_path=results["script_to_display_path"], script_content=script_content)
+            else: self._update_code_view(script_path=results["script_to_display_path"])
         elif not results.get("current_script_name"): self._update_code_view(script_content="// No active script or script content to display.")
         self.lang_label_text.set(f"Language: {results['active_language']}")
         self.script_label_text.set(f"Script: {results['current_script_name'] or 'None'}")
-        self.root.update_idletasks()
 
 
     def on_send_command_event(self, event): self.on_send_command(); return "break"
 
+    def _cancel_intent_preview(self):
+        if self._preview_after_id is not None: self.root.after_cancel(self._preview_after_id); self._preview_after_id = None
+        self.intent_preview_text.set("")
+
+    def _schedule_intent_preview(self, event=None):
+        if event is not None and event.keysym == "Return": return # Send clears it
+        self._cancel_intent_preview()
+        if self.input_entry.get().strip(): self._preview_after_id = self.root.after(self.PREVIEW_DEBOUNCE_MS, self._start_intent_preview)
+
+    def _start_intent_preview(self):
+        self._preview_after_id = None
+        user_input = self.input_entry.get() # Exactly what on_send_command will send, so AgentCore reuses the cached parse
+        def parse():
+            try: preview = self.agent_core.preview_intent(user_input)
+            except Exception as e: preview = {"intent": "unknown", "target": f"({type(e).__name__})"}
+            self._preview_queue.put((user_input, preview))
+        threading.Thread(target=parse, name="IntentPreview", daemon=True).start()
+
+    def _show_intent_preview(self, user_input: str, preview: dict):
+        if user_input != self.input_entry.get(): return # Typing moved on; a newer preview is scheduled
+        target = f" \u2192 {preview['target']}" if preview.get("target") else ""
+        self.intent_preview_text.set(f"{preview.get('intent')}{target}")
+
+    def _input_completion(self):
+        """(cursor, completion) for the text left of the cursor; names come from AgentCore's in-memory index."""
+        cursor = self.input_entry.index(tk.INSERT)
+        return cursor, self.agent_core.complete_input(self.input_entry.get()[:cursor])
+
+    def _update_completion_hint(self, event=None):
+        if event is not None and event.keysym in ("Tab", "Return"): return
+        cursor, completion = self._input_completion()
+        if completion is None or not completion[2] or completion[1] == cursor: self.completion_hint_text.set(""); return
+        kind, _, names = completion
+        self.completion_hint_text.set(f"Tab: {kind} " + "  ".join(names))
+
+    def on_complete_input_event(self, event):
+        cursor, completion = self._input_completion()
+        if completion is None or not completion[2]: return "break" # Keep focus in the entry
+        _, start, names = completion
+        if len(names) == 1: replacement = names[0]
+        else: # Extend to the longest prefix all candidates share (matching is case-insensitive)
+            common = os.path.commonprefix([name.lower() for name in names]); replacement = names[0][:len(common)]
+        typed = self.input_entry.get()[start:cursor]
+        if len(replacement) > len(typed) or (len(names) == 1 and replacement != typed):
+            self.input_entry.delete(start, cursor); self.input_entry.insert(start, replacement)
+        self._update_completion_hint()
+        return "break"
+
 if __name__ == "__main__":
     app_root_window = tk.Tk()
     ui = MyAppAgentUI(app_root_window)
@@ -7,7 +7,16 @@ try:
     from my_app_agent.agent import AgentCore
 except ImportError:
     sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-    from my_app_agent.agent import AgentCore
+    try: from my_app_agent.agent import AgentCore
+    except ImportError: from agent import AgentCore # Flat checkout, agent.py importable from sys.path (as main_ui.py falls back to)
+try:
+    from .log_buffer import SessionLog, DEFAULT_LINE_CAP, HTML_STYLE
+    from .large_file import MappedScript, StaleMappingError, is_large_file
+    from .highlighting import HighlightCache, STATE_NORMAL, content_digest
+except ImportError: # Running main_ui_pyside.py directly from the ui directory
+    from log_buffer import SessionLog, DEFAULT_LINE_CAP, HTML_STYLE
+    from large_file import MappedScript, StaleMappingError, is_large_file
+    from highlighting import HighlightCache, STATE_NORMAL, content_digest
 
 DARK_THEME_QSS = """
 QMainWindow, QWidget {
@@ -102,135 +111,171 @@ QScrollBar::add-page:horizontal, QScrollBar::sub-page:horizontal { background: n
 """
 
 class PythonSyntaxHighlighter(QtGui.QSyntaxHighlighter):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, highlight_cache: HighlightCache = None):
         super().__init__(parent)
-        self.highlighting_rules = [] 
+        self.highlight_cache = highlight_cache or HighlightCache()
+        self._token_stream = None # Stream of the text last loaded into the document, see set_token_stream()
 
         # Default text format (used by Pygments Token.Text or unstyled code)
         self.default_text_format = QtGui.QTextCharFormat()
         self.default_text_format.setForeground(QtGui.QColor("#D4D4D4")) # Off-white, matches QTextEdit text color
 
-        # Keyword format
         keyword_format = QtGui.QTextCharFormat()
         keyword_format.setForeground(QtGui.QColor("#569CD6")) # Brighter Blue/Cyan
         keyword_format.setFontWeight(QtGui.QFont.Weight.Bold)
-        keywords = ["\\bdef\\b", "\\bclass\\b", "\\bif\\b", "\\belif\\b", "\\belse\\b", "\\bfor\\b", "\\bin\\b", 
-                    "\\bwhile\\b", "\\btry\\b", "\\bexcept\\b", "\\bfinally\\b", "\\bpass\\b", "\\bbreak\\b", 
-                    "\\bcontinue\\b", "\\breturn\\b", "\\byield\\b", "\\bimport\\b", "\\bfrom\\b", 
-                    "\\bas\\b", "\\bwith\\b", "\\bassert\\b", "\\bdel\\b", "\\bglobal\\b", 
-                    "\\bnonlocal\\b", "\\blambda\\b", "\\bis\\b", "\\bnot\\b", "\\band\\b", "\\bor\\b"]
-        for word in keywords:
-            self.highlighting_rules.append({'pattern': QtCore.QRegularExpression(word), 'format': keyword_format, 'group': 0})
 
         pseudo_keywords_format = QtGui.QTextCharFormat()
         pseudo_keywords_format.setForeground(QtGui.QColor("#C586C0")) # Magenta
         pseudo_keywords_format.setFontWeight(QtGui.QFont.Weight.Bold)
-        pseudo_keywords = ["\\bNone\\b", "\\bTrue\\b", "\\bFalse\\b", "\\bself\\b", "\\bcls\\b"]
-        for word in pseudo_keywords:
-            self.highlighting_rules.append({'pattern': QtCore.QRegularExpression(word), 'format': pseudo_keywords_format, 'group': 0})
 
         class_def_format = QtGui.QTextCharFormat()
         class_def_format.setForeground(QtGui.QColor("#4EC9B0")); class_def_format.setFontWeight(QtGui.QFont.Weight.Bold) # Teal
-        self.highlighting_rules.append({'pattern': QtCore.QRegularExpression("\\bclass\\s+([A-Za-z_][A-Za-z0-9_]*)"), 'format': class_def_format, 'group': 1})
 
         func_def_format = QtGui.QTextCharFormat()
         func_def_format.setForeground(QtGui.QColor("#DCDCAA")) # Yellowish
-        self.highlighting_rules.append({'pattern': QtCore.QRegularExpression("\\bdef\\s+([A-Za-z_][A-Za-z0-9_]*)\\s*\\("), 'format': func_def_format, 'group': 1})
         
         decorator_format = QtGui.QTextCharFormat()
         decorator_format.setForeground(QtGui.QColor("#DCDCAA")); decorator_format.setFontItalic(True) # Yellowish Italic
-        self.highlighting_rules.append({'pattern': QtCore.QRegularExpression("@[A-Za-z0-9_.]+"), 'format': decorator_format, 'group': 0})
 
         string_format = QtGui.QTextCharFormat()
         string_format.setForeground(QtGui.QColor("#CE9178")) # Light Orange/Brown
-        self.highlighting_rules.append({'pattern': QtCore.QRegularExpression("'.*?'"), 'format': string_format, 'group': 0})
-        self.highlighting_rules.append({'pattern': QtCore.QRegularExpression("\".*?\""), 'format': string_format, 'group': 0})
         
-        self.docstring_format = QtGui.QTextCharFormat() # Store as member for multi-line
+        self.docstring_format = QtGui.QTextCharFormat() # Multi-line strings/docstrings
         self.docstring_format.setForeground(QtGui.QColor("#6A9955")); self.docstring_format.setFontItalic(True) # Green Italic
-        self.tri_single_start_expression = QtCore.QRegularExpression("'''")
-        self.tri_double_start_expression = QtCore.QRegularExpression("\"\"\"")
-        self.tri_single_end_expression = QtCore.QRegularExpression("'''") # Used for finding end in block
-        self.tri_double_end_expression = QtCore.QRegularExpression("\"\"\"") # Used for finding end in block
-
 
         comment_format = QtGui.QTextCharFormat()
         comment_format.setForeground(QtGui.QColor("#6A9955")); comment_format.setFontItalic(True) # Green Italic
-        self.highlighting_rules.append({'pattern': QtCore.QRegularExpression("#[^\\n]*"), 'format': comment_format, 'group': 0})
 
         number_format = QtGui.QTextCharFormat()
         number_format.setForeground(QtGui.QColor("#B5CEA8")) # Light Green/Blue
-        self.highlighting_rules.append({'pattern': QtCore.QRegularExpression("\\b[0-9]+\\.?[0-9]*[eE]?[-+]?[0-9]*\\b"), 'format': number_format, 'group': 0}) 
-        self.highlighting_rules.append({'pattern': QtCore.QRegularExpression("\\b0[xX][0-9a-fA-F]+\\b"), 'format': number_format, 'group': 0})
+
+        name_format = QtGui.QTextCharFormat() # name/builtin/exception/operator come only from the Pygments lexer
+        name_format.setForeground(QtGui.QColor("#9CDCFE")) # Light Blue
+
+        builtin_format = QtGui.QTextCharFormat()
+        builtin_format.setForeground(QtGui.QColor("#4EC9B0")) # Teal
+
+        exception_format = QtGui.QTextCharFormat()
+        exception_format.setForeground(QtGui.QColor("#4EC9B0")); exception_format.setFontWeight(QtGui.QFont.Weight.Bold) # Teal
+
+        operator_format = QtGui.QTextCharFormat()
+        operator_format.setForeground(QtGui.QColor("#B4B4B4")) # Light Gray
+
+        self.kind_formats = {"name": name_format, "builtin": builtin_format, "exception": exception_format, "operator": operator_format,
+                             "comment": comment_format, "string": string_format, "decorator": decorator_format, "docstring": self.docstring_format,
+                             "keyword": keyword_format, "pseudo_keyword": pseudo_keywords_format, "number": number_format,
+                             "class_name": class_def_format, "func_name": func_def_format}
+
+    def set_token_stream(self, stream):
+        """Blocks matching this stream (same text, same entry state) take their tokens from it instead of being scanned."""
+        self._token_stream = stream
+
+    @staticmethod
+    def _to_utf16_spans(text: str, spans: list) -> list:
+        """setFormat counts UTF-16 code units; shift offsets past characters outside the BMP."""
+        astral = [i for i, ch in enumerate(text) if ord(ch) > 0xFFFF]
+        def shift(offset): # Number of astral characters before offset
+            lo, hi = 0, len(astral)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if astral[mid] < offset: lo = mid + 1
+                else: hi = mid
+            return lo
+        return [(start + shift(start), length + shift(start + length) - shift(start), fmt) for start, length, fmt in spans]
 
     def highlightBlock(self, text):
-        # Apply single-line rules first
-        for rule in self.highlighting_rules:
-            expression = rule['pattern']
-            it = expression.globalMatch(text)
-            while it.hasNext():
-                match = it.next()
-                start = match.capturedStart(rule['group'])
-                length = match.capturedLength(rule['group'])
-                if start >= 0 : 
-                    self.setFormat(start, length, rule['format'])
-        
-        # Multi-line string/docstring handling
-        self.setCurrentBlockState(0) # Default state = 0 (normal code)
-                                    # State 1 = in triple-single-quote string
-                                    # State 2 = in triple-double-quote string
-        # Triple single quotes
-        startIndex = 0
-        if self.previousBlockState() != 1:
-            match = self.tri_single_start_expression.match(text)
-            startIndex = match.capturedStart() if match.hasMatch() else -1
-        
-        while startIndex >= 0:
-            match_end = self.tri_single_end_expression.match(text, startIndex + 3) # Look for end from after start
-            endIndex = match_end.capturedStart() if match_end.hasMatch() else -1
-            length = 0
-            if endIndex == -1: # Does not end in this block
-                self.setCurrentBlockState(1) 
-                length = len(text) - startIndex
-            else: # Ends in this block
-                length = endIndex - startIndex + 3
-            self.setFormat(startIndex, length, self.docstring_format)
-            # Find next start after current one ends
-            match_next_start = self.tri_single_start_expression.match(text, startIndex + length)
-            startIndex = match_next_start.capturedStart() if match_next_start.hasMatch() else -1
-
-        # Triple double quotes (similar logic, ensure state is different)
-        startIndex = 0
-        if self.previousBlockState() != 2:
-            match = self.tri_double_start_expression.match(text)
-            startIndex = match.capturedStart() if match.hasMatch() else -1
-        
-        while startIndex >= 0:
-            match_end = self.tri_double_end_expression.match(text, startIndex + 3)
-            endIndex = match_end.capturedStart() if match_end.hasMatch() else -1
-            length = 0
-            if endIndex == -1:
-                self.setCurrentBlockState(2) 
-                length = len(text) - startIndex
-            else:
-                length = endIndex - startIndex + 3
-            self.setFormat(startIndex, length, self.docstring_format)
-            match_next_start = self.tri_double_start_expression.match(text, startIndex + length)
-            startIndex = match_next_start.capturedStart() if match_next_start.hasMatch() else -1
+        previous_state = max(self.previousBlockState(), STATE_NORMAL) # -1 for the first block
+        stream = self._token_stream; block_number = self.currentBlock().blockNumber()
+        if stream is not None and block_number < len(stream.lines) and stream.lines[block_number] == text and stream.start_state(block_number) == previous_state:
+            spans = stream.spans[block_number]; state = stream.states[block_number]
+        else: spans, state = self.highlight_cache.scan_line(text, previous_state) # Edited in place since, or no stream
+        if not text.isascii() and any(ord(ch) > 0xFFFF for ch in text): spans = self._to_utf16_spans(text, spans)
+        kind_formats = self.kind_formats
+        for start, length, kind in spans: self.setFormat(start, length, kind_formats[kind])
+        self.setCurrentBlockState(state)
+
+class CommandWorkerSignals(QtCore.QObject):
+    finished = QtCore.Signal(int, object, object) # command id, results dict, script content (or None)
+    failed = QtCore.Signal(int, str)
+
+class CommandRunnable(QtCore.QRunnable):
+    """Runs one AgentCore command (and reads the script it touched) on a pool thread."""
+    def __init__(self, agent_core, command_id: int, user_input: str):
+        super().__init__()
+        self.agent_core = agent_core; self.command_id = command_id; self.user_input = user_input
+        self.signals = CommandWorkerSignals()
+        self.setAutoDelete(False) # The UI keeps a reference so queued commands can be taken back (cancelled)
+
+    def run(self):
+        try:
+            results = self.agent_core.process_command(self.user_input)
+            script_content = None
+            display_path = results.get("script_to_display_path")
+            if display_path and not results.get("script_patch") and not is_large_file(display_path): # Patched in place / mapped by the UI
+                try:
+                    with open(display_path, "r", encoding='utf-8') as f: script_content = f.read()
+                except Exception: script_content = None # _update_code_view_area reports the read error on the GUI thread
+            self.signals.finished.emit(self.command_id, results, script_content)
+        except Exception as e:
+            self.signals.failed.emit(self.command_id, f"Error processing command: {type(e).__name__} - {e}")
+
+class ScriptSelectionSignals(QtCore.QObject):
+    selected = QtCore.Signal(str, str) # active language, current script name
+
+class ScriptSelectionRunnable(QtCore.QRunnable):
+    """Makes a file picked in the tree the current script. Queued on the command pool like a command, so it never
+    changes AgentCore's state under a command that is running."""
+    def __init__(self, agent_core, file_name: str):
+        super().__init__()
+        self.agent_core = agent_core; self.file_name = file_name; self.signals = ScriptSelectionSignals()
+        self.setAutoDelete(False) # Kept in _selection_runnables until its signal has been delivered
+
+    def run(self): self.signals.selected.emit(*self.agent_core.select_script(self.file_name))
+
+class ScriptChangeRunnable(QtCore.QRunnable):
+    """Forgets AgentCore's caches for scripts changed on disk. Queued on the command pool, so the file reads, re-parses
+    and lock waits happen off the GUI thread and never under a running command."""
+    def __init__(self, agent_core, script_paths: list):
+        super().__init__()
+        self.agent_core = agent_core; self.script_paths = script_paths
+
+    def run(self):
+        try: self.agent_core.forget_changed_scripts(self.script_paths)
+        except Exception as e: print(f"Warning: could not refresh caches for changed scripts: {e}", file=sys.stderr)
+
+class IntentPreviewSignals(QtCore.QObject):
+    ready = QtCore.Signal(str, dict) # input text, AgentCore.preview_intent() result
+
+class IntentPreviewRunnable(QtCore.QRunnable):
+    """Parses the text being typed off the GUI thread (AgentCore caches the parse for when it is sent)."""
+    def __init__(self, agent_core, user_input: str):
+        super().__init__()
+        self.agent_core = agent_core; self.user_input = user_input; self.signals = IntentPreviewSignals()
+
+    def run(self):
+        try: preview = self.agent_core.preview_intent(self.user_input)
+        except Exception as e: preview = {"intent": "unknown", "target": f"({type(e).__name__})"}
+        self.signals.ready.emit(self.user_input, preview)
 
 class MyAppAgentPysideUI(QtWidgets.QMainWindow): # ... (rest of the class as before, with init_fonts_and_styles and highlighter instantiation)
-    def __init__(self):
+    def __init__(self, log_line_cap: int = DEFAULT_LINE_CAP):
         super().__init__()
-        self.agent_core = AgentCore()
+        self.agent_core = AgentCore(snapshot=AgentCore.default_snapshot_path("pyside")) # Resumes the last session's state and caches
+        self.session_log = SessionLog(line_cap=log_line_cap, log_file_name="pyside_session.log") # Pane keeps the last N entries; full history on disk
+        self.command_pool = QtCore.QThreadPool(self); self.command_pool.setMaxThreadCount(1) # One at a time: AgentCore edits stay ordered
+        self._command_runnables = {}; self._next_command_id = 0 # id -> CommandRunnable, queued or running
+        self._selection_runnables = [] # ScriptSelectionRunnables queued behind the commands
+        self._displayed_script_path = None
+        self._large_file = None; self._large_file_load_pending = False # MappedScript while a large script is shown
         self.setWindowTitle("MyAppAgent v1.0 - Dark Theme & Syntax Highlighting") 
         self.setGeometry(100, 100, 1200, 800) 
         self.setMinimumSize(800, 600)
         self.init_fonts_and_styles() 
         self.init_ui()
         self._update_context_labels() 
-        if not PYGMENTS_AVAILABLE: self._add_log_message("Pygments library not found. QSyntaxHighlighter used instead.", color="orange") # Inform about highlighter
         self._add_log_message("Welcome to MyAppAgent! Dark theme applied.", color="cyan", is_html=True) # Use HTML for cyan
         self._update_code_view_area(script_content="// Python code will appear here with syntax highlighting.")
+        self.init_script_watcher()
         self.input_entry.setFocus()
 
     def init_fonts_and_styles(self):
@@ -264,68 +309,285 @@ class MyAppAgentPysideUI(QtWidgets.QMainWindow): # ... (rest of the class as bef
         cv_layout = QtWidgets.QVBoxLayout(code_view_container); cv_layout.setContentsMargins(2,2,2,2)
         cv_label = QtWidgets.QLabel("Code View"); cv_label.setFont(QtGui.QFont(self.default_font_family, 10, QtGui.QFont.Weight.Bold)); cv_layout.addWidget(cv_label)
         self.code_view_area = QtWidgets.QTextEdit(); self.code_view_area.setReadOnly(True); self.code_view_area.setFont(self.code_view_font) 
-        self.python_highlighter = PythonSyntaxHighlighter(self.code_view_area.document()) 
+        self.highlight_cache = HighlightCache() # Token streams by content hash: re-showing a script doesn't re-lex it
+        self.python_highlighter = PythonSyntaxHighlighter(self.code_view_area.document(), self.highlight_cache)
+        self.code_view_area.verticalScrollBar().valueChanged.connect(self._on_code_view_scrolled)
         cv_layout.addWidget(self.code_view_area); self.code_log_splitter.addWidget(code_view_container)
         log_view_container = QtWidgets.QFrame(); log_view_container.setFrameShape(QtWidgets.QFrame.Shape.StyledPanel)
         lv_layout = QtWidgets.QVBoxLayout(log_view_container); lv_layout.setContentsMargins(2,2,2,2)
         lv_label = QtWidgets.QLabel("Log / Console"); lv_label.setFont(QtGui.QFont(self.default_font_family, 10, QtGui.QFont.Weight.Bold)); lv_layout.addWidget(lv_label)
         self.log_area = QtWidgets.QTextEdit(); self.log_area.setReadOnly(True); self.log_area.setFont(self.log_font) 
+        self.log_area.document().setMaximumBlockCount(self.session_log.line_cap) # Qt drops the oldest blocks itself
         lv_layout.addWidget(self.log_area); self.code_log_splitter.addWidget(log_view_container)
         self.code_log_splitter.setSizes([int(self.geometry().height() * 0.6), int(self.geometry().height() * 0.4)]) 
         self.main_splitter.addWidget(right_side_container); self.main_splitter.setSizes([int(self.geometry().width() * 0.25), int(self.geometry().width() * 0.75)]) 
         input_widget = QtWidgets.QWidget(); input_layout = QtWidgets.QHBoxLayout(input_widget); input_layout.setContentsMargins(5,5,5,5) 
         self.input_entry = QtWidgets.QLineEdit(); self.input_entry.setFont(self.input_font)
         self.input_entry.returnPressed.connect(self.on_send_command) 
+        self.input_completer = QtWidgets.QCompleter(self); self.input_completion_model = QtCore.QStringListModel(self)
+        self.input_completer.setModel(self.input_completion_model); self.input_completer.setWidget(self.input_entry)
+        self.input_completer.setCaseSensitivity(QtCore.Qt.CaseSensitivity.CaseInsensitive)
+        self.input_completer.activated[str].connect(self._insert_input_completion); self._completion_word_start = 0
+        self.input_entry.textEdited.connect(self._update_input_completions)
+        self.intent_preview_label = QtWidgets.QLabel(""); self.intent_preview_label.setFont(self.default_font); self.intent_preview_label.setStyleSheet("color: gray;")
+        self.preview_pool = QtCore.QThreadPool(self); self.preview_pool.setMaxThreadCount(1) # Never queued behind a running command
+        self.preview_debounce_timer = QtCore.QTimer(self); self.preview_debounce_timer.setSingleShot(True); self.preview_debounce_timer.setInterval(self.PREVIEW_DEBOUNCE_MS)
+        self.preview_debounce_timer.timeout.connect(self._start_intent_preview)
+        self.input_entry.textChanged.connect(self._on_input_text_changed)
         self.send_button = QtWidgets.QPushButton("Send"); self.send_button.setFont(self.default_font)
         self.send_button.clicked.connect(self.on_send_command) 
-        input_layout.addWidget(self.input_entry); input_layout.addWidget(self.send_button)
+        self.busy_indicator = QtWidgets.QProgressBar(); self.busy_indicator.setRange(0, 0); self.busy_indicator.setMaximumWidth(90); self.busy_indicator.setTextVisible(False); self.busy_indicator.setVisible(False)
+        self.cancel_button = QtWidgets.QPushButton("Cancel queued"); self.cancel_button.setFont(self.default_font); self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.on_cancel_queued_commands)
+        input_layout.addWidget(self.input_entry); input_layout.addWidget(self.intent_preview_label); input_layout.addWidget(self.busy_indicator); input_layout.addWidget(self.send_button); input_layout.addWidget(self.cancel_button)
         main_layout.addWidget(input_widget)
 
+    PREVIEW_DEBOUNCE_MS = 300 # Parse once typing pauses, not on every keystroke
+
+    def _on_input_text_changed(self, text: str):
+        self.intent_preview_label.setText("")
+        if text.strip(): self.preview_debounce_timer.start()
+        else: self.preview_debounce_timer.stop()
+
+    def _start_intent_preview(self):
+        text = self.input_entry.text().strip() # Exactly what on_send_command will send, so the cached parse is reused
+        if not text: return
+        runnable = IntentPreviewRunnable(self.agent_core, text); runnable.signals.ready.connect(self._on_intent_preview_ready)
+        self.preview_pool.start(runnable)
+
+    def _on_intent_preview_ready(self, text: str, preview: dict):
+        if text != self.input_entry.text().strip(): return # Typing moved on; a newer preview is on its way
+        target = f" \u2192 {preview['target']}" if preview.get("target") else ""
+        self.intent_preview_label.setText(f"{preview.get('intent')}{target}")
+        self.intent_preview_label.setStyleSheet("color: #cc6666;" if preview.get("intent") == "unknown" else "color: gray;")
+
+    def _update_input_completions(self, text: str):
+        """Offers script/class/method/function names for the word being typed; served from AgentCore's in-memory index."""
+        cursor = self.input_entry.cursorPosition()
+        completion = self.agent_core.complete_input(text[:cursor])
+        if completion is None or not completion[2] or completion[1] == cursor: self.input_completer.popup().hide(); return
+        _, self._completion_word_start, names = completion
+        self.input_completion_model.setStringList(names)
+        self.input_completer.setCompletionPrefix(text[self._completion_word_start:cursor]); self.input_completer.complete()
+
+    def _insert_input_completion(self, name: str):
+        text = self.input_entry.text(); cursor = self.input_entry.cursorPosition(); start = min(self._completion_word_start, cursor)
+        self.input_entry.setText(text[:start] + name + text[cursor:]); self.input_entry.setCursorPosition(start + len(name))
+
+    WATCH_DEBOUNCE_MS = 250 # Editors and git write in bursts; handle them as one change
+    WATCHED_SUFFIXES = (".py", ".js")
+
+    def init_script_watcher(self):
+        self._watched_dirs = [os.path.join(self.scripts_base_dir, "python"), os.path.join(self.scripts_base_dir, "javascript")]
+        for directory in self.agent_core.script_directories():
+            if os.path.isdir(directory) and directory not in self._watched_dirs: self._watched_dirs.append(directory)
+        self._pending_watch_paths = set()
+        self.script_watcher = QtCore.QFileSystemWatcher(self)
+        self.script_watcher.fileChanged.connect(self._on_watched_path_changed)
+        self.script_watcher.directoryChanged.connect(self._on_watched_path_changed)
+        self.watch_debounce_timer = QtCore.QTimer(self); self.watch_debounce_timer.setSingleShot(True); self.watch_debounce_timer.setInterval(self.WATCH_DEBOUNCE_MS)
+        self.watch_debounce_timer.timeout.connect(self._flush_watched_changes)
+        self.script_watcher.addPaths(self._watched_dirs)
+        for directory in self._watched_dirs: self._sync_watched_files(directory)
+
+    def _sync_watched_files(self, directory: str) -> set:
+        """Starts watching scripts that appeared in directory; returns the watched files that disappeared from it."""
+        try: current = {os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(self.WATCHED_SUFFIXES)}
+        except OSError: current = set()
+        watched = {path for path in self.script_watcher.files() if os.path.dirname(path) == directory}
+        added = current - watched
+        if added: self.script_watcher.addPaths(sorted(added))
+        removed = watched - current
+        if removed: self.script_watcher.removePaths(sorted(removed))
+        return removed | added # New files may replace ones we showed (atomic saves rename over the original)
+
+    def _on_watched_path_changed(self, path: str):
+        self._pending_watch_paths.add(path); self.watch_debounce_timer.start() # Restarting the timer extends the quiet period
+
+    def _flush_watched_changes(self):
+        pending = self._pending_watch_paths; self._pending_watch_paths = set()
+        changed_files = set()
+        for path in pending:
+            if path in self._watched_dirs: changed_files |= self._sync_watched_files(path)
+            else:
+                changed_files.add(path)
+                if os.path.exists(path) and path not in self.script_watcher.files(): self.script_watcher.addPath(path) # Re-arm after replace
+        if changed_files: self.command_pool.start(ScriptChangeRunnable(self.agent_core, sorted(changed_files))) # After any queued commands
+        for path in changed_files:
+            if os.path.abspath(path) == self._displayed_script_path: self._refresh_displayed_script()
+
+    def _refresh_displayed_script(self):
+        """Rereads the displayed script after an outside edit, keeping the scroll position; no-op if the text is unchanged."""
+        if self._large_file is not None or is_large_file(self._displayed_script_path):
+            if self._large_file is not None: self._reload_large_file()
+            else: self._update_code_view_area(script_path=self._displayed_script_path)
+            return
+        try:
+            with open(self._displayed_script_path, "r", encoding='utf-8') as f: content = f.read()
+        except OSError: return # Deleted or mid-rename; a later event brings it back
+        if content == self.code_view_area.toPlainText(): return # Our own write, already patched into the view
+        scroll_bar = self.code_view_area.verticalScrollBar(); scroll_value = scroll_bar.value()
+        self._set_code_view_text(content, self._displayed_script_path); scroll_bar.setValue(scroll_value)
+        self._add_log_message(f"Reloaded {os.path.basename(self._displayed_script_path)} (changed on disk)", color="gray")
+
     def on_file_selected(self, index: QtCore.QModelIndex): # ... (as before)
         file_path = self.file_system_model.filePath(index)
         if not self.file_system_model.isDir(index) and os.path.isfile(file_path):
             self._update_code_view_area(script_path=file_path)
             file_name = os.path.basename(file_path)
-            self.agent_core.current_script_name = file_name
-            lang = "python" if file_name.endswith(".py") else "javascript" if file_name.endswith(".js") else self.agent_core.active_language
-            self.agent_core.active_language = lang
-            self._update_context_labels()
-            self._add_log_message(f"Selected file: {file_name}", color="gray")
-
-    def _update_context_labels(self): self.lang_label.setText(f"Language: {self.agent_core.active_language}"); self.script_label.setText(f"Script: {self.agent_core.current_script_name or 'None'}")
-    def _add_log_message(self, message: str, color: str = "black", is_html: bool = False): # ... (as before)
-        message_str = str(message) if message is not None else "";
+            runnable = ScriptSelectionRunnable(self.agent_core, file_name); runnable.signals.selected.connect(self._on_script_selected)
+            self._selection_runnables.append(runnable); self.command_pool.start(runnable) # After any queued commands
+            self._add_log_message(f"Selected file: {file_name}" + ("  (queued)" if self._command_runnables else ""), color="gray")
+
+    def _on_script_selected(self, language: str, script_name: str):
+        self._selection_runnables = [runnable for runnable in self._selection_runnables if runnable.signals is not self.sender()]
+        self._update_context_labels(language, script_name)
+
+    def _update_context_labels(self, language: str = None, script_name: str = None):
+        """Shows the language and script a command finished with (AgentCore's own state when not given)."""
+        if language is None: language, script_name = self.agent_core.active_language, self.agent_core.current_script_name
+        self.lang_label.setText(f"Language: {language}"); self.script_label.setText(f"Script: {script_name or 'None'}")
+    def _add_log_message(self, message: str, color: str = "black", is_html: bool = False, preview: bool = False): # ... (as before)
+        message_str = self.session_log.append(message, HTML_STYLE if is_html else color, preview=preview and not is_html)
         if is_html: self.log_area.append(message_str) 
         else: escaped_message = message_str.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;'); self.log_area.append(f"<font color='{color}'>{escaped_message}</font>")
         self.log_area.ensureCursorVisible() 
     def _update_code_view_area(self, script_path: str = None, script_content: str = None): # ... (as before)
-        display_content = "";
-        if script_path:
+        if script_content is None and script_path and is_large_file(script_path): self._open_large_file(script_path); return
+        self._close_large_file()
+        if self.python_highlighter.document() is None: # Leaving large-file mode: reattach without highlighting the old chunks
+            self.code_view_area.clear(); self.python_highlighter.setDocument(self.code_view_area.document())
+        display_content = ""; displayed_path = None
+        if script_content is not None: display_content = script_content; displayed_path = script_path # Content may come pre-read by a worker
+        elif script_path:
             try:
                 with open(script_path, "r", encoding='utf-8') as f: display_content = f.read()
+                displayed_path = script_path
             except FileNotFoundError: display_content = f"// Error: Could not find script {script_path}"
             except Exception as e: display_content = f"// Error reading script {script_path}: {e}"
-        elif script_content is not None: display_content = script_content
         else: display_content = "// No active script or script content to display."
-        self.code_view_area.setPlainText(display_content) 
+        self._displayed_script_path = os.path.abspath(displayed_path) if displayed_path else None
+        self._set_code_view_text(display_content, self._displayed_script_path)
         self.code_view_area.moveCursor(QtGui.QTextCursor.MoveOperation.Start) 
-    def on_send_command(self): # ... (as before)
+
+    def _set_code_view_text(self, content: str, script_path: str = None):
+        # Tokens come from the shared cache: an unchanged script isn't re-lexed, an edited one only on its changed lines
+        self.python_highlighter.set_token_stream(self.highlight_cache.tokenize(content, key=script_path))
+        self.code_view_area.setPlainText(content)
+
+    LARGE_FILE_LOAD_AHEAD_PAGES = 1 # Load the next chunk when the view is within this many pages of the loaded end
+
+    def _open_large_file(self, script_path: str, min_lines: int = 0):
+        """Large-file mode: maps the script and shows it a chunk at a time with the highlighter detached."""
+        self._close_large_file()
+        try: large_file = MappedScript(script_path)
+        except OSError as e: self._update_code_view_area(script_content=f"// Error reading script {script_path}: {e}"); return
+        self._large_file = large_file
+        self.python_highlighter.setDocument(None); self.code_view_area.clear()
+        self._displayed_script_path = large_file.path
+        cursor = QtGui.QTextCursor(self.code_view_area.document())
+        while not large_file.exhausted and (not large_file.lines_read or large_file.lines_read < min_lines):
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.End); cursor.insertText(large_file.read_next_chunk())
+        if not min_lines: self.code_view_area.moveCursor(QtGui.QTextCursor.MoveOperation.Start)
+
+    def _close_large_file(self):
+        if self._large_file is not None: self._large_file.close(); self._large_file = None
+
+    def _reload_large_file(self):
+        """Remaps the displayed large script after it changed on disk, reloading as far as we had got."""
+        scroll_bar = self.code_view_area.verticalScrollBar(); scroll_value = scroll_bar.value()
+        self._open_large_file(self._large_file.path, min_lines=self._large_file.lines_read)
+        scroll_bar.setValue(scroll_value)
+
+    def _on_code_view_scrolled(self, value: int):
+        if self._large_file is None or self._large_file.exhausted or self._large_file_load_pending: return
+        scroll_bar = self.code_view_area.verticalScrollBar()
+        if value >= scroll_bar.maximum() - self.LARGE_FILE_LOAD_AHEAD_PAGES * scroll_bar.pageStep():
+            self._large_file_load_pending = True; QtCore.QTimer.singleShot(0, self._load_more_large_file) # Not from inside the scroll signal
+
+    def _load_more_large_file(self):
+        self._large_file_load_pending = False
+        if self._large_file is None: return
+        try: chunk = self._large_file.read_next_chunk()
+        except StaleMappingError: self._reload_large_file(); return
+        scroll_bar = self.code_view_area.verticalScrollBar(); scroll_value = scroll_bar.value()
+        cursor = QtGui.QTextCursor(self.code_view_area.document()); cursor.movePosition(QtGui.QTextCursor.MoveOperation.End); cursor.insertText(chunk)
+        scroll_bar.setValue(scroll_value)
+
+    def _apply_script_patch(self, patch: dict) -> bool:
+        """Applies a generator line-range patch (results["script_patch"]) to the displayed document in place, so only
+        the touched blocks are re-highlighted and the scroll position is kept. False if the view doesn't match its base."""
+        document = self.code_view_area.document()
+        if not patch or self._large_file is not None or self._displayed_script_path != patch["path"] or document.blockCount() != patch["old_line_count"]: return False
+        if content_digest(document.toPlainText()).hex() != patch["base_digest"]: return False # Same line count, different text
+        start, old_end, new_lines = patch["start_line"], patch["old_end_line"], patch["new_lines"]; block_count = document.blockCount()
+        def line_start(line): return document.findBlockByNumber(line).position()
+        def line_end(line): block = document.findBlockByNumber(line); return block.position() + block.length() - 1 # Before the separator
+        if new_lines and old_end > start: sel_start, sel_end, text = line_start(start), line_end(old_end - 1), "\n".join(new_lines)
+        elif new_lines and start < block_count: sel_start = sel_end = line_start(start); text = "\n".join(new_lines) + "\n"
+        elif new_lines: sel_start = sel_end = line_end(block_count - 1); text = "\n" + "\n".join(new_lines)
+        elif old_end > start and old_end < block_count: sel_start, sel_end, text = line_start(start), line_start(old_end), ""
+        elif old_end > start and start > 0: sel_start, sel_end, text = line_end(start - 1), line_end(block_count - 1), ""
+        elif old_end > start: sel_start, sel_end, text = 0, line_end(block_count - 1), ""
+        else: return True # Empty patch
+        scroll_bar = self.code_view_area.verticalScrollBar(); scroll_value = scroll_bar.value()
+        cursor = QtGui.QTextCursor(document); cursor.beginEditBlock()
+        cursor.setPosition(sel_start); cursor.setPosition(sel_end, QtGui.QTextCursor.MoveMode.KeepAnchor); cursor.insertText(text)
+        cursor.endEditBlock()
+        scroll_bar.setValue(scroll_value)
+        return True
+
+    def on_send_command(self):
         user_input = self.input_entry.text().strip()
         if not user_input: return
-        self._add_log_message(f"> {user_input}", color="#555555") 
+        queued_note = "  (queued)" if self._command_runnables else ""
+        self._add_log_message(f"> {user_input}{queued_note}", color="#555555") 
         self.input_entry.clear(); self.input_entry.setFocus()
-        results = self.agent_core.process_command(user_input)
+        command_id = self._next_command_id; self._next_command_id += 1
+        runnable = CommandRunnable(self.agent_core, command_id, user_input)
+        runnable.signals.finished.connect(self._on_command_finished); runnable.signals.failed.connect(self._on_command_failed)
+        self._command_runnables[command_id] = runnable
+        self.command_pool.start(runnable)
+        self._update_busy_state()
+
+    def on_cancel_queued_commands(self):
+        cancelled = [command_id for command_id, runnable in list(self._command_runnables.items()) if self.command_pool.tryTake(runnable)]
+        for command_id in cancelled: del self._command_runnables[command_id]
+        if cancelled: self._add_log_message(f"Cancelled {len(cancelled)} queued command(s).", color="gray")
+        self._update_busy_state()
+
+    def _update_busy_state(self):
+        in_flight = len(self._command_runnables)
+        self.busy_indicator.setVisible(in_flight > 0)
+        self.cancel_button.setEnabled(in_flight > 1) # Only commands that haven't started can be cancelled
+        self.busy_indicator.setToolTip(f"Running command ({in_flight - 1} queued)" if in_flight else "")
+
+    def _on_command_failed(self, command_id: int, message: str):
+        self._command_runnables.pop(command_id, None); self._update_busy_state()
+        self._add_log_message(message, color="red")
+
+    def _on_command_finished(self, command_id: int, results: dict, script_content: str = None):
+        self._command_runnables.pop(command_id, None); self._update_busy_state()
         msg_color = "black"; status = results.get("status")
         if status == "error": msg_color = "red"
         elif status == "success": msg_color = "green"
         elif status == "clarification_needed": msg_color = "purple"
         if results.get("main_response"): self._add_log_message(results["main_response"], color=msg_color)
-        if results.get("debug_info"): self._add_log_message(f"DEBUG: {results['debug_info']}", color="orange")
-        if results.get("script_to_display_path"): self._update_code_view_area(script_path=results["script_to_display_path"])
+        if results.get("debug_info"): self._add_log_message(f"DEBUG: {results['debug_info']}", color="orange", preview=True)
+        if results.get("script_to_display_path"):
+            if self._apply_script_patch(results.get("script_patch")): pass
+            elif script_content is not None: self._update_code_view_area(script_path=results["script_to_display_path"], script_content=script_content)
+            else: self._update_code_view_area(script_path=results["script_to_display_path"])
         elif not results.get("current_script_name"): self._update_code_view_area(script_content="// No active script.")
-        self.agent_core.active_language = results["active_language"] 
-        self.agent_core.current_script_name = results["current_script_name"]
-        self._update_context_labels()
+        self._update_context_labels(results["active_language"], results["current_script_name"]) # AgentCore already holds this state
+
+    def closeEvent(self, event: QtGui.QCloseEvent):
+        self.command_pool.clear(); drained = self.command_pool.waitForDone(2000) # Drop queued commands, let the running one finish
+        self.preview_debounce_timer.stop(); self.preview_pool.clear(); self.preview_pool.waitForDone(500)
+        if drained: self.agent_core.save_snapshot() # After the running command finished, so the snapshot includes it
+        else: print("Warning: a command was still running; the session snapshot was not saved.", file=sys.stderr) # It could catch code_models mid-edit
+        self.session_log.close(); self._close_large_file()
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
@@ -1,96 +1,156 @@
-def generate_response(intent: str, entities: dict = None) -> str:
-    entities = entities or {}
-    target_script = entities.get("target_script", "the current script") 
-
-    if intent == "greeting":
-        return "Hello! I'm your app building agent. How can I help you today?"
-    elif intent == "clarification":
-        return "Could you please provide more details?"
-    elif intent == "confirmation":
-        return "Okay, I will proceed with that."
-    elif intent == "unknown_intent":
-        return "I'm sorry, I didn't quite understand that. Could you try rephrasing?"
-    elif intent == "specify_language":
-        language = entities.get("language", "the specified language")
-        if language.lower() == "javascript":
-            return f"Okay! Switched to JavaScript mode. Capabilities are currently limited to creating basic script files."
-        elif language.lower() == "python":
-            return f"Got it! Switched back to Python mode."
-        else:
-            return f"Got it! I'll use {language} for future tasks, though support might be limited." 
-    elif intent == "create_script": 
-        script_name = entities.get("script_name", "your_script")
-        language = entities.get("current_language", "the current language") 
-        if language.lower() == "javascript":
-            if not script_name.endswith(".js"): script_name += ".js"
-            return f"Alright, I'll start creating the JavaScript script named '{script_name}'."
-        else: 
-            if not script_name.endswith(".py") and language.lower() == "python": script_name += ".py"
-            return f"Alright, I'll start creating the script named '{script_name}'."
-    elif intent == "add_function": 
-        func_name = entities.get("function_name", "your_function")
-        return f"Okay, I'll add the function '{func_name}' to '{target_script}'."
-    elif intent == "add_method_to_class":
-        class_name = entities.get("class_name", "TargetClass")
-        method_name = entities.get("method_name", "new_method") 
-        return f"Okay, I'll try to add method '{method_name}' to class '{class_name}' in '{target_script}'."
-    elif intent == "add_class_attribute": 
-        class_name = entities.get("class_name", "TargetClass")
-        attr_name = entities.get("attribute_name", "new_attribute")
-        value_expr = entities.get("value_expression", "None")
-        return f"Okay, I'll try to add attribute {attr_name} = {value_expr} to class '{class_name}' in '{target_script}'."
-    elif intent == "add_instance_attribute": 
-        class_name = entities.get("class_name", "TargetClass")
-        attr_name = entities.get("attribute_name", "new_attr")
-        value_expr = entities.get("value_expression", "None")
-        return f"Okay, I'll try to add instance attribute self.{attr_name} = {value_expr} to __init__ of class '{class_name}' in '{target_script}'."
-    elif intent == "add_decorator": 
-        item_name = entities.get("item_name", "target_function_or_method")
-        class_name = entities.get("class_name")
-        decorator_expr = entities.get("decorator_expression", "unknown_decorator")
-        target_desc = f"method '{item_name}' in class '{class_name}'" if class_name else f"function '{item_name}'"
-        return f"Okay, I'll try to add decorator '@{decorator_expr}' to {target_desc} in '{target_script}'."
-    
-    elif intent in ["add_print_statement", "add_return_statement", "add_conditional_statement", "add_for_loop", "add_while_loop", "add_file_operation", "add_try_except"]:
-        item_name = entities.get("item_name", entities.get("function_name", "the target function/method")) 
-        class_name_context = entities.get("class_name")
-        action_description = ""
-        if intent == "add_print_statement": action_description = f"print '{entities.get('expression', 'something')}'"
-        elif intent == "add_return_statement": action_description = f"return '{entities.get('expression', 'something')}'"
-        elif intent == "add_conditional_statement": action_description = "a conditional (if/elif/else) statement"
-        elif intent == "add_for_loop": action_description = "a for-loop"
-        elif intent == "add_while_loop": action_description = "a while-loop"
-        elif intent == "add_file_operation":
-            file_name = entities.get("filename", "some_file"); mode = entities.get("file_mode", "r"); action_type = entities.get("file_action", {}).get("type", "do something")
-            action_description = f"a file operation (open {file_name} mode '{mode}', then {action_type})"
-        elif intent == "add_try_except":
-            exception_type = entities.get("exception_type_str") or "any exception" # Handles None for bare except
-            clauses = ["try", "except " + exception_type]
-            if entities.get("else_body_command_descs"): clauses.append("else")
-            if entities.get("finally_body_command_descs"): clauses.append("finally")
-            action_description = f"a {', '.join(clauses)} block"
-
-        target_location_desc = f"method '{item_name}' in class '{class_name_context}'" if class_name_context else f"function '{item_name}'"
-        return f"Okay, I'll try to add {action_description} to {target_location_desc} within '{target_script}'."
-            
-    elif intent == "create_class_statement": 
-        class_name = entities.get("class_name", "SomeClass")
-        base_classes = entities.get("base_classes") 
-        loc = f" in script '{target_script}'" if target_script and target_script != "the current script" else ""
-        
-        if base_classes: 
-            bases_str = ", ".join(base_classes)
-            return f"Okay, I'll try to create class '{class_name}' inheriting from '{bases_str}'{loc}."
-        else:
-            return f"Okay, I'll try to create an empty class named '{class_name}'{loc}."
-    elif intent == "add_import_statement":
-        import_type = entities.get("import_type", "import"); import_desc = ""
-        if import_type == "direct_import": import_desc = f"`import {', '.join(entities.get('modules', ['something']))}`"
-        elif import_type == "from_import": import_desc = f"`from {entities.get('module', 'somemodule')} import {', '.join(entities.get('names', ['something']))}`"
-        else: import_desc = "the specified import"
-        return f"Okay, I'll try to add {import_desc} to '{target_script}'."
-    else: 
-        return "I'm processing your request."
+import json
+import os
+import threading
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales")
+DEFAULT_LOCALE = "en"
+
+class _Fields:
+    """Mapping view for str.format_map: entity values first, then the template's declared defaults."""
+    __slots__ = ("values", "defaults")
+    def __init__(self, values, defaults): self.values = values; self.defaults = defaults
+    def __getitem__(self, key):
+        try: return self.values[key]
+        except KeyError: return self.defaults[key]
+
+class _Template:
+    __slots__ = ("text", "defaults")
+    def __init__(self, text: str, defaults: dict = None):
+        self.text = text; self.defaults = {"target_script": "the current script", **(defaults or {})}
+    def render(self, values: dict, **computed) -> str:
+        if computed: values = {**values, **computed}
+        return self.text.format_map(_Fields(values, self.defaults))
+
+# Template key -> (text, entity defaults). Locale catalogs override the text per key; defaults stay shared.
+_TEMPLATE_SPECS = {
+    "greeting": ("Hello! I'm your app building agent. How can I help you today?", None),
+    "clarification": ("Could you please provide more details?", None),
+    "confirmation": ("Okay, I will proceed with that.", None),
+    "unknown_intent": ("I'm sorry, I didn't quite understand that. Could you try rephrasing?", None),
+    "unknown_intent.suggestions": ("Did you mean something like: {suggestions}?", None),
+    "fallback": ("I'm processing your request.", None),
+    "specify_language": ("Got it! I'll use {language} for future tasks, though support might be limited.", {"language": "the specified language"}),
+    "specify_language.javascript": ("Okay! Switched to JavaScript mode. I can create scripts and add functions, classes, methods, prints and returns to them.", None),
+    "specify_language.python": ("Got it! Switched back to Python mode.", None),
+    "create_script": ("Alright, I'll start creating the script named '{script_name}'.", None),
+    "create_script.javascript": ("Alright, I'll start creating the JavaScript script named '{script_name}'.", None),
+    "add_function": ("Okay, I'll add the function '{function_name}' to '{target_script}'.", {"function_name": "your_function"}),
+    "add_method_to_class": ("Okay, I'll try to add method '{method_name}' to class '{class_name}' in '{target_script}'.", {"class_name": "TargetClass", "method_name": "new_method"}),
+    "add_class_attribute": ("Okay, I'll try to add attribute {attribute_name} = {value_expression} to class '{class_name}' in '{target_script}'.", {"class_name": "TargetClass", "attribute_name": "new_attribute", "value_expression": "None"}),
+    "add_instance_attribute": ("Okay, I'll try to add instance attribute self.{attribute_name} = {value_expression} to __init__ of class '{class_name}' in '{target_script}'.", {"class_name": "TargetClass", "attribute_name": "new_attr", "value_expression": "None"}),
+    "add_decorator": ("Okay, I'll try to add decorator '@{decorator_expression}' to {target_desc} in '{target_script}'.", {"decorator_expression": "unknown_decorator"}),
+    "target.method": ("method '{item_name}' in class '{class_name}'", None),
+    "target.function": ("function '{item_name}'", None),
+    "statement": ("Okay, I'll try to add {action_description} to {target_desc} within '{target_script}'.", None),
+    "action.add_print_statement": ("print '{expression}'", {"expression": "something"}),
+    "action.add_return_statement": ("return '{expression}'", {"expression": "something"}),
+    "action.add_conditional_statement": ("a conditional (if/elif/else) statement", None),
+    "action.add_for_loop": ("a for-loop", None),
+    "action.add_while_loop": ("a while-loop", None),
+    "action.add_file_operation": ("a file operation (open {filename} mode '{file_mode}', then {file_action_type})", {"filename": "some_file", "file_mode": "r"}),
+    "action.add_try_except": ("a {clauses} block", None),
+    "create_class_statement": ("Okay, I'll try to create an empty class named '{class_name}'{location}.", {"class_name": "SomeClass"}),
+    "create_class_statement.bases": ("Okay, I'll try to create class '{class_name}' inheriting from '{bases}'{location}.", {"class_name": "SomeClass"}),
+    "class_location": (" in script '{target_script}'", None),
+    "add_import_statement": ("Okay, I'll try to add the specified import to '{target_script}'.", None),
+    "add_import_statement.direct_import": ("Okay, I'll try to add `import {modules}` to '{target_script}'.", None),
+    "add_import_statement.from_import": ("Okay, I'll try to add `from {module} import {names}` to '{target_script}'.", {"module": "somemodule"}),
+}
+
+_BASE_CATALOG = {key: _Template(text, defaults) for key, (text, defaults) in _TEMPLATE_SPECS.items()}
+_catalogs = {DEFAULT_LOCALE: _BASE_CATALOG}
+_catalogs_lock = threading.Lock()
+
+def _get_catalog(locale: str = None) -> dict:
+    """Returns the compiled catalog for a locale, loading locales/<locale>.json on first use."""
+    if not locale: return _BASE_CATALOG
+    catalog = _catalogs.get(locale)
+    if catalog is not None: return catalog
+    with _catalogs_lock:
+        if locale in _catalogs: return _catalogs[locale]
+        catalog = dict(_BASE_CATALOG)
+        try:
+            with open(os.path.join(LOCALES_DIR, f"{locale}.json"), "r", encoding="utf-8") as f: overrides = json.load(f)
+            for key, text in overrides.items():
+                if key in _BASE_CATALOG: catalog[key] = _Template(text, _TEMPLATE_SPECS[key][1])
+        except (OSError, ValueError): pass # Missing or malformed catalog: keep the default wording
+        _catalogs[locale] = catalog
+        return catalog
+
+# --- Renderers for intents whose wording depends on the entities ---
+def _render_unknown_intent(c, e):
+    text = c["unknown_intent"].render(e)
+    suggestions = e.get("suggestions")
+    if suggestions: text += " " + c["unknown_intent.suggestions"].render(e, suggestions=" or ".join(f"'{shape}'" for shape in suggestions))
+    return text
+
+def _render_specify_language(c, e):
+    return c.get(f"specify_language.{e.get('language')}", c["specify_language"]).render(e)
+
+def _render_create_script(c, e):
+    script_name = e.get("script_name", "your_script"); language = e.get("current_language")
+    if language == "javascript":
+        if not script_name.endswith(".js"): script_name += ".js"
+        return c["create_script.javascript"].render(e, script_name=script_name)
+    if language == "python" and not script_name.endswith(".py"): script_name += ".py"
+    return c["create_script"].render(e, script_name=script_name)
+
+def _target_desc(c, e, item_name):
+    class_name = e.get("class_name")
+    if class_name: return c["target.method"].render(e, item_name=item_name, class_name=class_name)
+    return c["target.function"].render(e, item_name=item_name)
+
+def _render_add_decorator(c, e):
+    return c["add_decorator"].render(e, target_desc=_target_desc(c, e, e.get("item_name", "target_function_or_method")))
+
+def _render_statement(c, e, intent):
+    item_name = e.get("item_name", e.get("function_name", "the target function/method"))
+    computed = {}
+    if intent == "add_file_operation": computed["file_action_type"] = e.get("file_action", {}).get("type", "do something")
+    elif intent == "add_try_except":
+        clauses = ["try", "except " + (e.get("exception_type_str") or "any exception")] # Handles None for bare except
+        if e.get("else_body_command_descs"): clauses.append("else")
+        if e.get("finally_body_command_descs"): clauses.append("finally")
+        computed["clauses"] = ", ".join(clauses)
+    action_description = c[f"action.{intent}"].render(e, **computed)
+    return c["statement"].render(e, action_description=action_description, target_desc=_target_desc(c, e, item_name))
+
+def _render_create_class(c, e):
+    target_script = e.get("target_script")
+    location = c["class_location"].render(e) if target_script and target_script != "the current script" else ""
+    base_classes = e.get("base_classes")
+    if base_classes: return c["create_class_statement.bases"].render(e, bases=", ".join(base_classes), location=location)
+    return c["create_class_statement"].render(e, location=location)
+
+def _render_add_import(c, e):
+    import_type = e.get("import_type", "import")
+    if import_type == "direct_import": return c["add_import_statement.direct_import"].render(e, modules=", ".join(e.get("modules", ["something"])))
+    if import_type == "from_import": return c["add_import_statement.from_import"].render(e, names=", ".join(e.get("names", ["something"])))
+    return c["add_import_statement"].render(e)
+
+def _simple(key):
+    return lambda c, e: c[key].render(e)
+
+def _statement(intent):
+    return lambda c, e: _render_statement(c, e, intent)
+
+_RENDERERS = {
+    "greeting": _simple("greeting"), "clarification": _simple("clarification"),
+    "confirmation": _simple("confirmation"), "unknown_intent": _render_unknown_intent,
+    "specify_language": _render_specify_language, "create_script": _render_create_script,
+    "add_function": _simple("add_function"), "add_method_to_class": _simple("add_method_to_class"),
+    "add_class_attribute": _simple("add_class_attribute"), "add_instance_attribute": _simple("add_instance_attribute"),
+    "add_decorator": _render_add_decorator,
+    "create_class_statement": _render_create_class, "add_import_statement": _render_add_import,
+}
+for _intent in ["add_print_statement", "add_return_statement", "add_conditional_statement", "add_for_loop", "add_while_loop", "add_file_operation", "add_try_except"]:
+    _RENDERERS[_intent] = _statement(_intent)
+
+def generate_response(intent: str, entities: dict = None, locale: str = None) -> str:
+    catalog = _get_catalog(locale)
+    renderer = _RENDERERS.get(intent)
+    if renderer is None: return catalog["fallback"].render({})
+    return renderer(catalog, entities or {})
 
 def ask_clarification(question: str) -> str:
     return f"To help me understand better: {question}"
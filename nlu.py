@@ -301,3 +301,37 @@ def parse_intent(user_text: str) -> dict: # Main NLU dispatcher
     if match_language: entities["language"] = match_language.group(1); return {"intent": "specify_language", "entities": entities}
         
     return {"intent": "unknown", "entities": {}}
+
+# " then " between two commands (as opposed to inside a statement body, where it chains body statements): only
+# where the words after it start a command of their own. Body statements (print/return/assign/pass) never do.
+_COMMAND_SEPARATOR = re.compile(r"\s+then\s+(?=(?:create|make|new)\s+(?:a\s+|new\s+)?(?:script|class)\b|(?:add|define)\s+[a-z]"
+                                r"|in\s+(?:class|function|method)\s+[a-z_]|from\s+[\w.]+\s+import\s|import\s+[a-z_]|use\s+(?:python|javascript)\b)", re.IGNORECASE)
+
+def split_commands(user_text: str) -> list:
+    """Splits a compound utterance ("create class Foo in app then add method run(x) to class Foo") into the text of
+    each command, in order. Separators inside quotes are ignored. A single command comes back as a one-item list."""
+    segments = []; start = 0; quote = None; index = 0
+    for match in _COMMAND_SEPARATOR.finditer(user_text):
+        while index < match.start(): # Quote state up to the separator: the other quote character inside a literal is text
+            char = user_text[index]
+            if quote is not None and char == "\\": index += 2; continue # Escaped character
+            if quote is None and char in "'\"": quote = char
+            elif char == quote: quote = None
+            index += 1
+        if quote is not None: continue # Inside a string literal
+        segments.append(user_text[start:match.start()].strip()); start = match.end()
+    segments.append(user_text[start:].strip())
+    return [segment for segment in segments if segment] or [user_text]
+
+def parse_intents(user_text: str) -> list:
+    """parse_intent for each command of a compound utterance, in order; each result also carries its "text".
+    A command without an explicit script targets the one the previous command named (or created)."""
+    parsed_intents = []; last_script = None
+    for segment in split_commands(user_text):
+        parsed_info = parse_intent(segment); parsed_info["text"] = segment
+        entities = parsed_info.get("entities", {})
+        if parsed_info["intent"] == "create_script": last_script = entities.get("script_name")
+        elif entities.get("target_script"): last_script = entities["target_script"]
+        elif last_script and parsed_info["intent"] not in ("unknown", "specify_language"): entities["target_script"] = last_script
+        parsed_intents.append(parsed_info)
+    return parsed_intents
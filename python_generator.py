@@ -1,61 +1,171 @@
 import ast
 import os
+import hashlib
+import threading
+from contextlib import contextmanager, ExitStack
 
-# (to_source and create_new_script remain the same)
-def to_source(node):
+try:
+    from . import script_locks
+except ImportError: # Running outside the code_generator package
+    import script_locks
+
+BASE_PYTHON_OUTPUT_DIR = "generated_scripts"
+
+_edit_patches = threading.local() # Per calling thread: abs script path -> (source before first write, patch)
+_module_cache = {} # abs script path -> ((mtime_ns, size), source, parsed module) as last read or written by us
+_module_cache_lock = threading.Lock()
+_batches = threading.local() # Per calling thread: the active script_batch(), if any
+BATCH_LOCK_TIMEOUT_S = 5.0 # Longest a batch waits for a lock out of the global order before giving up
+
+def _file_signature(script_path: str) -> tuple:
+    stat = os.stat(script_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _load_script_module(script_path: str):
+    """Source and parsed module of a script, reusing the cached parse while the file's text is unchanged.
+    Callers hold the script's write lock and either write the (mutated) module back or leave it untouched."""
+    path = os.path.abspath(script_path)
+    batch = getattr(_batches, "active", None)
+    if batch is not None and path in batch.modules: return batch.modules[path] # Edited in memory since it was loaded
+    if batch is not None: batch.lock(path) # Held until the batch is written
+    signature = _file_signature(path)
+    with open(script_path, "r", encoding="utf-8") as f: source_code = f.read() # Cheap next to parsing; mtime/size alone miss same-size edits within a tick
+    with _module_cache_lock: cached = _module_cache.get(path)
+    if cached is not None and cached[1] == source_code: module_node = cached[2]
+    else: module_node = ast.parse(source_code, filename=script_path) # SyntaxError is reported by the caller
+    with _module_cache_lock: _module_cache[path] = (signature, source_code, module_node)
+    if batch is not None: batch.modules[path] = (source_code, module_node)
+    return source_code, module_node
+
+def _save_script_module(script_path: str, old_source: str, module_node: ast.Module):
+    """Writes an edited module back, or inside script_batch() just marks it for the single write at the end."""
+    batch = getattr(_batches, "active", None)
+    if batch is not None: batch.dirty.add(os.path.abspath(script_path)); return
+    _write_script_source(script_path, old_source, to_source(module_node), module_node)
+
+def cached_script_module(script_path: str):
+    """The cached parse of a script if it is still current on disk, else None. Read-only for callers."""
+    path = os.path.abspath(script_path)
+    with _module_cache_lock: cached = _module_cache.get(path)
+    try: return cached[2] if cached is not None and cached[0] == _file_signature(path) else None
+    except OSError: return None
+
+def cached_source_digest(script_path: str):
+    """source_digest of the text the cached parse came from (as last read or written by us), or None."""
+    with _module_cache_lock: cached = _module_cache.get(os.path.abspath(script_path))
+    return source_digest(cached[1]) if cached is not None else None
+
+def invalidate_script_cache(script_path: str = None):
+    """Drops the cached parse for one script (or all of them), e.g. after an edit made outside the agent."""
+    with _module_cache_lock:
+        if script_path is None: _module_cache.clear()
+        else: _module_cache.pop(os.path.abspath(script_path), None)
+
+def source_digest(source: str) -> str:
+    """Hex digest a patch's base is identified by; the UIs hash the text they display the same way."""
+    return hashlib.blake2b(source.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+
+def _compute_line_patch(old_source: str, new_source: str) -> dict:
+    """Line-range patch turning old_source into new_source, on the same line split the UIs display."""
+    old_lines = old_source.split("\n"); new_lines = new_source.split("\n")
+    common = min(len(old_lines), len(new_lines)); prefix = 0
+    while prefix < common and old_lines[prefix] == new_lines[prefix]: prefix += 1
+    suffix = 0
+    while suffix < common - prefix and old_lines[-1 - suffix] == new_lines[-1 - suffix]: suffix += 1
+    return {"start_line": prefix, "old_end_line": len(old_lines) - suffix, "new_lines": new_lines[prefix:len(new_lines) - suffix],
+            "old_line_count": len(old_lines), "new_line_count": len(new_lines), "base_digest": source_digest(old_source)}
+
+def _write_script_source(script_path: str, old_source: str, updated_content: str, module_node: ast.Module = None):
+    """Writes a script (with trailing newline) and records what changed for pop_edit_patches().
+    module_node, when given, is the tree updated_content was rendered from and becomes the cached parse."""
+    if not updated_content.endswith("\n"): updated_content += "\n"
+    path = os.path.abspath(script_path)
     try:
-        return ast.unparse(node)
-    except AttributeError: # Basic fallback
-        if isinstance(node, ast.Module): return "\n".join(to_source(n) for n in node.body)
-        if isinstance(node, ast.FunctionDef):
-            args_str = ", ".join(arg.arg for arg in node.args.args)
-            body_parts = [to_source(n) for n in node.body]
-            body_str = "\n".join(f"  {part}" for part in body_parts) if body_parts else "  pass"
-            if "\n" in body_str: # Basic re-indent for multi-line bodies in fallback
-                lines = body_str.splitlines()
-                if not (len(lines) == 1 and lines[0].strip() == "pass"):
-                    indented_lines = []
-                    for i, line in enumerate(lines):
-                        stripped_line = line.strip()
-                        # Avoid double-indenting already indented lines from nested calls
-                        if stripped_line.startswith("def ") or stripped_line.startswith("print(") or stripped_line.startswith("return "):
-                             indented_lines.append(f"  {stripped_line}") # assume it's a flat structure for this simple fallback
-                        elif i == 0 :
-                            indented_lines.append(f"  {stripped_line}")
-                        elif stripped_line:
-                             indented_lines.append(f"    {stripped_line}") # Heuristic: further indent subsequent lines
-                        else:
-                            indented_lines.append("")
-                    body_str = "\n".join(indented_lines)
-
-            return f"def {node.name}({args_str}):\n{body_str if body_str.strip() else '  pass'}"
-        if isinstance(node, ast.Pass): return "pass"
-        if isinstance(node, ast.Expr): # Could be a docstring or a call like print()
-            if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
-                return f'"""{node.value.value}"""' # Docstring
-            return to_source(node.value) # Other expressions like calls
-        # Fallbacks for print and return (simplified)
-        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == 'print':
-            arg_str = ", ".join([to_source(arg) for arg in node.args])
-            return f"print({arg_str})"
-        if isinstance(node, ast.Return):
-            return f"return {to_source(node.value) if node.value else ''}"
-        if isinstance(node, ast.Name): return node.id
-        if isinstance(node, ast.Constant): return repr(node.value) # handles strings, numbers
-        if isinstance(node, ast.BinOp): # Very simplified
-            op_map = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.Pow: '**',
-                      ast.FloorDiv: '//', ast.Mod: '%', ast.LShift: '<<', ast.RShift: '>>',
-                      ast.BitOr: '|', ast.BitXor: '^', ast.BitAnd: '&', ast.MatMult: '@'}
-            left_source = to_source(node.left)
-            right_source = to_source(node.right)
-            return f"{left_source} {op_map.get(type(node.op), '?')} {right_source}"
-        return "# AST unparsing issue for statement"
+        with open(script_path, "w", encoding="utf-8") as f: f.write(updated_content)
+    except BaseException: invalidate_script_cache(path); raise
+    with _module_cache_lock:
+        if module_node is None: _module_cache.pop(path, None)
+        else: _module_cache[path] = (_file_signature(path), updated_content, module_node)
+    if not hasattr(_edit_patches, "by_path"): _edit_patches.by_path = {}
+    base_source = _edit_patches.by_path[path][0] if path in _edit_patches.by_path else old_source # Several writes fold into one patch
+    patch = _compute_line_patch(base_source, updated_content)
+    patch["path"] = path; patch["bytes_written"] = len(updated_content.encode("utf-8"))
+    _edit_patches.by_path[path] = (base_source, patch)
+    return updated_content
+
+def write_rendered_script(script_path: str, old_source: str, source: str) -> str:
+    """Writes source another emitter rendered (e.g. JavaScript) with the same patch and bytes_written bookkeeping as
+    Python edits. The caller holds the script's write lock. Returns the text written."""
+    return _write_script_source(script_path, old_source, source)
+
+def pop_edit_patches() -> dict:
+    """Returns and clears {abs_path: patch} for scripts written by the calling thread since the last call."""
+    patches = {path: patch for path, (_, patch) in getattr(_edit_patches, "by_path", {}).items()}; _edit_patches.by_path = {}
+    return patches
+
+class _ScriptBatch:
+    def __init__(self):
+        self.modules = {} # abs script path -> (source as loaded, module being edited)
+        self.dirty = set(); self.discarded = False
+        self.locks = ExitStack(); self.locked = set() # abs paths whose write locks the batch holds
+
+    def lock(self, script_path: str):
+        """Takes a script's write lock until the batch ends. Locks are waited for in one global order (sorted paths),
+        so two batches can't wait on each other; a script that sorts before one already held is only waited for up to
+        BATCH_LOCK_TIMEOUT_S, and then TimeoutError fails the edit instead of deadlocking."""
+        path = os.path.abspath(script_path)
+        if path in self.locked: return
+        timeout = None if all(held < path for held in self.locked) else BATCH_LOCK_TIMEOUT_S
+        self.locks.enter_context(script_locks.write_locked(path, timeout=timeout)); self.locked.add(path)
+
+    def discard(self):
+        """Drops every edit made in the batch so far; nothing is written when it ends."""
+        self.discarded = True
+
+@contextmanager
+def _write_locked(script_path: str):
+    """script_locks.write_locked, or inside script_batch() the batch's lock on the script (held until it ends)."""
+    batch = getattr(_batches, "active", None)
+    if batch is not None: batch.lock(script_path); yield; return
+    with script_locks.write_locked(script_path): yield
+
+@contextmanager
+def script_batch(script_paths: list = ()):
+    """Runs several edits by the calling thread as one read-modify-write per script. The write locks of
+    `script_paths` (the scripts the caller expects to touch) are taken up front in sorted order; any other script is
+    locked on first use. Each script is parsed once and keeps its lock until the block ends; edits change that module
+    in memory and every changed script is rendered and written once on exit. If the block raises or calls discard(),
+    nothing is written. Nested batches join the outer one. Scripts created inside the block are written immediately."""
+    if getattr(_batches, "active", None) is not None: yield _batches.active; return
+    batch = _batches.active = _ScriptBatch()
+    try:
+        with batch.locks:
+            try:
+                for path in sorted({os.path.abspath(path) for path in script_paths}): batch.lock(path)
+                yield batch
+            except BaseException: batch.discard(); raise
+            finally:
+                _batches.active = None
+                if batch.discarded:
+                    for path in batch.modules: invalidate_script_cache(path) # The cached parses were edited in place
+            for path in sorted(batch.dirty) if not batch.discarded else ():
+                source_code, module_node = batch.modules[path]
+                try: _write_script_source(path, source_code, to_source(module_node), module_node)
+                except BaseException: invalidate_script_cache(path); raise
+    finally: _batches.active = None
+
+# (to_source and create_new_script remain the same)
+def to_source(node, out=None):
+    """Source for an AST node. Generated nodes have no line numbers, which ast.unparse needs for statements, so the
+    missing ones are filled in first. With `out` (a text stream) the source is written there and None is returned."""
+    source = ast.unparse(ast.fix_missing_locations(node))
+    if out is None: return source
+    out.write(source)
 
 def create_new_script(script_name: str, initial_comment: str = None) -> str:
     if not script_name.endswith(".py"): script_name += ".py"
-    output_dir = "generated_scripts"; os.makedirs(output_dir, exist_ok=True)
+    output_dir = BASE_PYTHON_OUTPUT_DIR; os.makedirs(output_dir, exist_ok=True)
     script_path = os.path.join(output_dir, script_name)
-    if os.path.exists(script_path): raise FileExistsError(f"Script '{script_path}' already exists.")
     module_body = []
     if initial_comment:
         # Ensure docstring is an Expr node with a Constant value
@@ -64,20 +174,27 @@ def create_new_script(script_name: str, initial_comment: str = None) -> str:
         module_body.append(ast.Pass())
     module_node = ast.Module(body=module_body, type_ignores=[])
     script_content = to_source(module_node)
-    with open(script_path, "w") as f:
-        f.write(script_content)
-        if not script_content.endswith("\n") and script_content: f.write("\n")
-        elif not script_content: f.write("\n")
+    with _write_locked(script_path): # Existence check and write must be atomic across sessions
+        if os.path.exists(script_path): raise FileExistsError(f"Script '{script_path}' already exists.")
+        with open(script_path, "w", encoding="utf-8") as f:
+            f.write(script_content)
+            if not script_content.endswith("\n") and script_content: f.write("\n")
+            elif not script_content: f.write("\n")
+        invalidate_script_cache(script_path)
     return script_path
 
 # (add_function_to_script remains largely the same, ensure it adds pass_stmt initially)
 def add_function_to_script(script_name: str, function_name: str, parameters: list = None) -> str:
     if not script_name.endswith(".py"): script_name += ".py"
-    script_path = os.path.join("generated_scripts", script_name)
+    script_path = os.path.join(BASE_PYTHON_OUTPUT_DIR, script_name)
     if not os.path.exists(script_path): return f"Error: Script '{script_path}' not found."
-    with open(script_path, "r") as f: source_code = f.read()
-    try: module_node = ast.parse(source_code, filename=script_path)
-    except SyntaxError as e: return f"Error parsing script '{script_path}': {e}"
+    with _write_locked(script_path):
+        try: return _add_function_locked(script_path, script_name, function_name, parameters)
+        except BaseException: invalidate_script_cache(script_path); raise # The cached module may be half-edited
+
+def _add_function_locked(script_path: str, script_name: str, function_name: str, parameters: list) -> str:
+    try: source_code, module_node = _load_script_module(script_path)
+    except SyntaxError as e: return f"Error: Could not parse script '{script_path}': {e}"
     for node in module_node.body:
         if isinstance(node, ast.FunctionDef) and node.name == function_name:
             return f"Error: Function '{function_name}' already exists in '{script_name}'."
@@ -87,11 +204,8 @@ def add_function_to_script(script_name: str, function_name: str, parameters: lis
     body = [pass_stmt]
     new_function_node = ast.FunctionDef(name=function_name, args=args, body=body, decorator_list=[], returns=None, type_comment=None)
     module_node.body.append(new_function_node)
-    updated_script_content = to_source(module_node)
-    with open(script_path, "w") as f:
-        f.write(updated_script_content)
-        if not updated_script_content.endswith("\n"): f.write("\n")
-    return "Success"
+    _save_script_module(script_path, source_code, module_node)
+    return script_path # AgentCore displays it and looks its edit patch up by it
 
 def _parse_expression_to_ast_node(expression_str: str):
     """Attempts to parse a string into an AST expression node."""
@@ -130,13 +244,17 @@ def add_statement_to_function(script_name: str, function_name: str, statement_ty
     expression_str is the string representation of what to print or return.
     """
     if not script_name.endswith(".py"): script_name += ".py"
-    script_path = os.path.join("generated_scripts", script_name)
+    script_path = os.path.join(BASE_PYTHON_OUTPUT_DIR, script_name)
 
     if not os.path.exists(script_path): return f"Error: Script '{script_path}' not found."
 
-    with open(script_path, "r") as f: source_code = f.read()
-    try: module_node = ast.parse(source_code, filename=script_path)
-    except SyntaxError as e: return f"Error parsing script '{script_path}': {e}"
+    with _write_locked(script_path): # Read-modify-write must not interleave with other sessions
+        try: return _add_statement_locked(script_path, script_name, function_name, statement_type, expression_str)
+        except BaseException: invalidate_script_cache(script_path); raise # The cached module may be half-edited
+
+def _add_statement_locked(script_path: str, script_name: str, function_name: str, statement_type: str, expression_str: str) -> str:
+    try: source_code, module_node = _load_script_module(script_path)
+    except SyntaxError as e: return f"Error: Could not parse script '{script_path}': {e}"
 
     func_node = None
     for node_idx, node in enumerate(module_node.body):
@@ -150,7 +268,7 @@ def add_statement_to_function(script_name: str, function_name: str, statement_ty
     try:
         value_node = _parse_expression_to_ast_node(expression_str)
     except ValueError as ve:
-        return str(ve)
+        return f"Error: {ve}" # Anything else is taken for the script's path
     except Exception as e: # Catch other parsing errors
         return f"Error interpreting expression '{expression_str}': {e}"
 
@@ -170,8 +288,5 @@ def add_statement_to_function(script_name: str, function_name: str, statement_ty
     
     func_node.body.append(new_statement)
 
-    updated_script_content = to_source(module_node)
-    with open(script_path, "w") as f: f.write(updated_script_content)
-    if not updated_script_content.endswith("\n"): f.write("\n")
-    
-    return "Success"
+    _save_script_module(script_path, source_code, module_node)
+    return script_path
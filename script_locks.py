@@ -0,0 +1,146 @@
+# my_app_agent/code_generator/script_locks.py
+# Per-script locking so concurrent AgentCore sessions (threads in one process, or several
+# processes sharing one generated_scripts directory) don't lose each other's edits.
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl # POSIX only; on Windows we fall back to in-process locking
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+FILE_LOCK_POLL_S = 0.01 # Retry interval for a lock-file wait with a timeout (flock itself can't time out)
+LOCK_DIR_NAME = ".locks" # Lock files live here, inside each script directory, not next to the scripts
+
+
+class ReadWriteLock:
+    """Writer-preferring reader/writer lock. The write side is re-entrant for its owning thread."""
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0; self._writer = None; self._write_depth = 0; self._waiting_writers = 0
+
+    def acquire_read(self):
+        with self._cond:
+            if self._writer is threading.current_thread(): self._write_depth += 1; return # Writer may also read
+            while self._writer is not None or self._waiting_writers: self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            if self._writer is threading.current_thread(): self._write_depth -= 1; return
+            self._readers -= 1
+            if not self._readers: self._cond.notify_all()
+
+    def acquire_write(self, timeout: float = None) -> bool:
+        """False if the lock wasn't free within `timeout` seconds (None waits for as long as it takes)."""
+        me = threading.current_thread(); deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._writer is me: self._write_depth += 1; return True
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0: self._cond.notify_all(); return False # Readers held back for us may go
+                    self._cond.wait(remaining)
+            finally: self._waiting_writers -= 1
+            self._writer = me; self._write_depth = 1
+            return True
+
+    def release_write(self):
+        with self._cond:
+            self._write_depth -= 1
+            if not self._write_depth: self._writer = None; self._cond.notify_all()
+
+
+class _ScriptLockState:
+    """In-process lock for one script plus the shared advisory lock-file handle."""
+    def __init__(self, lock_file_path: str):
+        self.rw_lock = ReadWriteLock()
+        self.lock_file_path = lock_file_path
+        self.file_mutex = threading.Lock() # Guards fd/holders below
+        self.fd = None; self.holders = 0
+
+    def acquire_file(self, exclusive: bool, timeout: float = None) -> bool:
+        """False if another process kept the lock file for `timeout` seconds (None waits for as long as it takes)."""
+        if not FCNTL_AVAILABLE: return True
+        with self.file_mutex:
+            # Readers share one flock; the in-process RW lock guarantees a writer is alone here.
+            self.holders += 1
+            if self.holders > 1: return True
+            os.makedirs(os.path.dirname(self.lock_file_path) or ".", exist_ok=True)
+            self.fd = os.open(self.lock_file_path, os.O_RDWR | os.O_CREAT, 0o644)
+            operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+            try:
+                if timeout is None: fcntl.flock(self.fd, operation); return True
+                deadline = time.monotonic() + timeout
+                while True:
+                    try: fcntl.flock(self.fd, operation | fcntl.LOCK_NB); return True
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline: break
+                        time.sleep(FILE_LOCK_POLL_S)
+            except OSError: os.close(self.fd); self.fd = None; self.holders -= 1; raise
+            os.close(self.fd); self.fd = None; self.holders -= 1
+            return False
+
+    def release_file(self):
+        if not FCNTL_AVAILABLE: return
+        with self.file_mutex:
+            self.holders -= 1
+            if self.holders or self.fd is None: return
+            try: fcntl.flock(self.fd, fcntl.LOCK_UN)
+            finally: os.close(self.fd); self.fd = None
+
+
+_registry_lock = threading.Lock()
+_script_locks = {} # abs script path -> _ScriptLockState
+_thread_wait = threading.local() # Per-thread wait accumulator, consumed by AgentCore for reporting
+
+def _lock_file_path(script_path: str) -> str:
+    """One lock file per script, in a shared subdirectory: every process derives the same path, and the script
+    directory itself holds only scripts."""
+    directory, file_name = os.path.split(script_path)
+    return os.path.join(directory, LOCK_DIR_NAME, f"{file_name}.lock")
+
+def _get_state(script_path: str) -> _ScriptLockState:
+    key = os.path.abspath(script_path)
+    with _registry_lock:
+        state = _script_locks.get(key)
+        if state is None: state = _script_locks[key] = _ScriptLockState(_lock_file_path(key))
+        return state
+
+def _record_wait(waited: float):
+    _thread_wait.total = getattr(_thread_wait, "total", 0.0) + waited
+    _thread_wait.count = getattr(_thread_wait, "count", 0) + 1
+
+@contextmanager
+def read_locked(script_path: str):
+    """Shared lock on a script: other readers may proceed, writers wait."""
+    state = _get_state(script_path); started = time.perf_counter()
+    state.rw_lock.acquire_read()
+    try: state.acquire_file(exclusive=False)
+    except BaseException: state.rw_lock.release_read(); raise
+    _record_wait(time.perf_counter() - started)
+    try: yield
+    finally: state.release_file(); state.rw_lock.release_read()
+
+@contextmanager
+def write_locked(script_path: str, timeout: float = None):
+    """Exclusive lock on a script for a whole read-modify-write cycle. With a timeout, raises TimeoutError if the
+    lock isn't free within that many seconds (for callers that already hold other scripts' locks)."""
+    state = _get_state(script_path); started = time.perf_counter()
+    if not state.rw_lock.acquire_write(timeout): raise TimeoutError(f"Script '{script_path}' is locked by another edit.")
+    try: acquired = state.acquire_file(exclusive=True, timeout=None if timeout is None else max(0.0, timeout - (time.perf_counter() - started)))
+    except BaseException: state.rw_lock.release_write(); raise
+    if not acquired: state.rw_lock.release_write(); raise TimeoutError(f"Script '{script_path}' is locked by another session.")
+    _record_wait(time.perf_counter() - started)
+    try: yield
+    finally: state.release_file(); state.rw_lock.release_write()
+
+def consume_wait_ms():
+    """Returns lock wait (ms) accumulated by the calling thread since the last call, or None if no lock was taken."""
+    count = getattr(_thread_wait, "count", 0); total = getattr(_thread_wait, "total", 0.0)
+    _thread_wait.count = 0; _thread_wait.total = 0.0
+    return total * 1000.0 if count else None
@@ -0,0 +1,48 @@
+# my_app_agent/session_snapshot.py
+# On-disk snapshot of an AgentCore session so a relaunch starts warm: language and current script, the parsed-intent
+# cache, the symbol index and the JavaScript code models. The file is zlib-compressed JSON with a format version; a
+# snapshot from another version, or one that doesn't decode, is ignored rather than migrated. Entries tied to a
+# file carry its (mtime_ns, size) or a digest of its text when saved and are dropped on load if the file changed
+# since, so anything edited while the agent was closed is re-read instead of trusted. AgentCore decides what goes in
+# (snapshot_state, JSON values only) and how it is restored; this module only reads and writes the file.
+import os
+import sys
+import json
+import zlib
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_FORMAT = "myappagent-session"
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser('~'), 'Documents', 'MyAppAgent', 'sessions')
+COMPRESSION_LEVEL = 6
+
+def default_snapshot_path(name: str) -> str:
+    """Snapshot file for one front end ("cli", "tk", "pyside"), so two UIs don't resume each other's session."""
+    return os.path.join(DEFAULT_SNAPSHOT_DIR, f"{name}.snapshot")
+
+def file_signature(path: str):
+    """[mtime_ns, size] of a file, or None if it doesn't exist. A list, so it compares equal after a JSON round trip."""
+    try: stat = os.stat(path)
+    except OSError: return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+def is_current(path: str, signature) -> bool:
+    """True if a signature saved with file_signature() still matches the file."""
+    return signature is not None and file_signature(path) == list(signature)
+
+def write_snapshot(path: str, state: dict):
+    """Writes state atomically: a crash mid-write leaves the previous snapshot in place. Raises TypeError for a value
+    JSON can't hold, before anything is written, rather than saving something that won't load back."""
+    payload = json.dumps({"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION, **state}, separators=(",", ":"))
+    directory = os.path.dirname(os.path.abspath(path)); os.makedirs(directory, exist_ok=True)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as f: f.write(zlib.compress(payload.encode("utf-8"), COMPRESSION_LEVEL))
+    os.replace(temporary_path, path)
+
+def read_snapshot(path: str):
+    """The saved state dict, or None when there is no snapshot or it can't be used (other version, corrupt)."""
+    try:
+        with open(path, "rb") as f: state = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+    except FileNotFoundError: return None
+    except (OSError, zlib.error, ValueError) as e: print(f"Warning: ignoring session snapshot {path}: {e}", file=sys.stderr); return None
+    if not isinstance(state, dict) or state.get("format") != SNAPSHOT_FORMAT or state.get("version") != SNAPSHOT_VERSION: return None
+    return state
@@ -0,0 +1,197 @@
+# my_app_agent/smoke_runner.py
+# Opt-in "smoke" stage: after a command changes a generated Python script, the script is imported (run with
+# __name__ == "__smoke__", so `if __name__ == "__main__"` blocks are skipped) in a pool of pre-started worker
+# interpreters, and import errors or top-level exceptions are reported back with the command's results.
+# Workers are spawned once and reused: between checks each one drops the modules the last check imported, so the
+# cost of a check is the script's own import, not interpreter start-up. Each worker runs with resource limits
+# (address space, CPU seconds per check, file size, open files; POSIX only) in a scratch working directory, and a
+# check that outlives its timeout gets its worker killed and replaced.
+# Configure with MYAPPAGENT_SMOKE="workers=2,timeout=5,memory_mb=512,cpu_s=5" (or "on") or AgentCore(smoke=...).
+import io
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError: # Windows: no rlimits; timeouts still apply
+    RESOURCE_AVAILABLE = False
+
+SMOKE_ENV_VAR = "MYAPPAGENT_SMOKE"
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT_S = 5.0 # Wall time per check, including waiting for the worker's reply
+DEFAULT_MEMORY_MB = 512 # RLIMIT_AS per worker
+DEFAULT_CPU_S = 5 # RLIMIT_CPU per check
+DEFAULT_FILE_SIZE_MB = 16 # RLIMIT_FSIZE: scripts that write files can't fill the disk
+MAX_OUTPUT_CHARS = 2000 # Tail of the script's stdout/stderr kept in a result
+WORKER_FLAG = "--smoke-worker"
+
+def parse_smoke_spec(spec: str) -> dict:
+    """"workers=2,timeout=5,memory_mb=512,cpu_s=5" -> SmokePool keyword arguments. "on" (or "1") takes the defaults.
+    Raises ValueError for unknown keys or bad values."""
+    options = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        key, separator, value = part.partition("=")
+        key = key.strip().lower(); value = value.strip()
+        if not separator and key in ("on", "1", "true", "yes"): continue
+        if key == "workers": options["workers"] = int(value)
+        elif key in ("timeout", "timeout_s"): options["timeout_s"] = float(value)
+        elif key in ("memory", "memory_mb"): options["memory_mb"] = int(value)
+        elif key in ("cpu", "cpu_s"): options["cpu_s"] = int(value)
+        else: raise ValueError(f"Unknown {SMOKE_ENV_VAR} option '{key}'")
+    return options
+
+def from_environment():
+    """Started SmokePool configured by MYAPPAGENT_SMOKE, or None when it is unset/empty/invalid."""
+    spec = os.environ.get(SMOKE_ENV_VAR, "").strip()
+    if not spec or spec.lower() in ("0", "off", "false", "no"): return None
+    try: return SmokePool(**parse_smoke_spec(spec)).start()
+    except (ValueError, OSError) as e: print(f"Warning: ignoring {SMOKE_ENV_VAR}: {e}", file=sys.stderr); return None
+
+def _result(path: str, status: str, started: float, error: str = None, traceback_text: str = None, output: str = "") -> dict:
+    return {"path": path, "status": status, "error": error, "traceback": traceback_text, "output": output,
+            "elapsed_ms": (time.perf_counter() - started) * 1000.0}
+
+class _Worker:
+    """One warm interpreter running _worker_main, fed one JSON request per line. A reader thread moves its replies
+    onto a queue so the caller can wait with a timeout on any platform."""
+    def __init__(self, limits: dict, cwd: str):
+        self.process = subprocess.Popen([sys.executable, "-I", os.path.abspath(__file__), WORKER_FLAG, json.dumps(limits)],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, cwd=cwd,
+                                        text=True, encoding="utf-8", bufsize=1)
+        self.replies = queue.Queue()
+        threading.Thread(target=self._read_replies, name="smoke-worker-reader", daemon=True).start()
+
+    def _read_replies(self):
+        for line in self.process.stdout: self.replies.put(line)
+        self.replies.put(None) # The worker exited
+
+    def request(self, path: str, timeout_s: float):
+        """The worker's reply dict, "timeout", or None if the worker died."""
+        try: self.process.stdin.write(json.dumps({"path": path}) + "\n"); self.process.stdin.flush()
+        except OSError: return None
+        try: line = self.replies.get(timeout=timeout_s)
+        except queue.Empty: return "timeout"
+        return json.loads(line) if line else None
+
+    def alive(self) -> bool: return self.process.poll() is None
+
+    def kill(self):
+        if self.alive(): self.process.kill()
+        try: self.process.wait(timeout=1.0)
+        except subprocess.TimeoutExpired: pass
+
+class SmokePool:
+    def __init__(self, workers: int = DEFAULT_WORKERS, timeout_s: float = DEFAULT_TIMEOUT_S, memory_mb: int = DEFAULT_MEMORY_MB,
+                 cpu_s: int = DEFAULT_CPU_S, file_size_mb: int = DEFAULT_FILE_SIZE_MB):
+        self.size = max(1, int(workers)); self.timeout_s = max(0.1, float(timeout_s))
+        self.limits = {"memory_mb": int(memory_mb), "cpu_s": max(1, int(cpu_s)), "file_size_mb": int(file_size_mb)}
+        self.scratch_dir = None; self._idle = queue.Queue(); self._executor = None; self._closed = False
+
+    def start(self):
+        """Spawns the workers; they finish starting up in the background while the agent carries on."""
+        self.scratch_dir = tempfile.mkdtemp(prefix="myappagent-smoke-") # Working directory for whatever the scripts write
+        for _ in range(self.size): self._idle.put(_Worker(self.limits, self.scratch_dir))
+        self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="smoke-check")
+        return self
+
+    def check(self, script_path: str) -> dict:
+        """Imports one script in a worker: {"path", "status" (ok / error / timeout / crashed), "error", "traceback",
+        "output", "elapsed_ms"}."""
+        path = os.path.abspath(script_path); started = time.perf_counter()
+        worker = self._idle.get()
+        try:
+            reply = worker.request(path, self.timeout_s)
+            if reply == "timeout":
+                worker.kill(); return _result(path, "timeout", started, f"Import took longer than {self.timeout_s:g}s")
+            if reply is None:
+                worker.kill(); code = worker.process.returncode
+                return _result(path, "crashed", started, f"Worker exited with code {code} (resource limit or hard crash)")
+            if reply.get("recycle"): worker.kill() # The script replaced a library function; the next check gets a clean interpreter
+            return _result(path, reply["status"], started, reply.get("error"), reply.get("traceback"), reply.get("output", ""))
+        finally:
+            if not worker.alive() and not self._closed: worker = _Worker(self.limits, self.scratch_dir) # Replace it, warm for the next check
+            self._idle.put(worker)
+
+    def check_many(self, script_paths: list) -> list:
+        """check() for each script, in parallel across the workers; results in the given order."""
+        if not script_paths: return []
+        if len(script_paths) == 1: return [self.check(script_paths[0])]
+        return list(self._executor.map(self.check, script_paths))
+
+    def close(self):
+        self._closed = True
+        if self._executor is not None: self._executor.shutdown(wait=True)
+        while True:
+            try: worker = self._idle.get_nowait()
+            except queue.Empty: break
+            try: worker.process.stdin.close()
+            except OSError: pass
+            worker.kill()
+        if self.scratch_dir: shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+def _apply_limits(limits: dict):
+    if not RESOURCE_AVAILABLE: return
+    for name, value in ((resource.RLIMIT_AS, limits["memory_mb"]), (resource.RLIMIT_FSIZE, limits["file_size_mb"])):
+        if value > 0: resource.setrlimit(name, (value * 1024 * 1024, value * 1024 * 1024))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (64, 64))
+
+def _limit_cpu_for_next_check(cpu_s: int):
+    """RLIMIT_CPU counts the whole process lifetime, so each check gets cpu_s seconds on top of what was used so far."""
+    if not RESOURCE_AVAILABLE: return
+    usage = resource.getrusage(resource.RUSAGE_SELF); used = int(usage.ru_utime + usage.ru_stime) + 1
+    hard = resource.getrlimit(resource.RLIMIT_CPU)[1]
+    soft = used + cpu_s if hard == resource.RLIM_INFINITY else min(used + cpu_s, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard)) # SIGXCPU at the soft limit ends the worker
+
+def _library_callables() -> dict:
+    """{module name: {attribute: function or class}} for the modules loaded so far, to spot scripts that patch them."""
+    return {name: {key: value for key, value in vars(module).items() if callable(value)}
+            for name, module in list(sys.modules.items()) if hasattr(module, "__dict__")}
+
+def _library_patched(baseline: dict) -> bool:
+    for name, attributes in baseline.items():
+        module_dict = getattr(sys.modules.get(name), "__dict__", None)
+        if module_dict is not None and any(module_dict.get(key) is not value for key, value in attributes.items()): return True
+    return False
+
+def _worker_main(limits: dict):
+    import runpy, pkgutil, importlib, sysconfig, traceback # pkgutil: run_path imports it lazily
+    dumps, loads, format_exc, StringIO = json.dumps, json.loads, traceback.format_exc, io.StringIO # Captured before any script can patch them
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8"); replies = os.fdopen(os.dup(1), "w", encoding="utf-8") # The protocol channel
+    devnull_in = os.open(os.devnull, os.O_RDONLY); os.dup2(devnull_in, 0) # input() and raw fd 0 reads get EOF instead of the next request
+    devnull = os.open(os.devnull, os.O_WRONLY); os.dup2(devnull, 1); os.dup2(devnull, 2) # Stray writes can't corrupt the replies
+    _apply_limits(limits)
+    sys.dont_write_bytecode = True; sys.pycache_prefix = os.path.join(os.getcwd(), "no-pycache") # Never trust a .pyc: an edit can keep mtime and size
+    baseline_modules = set(sys.modules); baseline_path = list(sys.path)
+    library_dirs = tuple({sysconfig.get_path(name) for name in ("stdlib", "platstdlib", "purelib", "platlib")}) # Modules from here never change
+    library_callables = _library_callables()
+    for line in requests:
+        path = loads(line)["path"]; captured = StringIO(); reply = {"status": "ok"}
+        _limit_cpu_for_next_check(limits["cpu_s"])
+        sys.stdin = StringIO(); sys.stdout = sys.stderr = captured; sys.path[:] = [os.path.dirname(path)] + baseline_path # Sibling scripts import as they would when run
+        try: runpy.run_path(path, run_name="__smoke__")
+        except SystemExit as e:
+            if e.code not in (None, 0): reply = {"status": "error", "error": f"SystemExit: {e.code}"}
+        except BaseException as e:
+            reply = {"status": "error", "error": f"{type(e).__name__}: {e}", "traceback": format_exc(limit=-8)}
+        finally:
+            sys.stdin, sys.stdout, sys.stderr = sys.__stdin__, sys.__stdout__, sys.__stderr__; sys.path[:] = baseline_path
+            for name in set(sys.modules) - baseline_modules: # The next check re-imports edited siblings; libraries stay loaded
+                module_file = getattr(sys.modules[name], "__file__", None)
+                if module_file and not module_file.startswith(library_dirs): del sys.modules[name]
+            importlib.invalidate_caches()
+        reply["output"] = captured.getvalue()[-MAX_OUTPUT_CHARS:]
+        if _library_patched(library_callables): reply["recycle"] = True # Unloading can't undo that, so the pool replaces this worker
+        replies.write(dumps(reply) + "\n"); replies.flush()
+
+if __name__ == "__main__" and sys.argv[1:2] == [WORKER_FLAG]:
+    _worker_main(json.loads(sys.argv[2]))
@@ -0,0 +1,169 @@
+# my_app_agent/symbol_index.py
+# In-memory index of the names the user types into commands: scripts, classes, methods and functions found in the
+# generated scripts. Built once from the scripts' ASTs (on a background thread) and patched per script after each
+# edit, so completing the word under the cursor is a walk down a prefix trie and never touches the disk.
+import os
+import re
+import ast
+import threading
+
+SCRIPT_SUFFIXES = (".py", ".js")
+DEFAULT_COMPLETION_LIMIT = 10
+KINDS = ("script", "class", "method", "function")
+_TRIES = KINDS + ("method_name",) # "method" holds Class.method; "method_name" the bare names, for completion without a class
+
+# Which kind of name the last word of a command is, from the words before it. Checked in order; the NLU lowercases
+# its input, so matching (and completion) is case-insensitive.
+_CONTEXT_PATTERNS = [
+    ("method", re.compile(r"\bclass\s+([A-Za-z_]\w*)\s+(?:in\s+(?:script\s+)?[\w.-]+\s+)?(?:(?:add|define|in)\s+)?method\s+([A-Za-z_]\w*)?$", re.IGNORECASE)),
+    ("method", re.compile(r"\bmethod\s+([A-Za-z_]\w*)?$", re.IGNORECASE)),
+    ("class", re.compile(r"\bclass\s+([A-Za-z_]\w*)?$", re.IGNORECASE)),
+    ("function", re.compile(r"\bfunction\s+(?:named\s+|called\s+)?([A-Za-z_]\w*)?$", re.IGNORECASE)),
+    ("script", re.compile(r"\b(?:script\s+(?:named\s+|called\s+)?|(?:in|to|into)\s+)([\w.-]+)?$", re.IGNORECASE)),
+]
+
+def _file_signature(path: str):
+    try: stat = os.stat(path)
+    except OSError: return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class _TrieNode:
+    __slots__ = ("children", "names")
+    def __init__(self): self.children = {}; self.names = None # names: original spelling -> reference count
+
+class PrefixTrie:
+    """Case-insensitive prefix trie of names with reference counts (the same name may come from several scripts)."""
+    def __init__(self): self.root = _TrieNode(); self.size = 0
+
+    def add(self, name: str):
+        node = self.root
+        for char in name.lower():
+            child = node.children.get(char)
+            if child is None: child = node.children[char] = _TrieNode()
+            node = child
+        if node.names is None: node.names = {}
+        if name not in node.names: self.size += 1
+        node.names[name] = node.names.get(name, 0) + 1
+
+    def remove(self, name: str):
+        path = [self.root]
+        for char in name.lower():
+            node = path[-1].children.get(char)
+            if node is None: return
+            path.append(node)
+        node = path[-1]
+        if not node.names or name not in node.names: return
+        node.names[name] -= 1
+        if node.names[name]: return
+        del node.names[name]; self.size -= 1
+        if not node.names: node.names = None
+        for char, (parent, child) in zip(reversed(name.lower()), zip(reversed(path[:-1]), reversed(path[1:]))): # Prune empty branches
+            if child.names or child.children: break
+            del parent.children[char]
+
+    def complete(self, prefix: str, limit: int = DEFAULT_COMPLETION_LIMIT) -> list:
+        """Up to `limit` names starting with prefix, in alphabetical (case-folded) order."""
+        node = self.root
+        for char in prefix.lower():
+            node = node.children.get(char)
+            if node is None: return []
+        results = []; stack = [node]
+        while stack and len(results) < limit: # Depth-first, so it stops after about limit * name length nodes
+            current = stack.pop()
+            if current.names: results.extend(sorted(current.names))
+            stack.extend(current.children[char] for char in sorted(current.children, reverse=True))
+        return results[:limit]
+
+class SymbolIndex:
+    def __init__(self):
+        self.tries = {kind: PrefixTrie() for kind in _TRIES}
+        self._symbols_by_script = {} # abs path -> [(kind, name), ...] currently added for it
+        self._signatures = {} # abs path -> (mtime_ns, size) of the file its symbols were read from
+        self._lock = threading.RLock()
+        self.ready = threading.Event() # Set once the initial build finished
+
+    def build(self, directories: list, cached: dict = None):
+        """Indexes every script in directories. cached ({abs path: {"signature", "symbols"}}, as from entries()) is
+        reused for files whose mtime/size still match, so only scripts changed since then are parsed."""
+        cached = cached or {}
+        for directory in directories:
+            try: names = sorted(os.listdir(directory))
+            except OSError: continue
+            for name in names:
+                if not name.endswith(SCRIPT_SUFFIXES): continue
+                path = os.path.abspath(os.path.join(directory, name)); entry = cached.get(path)
+                if entry is not None and tuple(entry["signature"]) == _file_signature(path):
+                    self._replace_symbols(path, [tuple(symbol) for symbol in entry["symbols"]], tuple(entry["signature"]))
+                else: self.update_script(path)
+        self.ready.set()
+
+    def build_in_background(self, directories: list, cached: dict = None) -> threading.Thread:
+        thread = threading.Thread(target=self.build, args=(list(directories), cached), name="symbol-index-build", daemon=True)
+        thread.start(); return thread
+
+    def entries(self) -> dict:
+        """{abs path: {"signature": [mtime_ns, size], "symbols": [[kind, name], ...]}}: what build() can start from."""
+        with self._lock:
+            return {path: {"signature": list(self._signatures[path]), "symbols": [list(symbol) for symbol in symbols]}
+                    for path, symbols in self._symbols_by_script.items() if self._signatures.get(path)}
+
+    def update_script(self, script_path: str, module_node: ast.Module = None):
+        """Re-indexes one script from module_node (its parsed source) or, without one, from disk. A missing file is
+        dropped from the index; a file that doesn't parse keeps its script name and loses its symbols."""
+        path = os.path.abspath(script_path); signature = _file_signature(path) # Taken before reading: a later edit makes it stale, never the reverse
+        if signature is None: self.remove_script(path); return
+        symbols = [("script", os.path.splitext(os.path.basename(path))[0])]
+        if path.endswith(".py"):
+            if module_node is None:
+                try:
+                    with open(path, "r", encoding="utf-8") as f: module_node = ast.parse(f.read(), filename=path)
+                except (OSError, SyntaxError, ValueError, UnicodeDecodeError): module_node = None
+            if module_node is not None: symbols += self._module_symbols(module_node)
+        self._replace_symbols(path, symbols, signature)
+
+    def _replace_symbols(self, path: str, symbols: list, signature: tuple):
+        with self._lock:
+            self._remove_symbols(self._symbols_by_script.pop(path, []))
+            for kind, name in symbols: self.tries[kind].add(name)
+            self._symbols_by_script[path] = symbols; self._signatures[path] = signature
+
+    def remove_script(self, script_path: str):
+        path = os.path.abspath(script_path)
+        with self._lock: self._remove_symbols(self._symbols_by_script.pop(path, [])); self._signatures.pop(path, None)
+
+    def clear(self):
+        with self._lock: self.tries = {kind: PrefixTrie() for kind in _TRIES}; self._symbols_by_script = {}; self._signatures = {}
+
+    def _remove_symbols(self, symbols: list):
+        for kind, name in symbols: self.tries[kind].remove(name)
+
+    @staticmethod
+    def _module_symbols(module_node: ast.Module) -> list:
+        symbols = []
+        for node in module_node.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)): symbols.append(("function", node.name))
+            elif isinstance(node, ast.ClassDef):
+                symbols.append(("class", node.name))
+                for item in node.body: # Methods are stored qualified so "in class Foo method ba" completes Foo's only
+                    if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        symbols.append(("method", f"{node.name}.{item.name}")); symbols.append(("method_name", item.name))
+        return symbols
+
+    def complete_name(self, kind: str, prefix: str, limit: int = DEFAULT_COMPLETION_LIMIT, class_name: str = None) -> list:
+        with self._lock:
+            if kind == "method" and class_name: # Qualified: only that class's methods
+                return [name.split(".", 1)[1] for name in self.tries["method"].complete(f"{class_name}.{prefix}", limit)]
+            return self.tries["method_name" if kind == "method" else kind].complete(prefix, limit)
+
+    def complete(self, text: str, limit: int = DEFAULT_COMPLETION_LIMIT):
+        """Completions for the last word of a partly typed command: (kind, word start offset, [names]), or None when
+        the words before it don't say what kind of name it is."""
+        for kind, pattern in _CONTEXT_PATTERNS:
+            match = pattern.search(text)
+            if match is None: continue
+            if kind == "method" and match.re.groups == 2:
+                prefix = match.group(2) or ""; names = self.complete_name(kind, prefix, limit, class_name=match.group(1))
+            else:
+                prefix = match.group(1) or ""; names = self.complete_name(kind, prefix, limit)
+            return kind, len(text) - len(prefix), names
+        return None
@@ -0,0 +1,137 @@
+# my_app_agent/tests/test_python_generator.py
+# to_source must render generated nodes (which have no line numbers) exactly as ast.unparse does, including code the
+# generator didn't write: edits load a whole existing script and write all of it back.
+#   python -m unittest discover -s tests
+import os
+import ast
+import sys
+import copy
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import python_generator
+
+EXISTING_SCRIPT = '''"""Existing module."""
+import os
+TOTAL = 0
+
+def existing(a):
+    x = a + 1
+    if x:
+        return x
+    elif a < 0:
+        x -= 1
+    else:
+        pass
+    return 0
+
+def loops(items, path):
+    """Loops over items.
+
+    Second paragraph, unindented continuation lines must stay as they are."""
+    total: int = 0
+    for item in items:
+        if item is None:
+            continue
+        total += item
+    else:
+        total = -total
+    while total > 10:
+        total //= 2
+    with open(path) as f, open(path + '.bak', 'w') as g:
+        g.write(f.read())
+    try:
+        value = int(path)
+    except (ValueError, TypeError) as e:
+        raise RuntimeError('bad') from e
+    else:
+        value += 1
+    finally:
+        del total
+    return [value, {'k': items}, lambda y: y * 2]
+
+class Shape(Base):
+    sides = 4
+
+    def area(self, scale=2):
+        if self.sides:
+
+            def inner():
+                """Nested docstring
+    spanning lines."""
+                return scale
+            return inner()
+        return None
+'''
+
+def function_def(name: str, parameters: list) -> ast.FunctionDef: # Built as the generator builds them: no line numbers
+    args = ast.arguments(posonlyargs=[], args=[ast.arg(arg=p) for p in parameters], vararg=None, kwonlyargs=[], kw_defaults=[], kwarg=None, defaults=[])
+    return ast.FunctionDef(name=name, args=args, body=[ast.Pass()], decorator_list=[], returns=None, type_comment=None)
+
+class ToSourceTests(unittest.TestCase):
+    def assert_matches_unparse(self, module: ast.Module):
+        expected = ast.unparse(ast.fix_missing_locations(copy.deepcopy(module)))
+        self.assertEqual(python_generator.to_source(module), expected)
+
+    def test_existing_bodies_round_trip_after_adding_a_function(self):
+        module = ast.parse(EXISTING_SCRIPT)
+        module.body.append(function_def("added", ["a", "b"]))
+        self.assert_matches_unparse(module)
+
+    def test_generated_statements_in_existing_functions(self):
+        module = ast.parse(EXISTING_SCRIPT)
+        for node in module.body:
+            if isinstance(node, ast.FunctionDef):
+                node.body.append(ast.Expr(value=ast.Call(func=ast.Name(id="print", ctx=ast.Load()), args=[ast.Name(id="a", ctx=ast.Load())], keywords=[])))
+                node.body.append(ast.Return(value=ast.BinOp(left=ast.Name(id="a", ctx=ast.Load()), op=ast.Mult(), right=ast.Constant(value=2))))
+        module.body.append(ast.ClassDef(name="Added", bases=[], keywords=[], body=[function_def("run", ["self"])], decorator_list=[]))
+        self.assert_matches_unparse(module)
+
+    def test_add_function_keeps_existing_code(self):
+        previous_cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                script_path = python_generator.create_new_script("existing")
+                with open(script_path, "w", encoding="utf-8") as f: f.write(EXISTING_SCRIPT)
+                self.assertEqual(python_generator.add_function_to_script("existing", "added", ["a"]), script_path)
+                with open(script_path, encoding="utf-8") as f: written = f.read()
+            finally: os.chdir(previous_cwd); python_generator.invalidate_script_cache()
+        written_body = ast.parse(written).body
+        self.assertEqual([ast.dump(node) for node in written_body[:-1]], [ast.dump(node) for node in ast.parse(EXISTING_SCRIPT).body])
+        self.assertEqual(ast.dump(written_body[-1]), ast.dump(ast.parse("def added(a):\n    pass").body[0]))
+
+class EditPatchTests(unittest.TestCase):
+    def setUp(self):
+        self.previous_cwd = os.getcwd(); self.directory = tempfile.TemporaryDirectory(); os.chdir(self.directory.name)
+        python_generator.pop_edit_patches()
+
+    def tearDown(self):
+        os.chdir(self.previous_cwd); self.directory.cleanup(); python_generator.invalidate_script_cache()
+
+    def assert_patch_for(self, result: str, previous: str):
+        """The lookup AgentCore._finish_command does on the path a generator returned."""
+        patch = python_generator.pop_edit_patches().get(os.path.abspath(result))
+        self.assertIsNotNone(patch)
+        self.assertEqual(patch["base_digest"], python_generator.source_digest(previous))
+        with open(result, encoding="utf-8") as f: current = f.read().split("\n")
+        patched = previous.split("\n"); patched[patch["start_line"]:patch["old_end_line"]] = patch["new_lines"]
+        self.assertEqual(patched, current)
+
+    def test_add_function_to_existing_script_returns_a_patch(self):
+        script_path = python_generator.create_new_script("existing")
+        with open(script_path, "w", encoding="utf-8") as f: f.write(EXISTING_SCRIPT)
+        self.assert_patch_for(python_generator.add_function_to_script("existing", "added", ["a"]), EXISTING_SCRIPT)
+
+    def test_add_statement_returns_a_patch(self):
+        script_path = python_generator.create_new_script("existing")
+        with open(script_path, "w", encoding="utf-8") as f: f.write(EXISTING_SCRIPT)
+        self.assert_patch_for(python_generator.add_statement_to_function("existing", "existing", "print", "a"), EXISTING_SCRIPT)
+
+    def test_errors_are_not_paths(self):
+        python_generator.create_new_script("existing")
+        self.assertTrue(python_generator.add_statement_to_function("existing", "missing", "print", "a").startswith("Error:"))
+
+if __name__ == "__main__":
+    unittest.main()